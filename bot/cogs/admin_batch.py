@@ -8,6 +8,7 @@ import discord
 from discord.ext import commands
 import logging
 from datetime import datetime, timezone
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 logger = logging.getLogger(__name__)
 
@@ -19,16 +20,7 @@ class AdminBatch(discord.Cog):
     
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access - unified validation"""
-        try:
-
-            pass
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            else:
-                return False
-        except Exception as e:
-            logger.error(f"Premium access check failed: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
 
     @discord.slash_command(name="batch_stats", description="Show current batch sender statistics")
     @commands.has_permissions(administrator=True)
@@ -9,6 +9,9 @@ import logging
 from typing import Optional
 import asyncio
 
+from bot.utils.channel_router import get_channel_routes
+from bot.utils.premium_entitlements import get_premium_entitlements
+
 logger = logging.getLogger(__name__)
 
 class AdminChannels(discord.Cog):
@@ -20,14 +23,7 @@ class AdminChannels(discord.Cog):
 
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access"""
-        try:
-
-            pass
-            premium_data = await self.bot.db_manager.premium_guilds.find_one({"guild_id": guild_id})
-            return premium_data is not None and premium_data.get("active", False)
-        except Exception as e:
-            logger.error(f"Error checking premium access: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
 
     @discord.slash_command(name="setup_killfeed", description="Configure killfeed channel")
     @discord.default_permissions(administrator=True)
@@ -197,6 +193,7 @@ class AdminChannels(discord.Cog):
                 ),
                 timeout=5.0
             )
+            get_channel_routes().invalidate(guild_id)
             
             embed = discord.Embed(
                 title="✅ Channel Configured",
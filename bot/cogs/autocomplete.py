@@ -3,6 +3,11 @@ import discord
 import discord
 from discord.ext import commands
 from typing import List, Optional
+import logging
+
+from bot.utils.name_index import get_name_index
+
+logger = logging.getLogger(__name__)
 
 class ServerAutocomplete:
     """
@@ -40,31 +45,48 @@ class ServerAutocomplete:
             if not guild_id:
                 return []
 
-            # Get only the current guild's configuration
-            guild_config = await ctx.bot.db_manager.get_guild(guild_id)
-            if not guild_config:
-                return []
-
-            servers = []
-            guild_servers = guild_config.get('servers', [])
-            for server in guild_servers:
-                server_id = str(server.get('_id', server.get('server_id', 'unknown')))
-                server_name = server.get('name', server.get('server_name', f'Server {server_id}'))
-                # Show name but return ID for the command
-                display_name = f"{server_name} (ID: {server_id})"
-                servers.append((display_name, server_id))
-
-            # Filter based on user input
-            user_input = ctx.value.lower()
-            filtered_servers = [(display, sid) for display, sid in servers if user_input in display.lower()]
+            # Served from the in-memory name index
+            servers = await get_name_index().complete_servers(ctx.bot.db_manager, guild_id, ctx.value or "")
 
             # Return just the server_ids for the command, but show display names
-            return [discord.OptionChoice(name=display, value=sid) for display, sid in filtered_servers[:25]]
+            return [discord.OptionChoice(name=display, value=sid) for display, sid in servers]
 
         except Exception as e:
             logger.error(f"Failed to autocomplete server names: {e}")
             return []
 
+    @staticmethod
+    async def autocomplete_player_name(ctx: discord.AutocompleteContext):
+        """Autocomplete for character names seen in the current guild"""
+        try:
+
+            pass
+            guild_id = ctx.interaction.guild.id if ctx.interaction.guild else None
+            if not guild_id:
+                return []
+
+            players = await get_name_index().complete_characters(ctx.bot.db_manager, guild_id, ctx.value or "")
+            return [discord.OptionChoice(name=display, value=name) for display, name in players]
+
+        except Exception as e:
+            logger.error(f"Failed to autocomplete player names: {e}")
+            return []
+
+    @staticmethod
+    async def suggest_player_names(db_manager, guild_id: int, name: str) -> str:
+        """Fuzzy "did you mean" hint for a character name that did not resolve, or an empty string"""
+        try:
+
+            pass
+            suggestions = await get_name_index().suggest_characters(db_manager, guild_id, name)
+            if not suggestions:
+                return ""
+            return " Did you mean " + ", ".join(f"**{player}**" for player, _ in suggestions) + "?"
+
+        except Exception as e:
+            logger.error(f"Failed to suggest player names: {e}")
+            return ""
+
     @staticmethod
     async def autocomplete_server_name_with_guild(ctx: discord.AutocompleteContext):
         """Autocomplete for server names (cross-guild for premium management)"""
@@ -114,8 +136,6 @@ class ServerAutocomplete:
             return [discord.OptionChoice(name=display, value=sid) for display, sid in filtered_servers[:25]]
 
         except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.error(f"Failed to autocomplete cross-guild server names: {e}")
             return []
 
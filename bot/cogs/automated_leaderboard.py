@@ -10,6 +10,10 @@ import logging
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 from bot.utils.embed_factory import EmbedFactory
+from bot.utils import faction_stats, guild_leaderboards, weapon_counters
+from bot.utils.unified_cache import get_cache
+from bot.utils.leaderboard_topk import get_leaderboard_topk
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 logger = logging.getLogger(__name__)
 
@@ -285,74 +289,49 @@ class AutomatedLeaderboard(discord.Cog):
     async def get_top_kills(self, guild_id: int, limit: int = 10, server_id: str = None):
         """Get top killers for automated leaderboard"""
         try:
-
-            pass
-            query = {
-                "guild_id": guild_id,
-                "kills": {"$gt": 0}
-            }
-
-            # Add server filter if specified
-            if server_id and server_id.strip():
-                query["server_id"] = server_id
-
-            cursor = self.bot.db_manager.pvp_data.find(query).sort("kills", -1).limit(limit)
-            return await cursor.to_list(length=None)
+            if not server_id or server_id == "all":
+                return await guild_leaderboards.get_guild_leaderboard(self.bot.db_manager, guild_id, "kills", limit)
+            return await get_leaderboard_topk().get_top(self.bot.db_manager, guild_id, "kills", limit, server_id)
         except Exception as e:
             logger.error(f"Error getting top kills for automated leaderboard: {e}")
             return []
 
-    
     async def _collect_leaderboard_data(self, guild_id: int, server_id: str = None) -> Dict[str, Any]:
-        """Collect all leaderboard data from correct database collections"""
+        """Collect all leaderboard data, served from the cached snapshot until ingest marks the server dirty"""
         try:
+            scope = server_id if server_id and server_id != "all" else None
+
+            async def load() -> Dict[str, Any]:
+                (
+                    top_killers,
+                    top_kdr,
+                    top_distances,
+                    top_streaks,
+                    top_weapons,
+                    top_factions
+                ) = await asyncio.gather(
+                    self.get_top_kills(guild_id, 10, scope),
+                    self.get_top_kdr(guild_id, 10, scope),
+                    self.get_top_distance(guild_id, 10, scope),
+                    self.get_top_streaks(guild_id, 10, scope),
+                    weapon_counters.get_top_weapons(self.bot.db_manager, guild_id, 10, scope),
+                    faction_stats.get_faction_leaderboard(self.bot.db_manager, guild_id, 5, scope)
+                )
 
-            pass
-            data = {}
-            
-            # Base query for filtering
-            base_query = {"guild_id": guild_id}
-            if server_id and server_id != "all":
-                base_query["server_id"] = server_id
-            
-            # Top killers from pvp_data
-            kills_cursor = self.bot.db_manager.pvp_data.find(base_query).sort("kills", -1).limit(10)
-            data["top_killers"] = await kills_cursor.to_list(length=None)
-            
-            # Top KDR (only players with deaths > 0)
-            kdr_query = {**base_query, "deaths": {"$gt": 0}}
-            kdr_pipeline = [
-                {"$match": kdr_query},
-                {"$addFields": {"kdr": {"$divide": ["$kills", "$deaths"]}}},
-                {"$sort": {"kdr": -1}},
-                {"$limit": 10}
-            ]
-            kdr_cursor = self.bot.db_manager.pvp_data.aggregate(kdr_pipeline)
-            data["top_kdr"] = await kdr_cursor.to_list(length=None)
-            
-            # Longest distances from pvp_data
-            distance_cursor = self.bot.db_manager.pvp_data.find(base_query).sort("personal_best_distance", -1).limit(10)
-            data["top_distances"] = await distance_cursor.to_list(length=None)
-            
-            # Best streaks from pvp_data
-            streak_cursor = self.bot.db_manager.pvp_data.find(base_query).sort("longest_streak", -1).limit(10)
-            data["top_streaks"] = await streak_cursor.to_list(length=None)
-            
-            # Top weapons from kill_events
-            weapon_pipeline = [
-                {"$match": {**base_query, "is_suicide": False}},
-                {"$group": {"_id": "$weapon", "kills": {"$sum": 1}, "top_user": {"$first": "$killer"}}},
-                {"$sort": {"kills": -1}},
-                {"$limit": 10}
-            ]
-            weapon_cursor = self.bot.db_manager.kill_events.aggregate(weapon_pipeline)
-            data["top_weapons"] = await weapon_cursor.to_list(length=None)
-            
-            # Top factions from factions collection
-            faction_cursor = self.bot.db_manager.factions.find(base_query).sort("kills", -1).limit(5)
-            data["top_factions"] = await faction_cursor.to_list(length=None)
-            
-            return data
+                return {
+                    "top_killers": top_killers,
+                    "top_kdr": top_kdr,
+                    "top_distances": top_distances,
+                    "top_streaks": top_streaks,
+                    "top_weapons": [
+                        {"_id": weapon["weapon_name"], "kills": weapon["kills"], "top_user": weapon["top_user"]}
+                        for weapon in top_weapons
+                    ],
+                    "top_factions": top_factions
+                }
+
+            # Concurrent refreshes share one collection
+            return await get_cache().get_or_load_leaderboard_snapshot(guild_id, load, scope)
             
         except Exception as e:
             logger.error(f"Failed to collect leaderboard data: {e}")
@@ -557,27 +536,7 @@ class AutomatedLeaderboard(discord.Cog):
 
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access"""
-        # Automated leaderboards is guild-wide premium feature - requires at least 1 premium server
-        try:
-
-            pass
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            else:
-                # Fallback to old method
-                guild_doc = await self.bot.db_manager.get_guild(guild_id)
-                if not guild_doc:
-                    return False
-
-                servers = guild_doc.get('servers', [])
-                for server_config in servers:
-                    server_id = server_config.get('server_id', server_config.get('_id', 'default'))
-                    if await self.check_premium_access(guild_id):
-                        return True
-                return False
-        except Exception as e:
-            logger.error(f"Failed to check premium access for leaderboards: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
 
     async def create_enhanced_consolidated_leaderboard(self, guild_id: int, server_id: str, server_name: str):
         """Create enhanced consolidated leaderboard with advanced Discord features"""
@@ -714,30 +673,11 @@ class AutomatedLeaderboard(discord.Cog):
             return None, None
 
     async def get_top_kdr(self, guild_id: int, limit: int, server_id: str = None) -> List[Dict[str, Any]]:
-        """Get top KDR players"""
+        """Get top KDR players with at least the minimum kills to qualify"""
         try:
-
-            pass
-            query = {
-                "guild_id": guild_id,
-                "kills": {"$gte": 1}
-            }
-
-            # Add server filter if specified
-            if server_id:
-                query["server_id"] = server_id
-
-            cursor = self.bot.db_manager.pvp_data.find(query).limit(50)
-            all_players = await cursor.to_list(length=None)
-
-            # Calculate KDR and sort in Python
-            for player in all_players:
-                kills = player.get('kills', 0)
-                deaths = player.get('deaths', 0)
-                player['kdr'] = kills / max(deaths, 1) if deaths > 0 else float(kills)
-
-            players = sorted(all_players, key=lambda x: x['kdr'], reverse=True)[:limit]
-            return players
+            if not server_id or server_id == "all":
+                return await guild_leaderboards.get_guild_leaderboard(self.bot.db_manager, guild_id, "kdr", limit)
+            return await self.bot.db_manager.get_top_kdr(guild_id, limit, server_id)
         except Exception as e:
             logger.error(f"Failed to get top KDR: {e}")
             return []
@@ -745,19 +685,9 @@ class AutomatedLeaderboard(discord.Cog):
     async def get_top_distance(self, guild_id: int, limit: int, server_id: str = None) -> List[Dict[str, Any]]:
         """Get top distance players"""
         try:
-
-            pass
-            query = {
-                "guild_id": guild_id,
-                "personal_best_distance": {"$gt": 0}
-            }
-
-            # Add server filter if specified
-            if server_id:
-                query["server_id"] = server_id
-
-            cursor = self.bot.db_manager.pvp_data.find(query).sort("personal_best_distance", -1).limit(limit)
-            return await cursor.to_list(length=None)
+            if not server_id or server_id == "all":
+                return await guild_leaderboards.get_guild_leaderboard(self.bot.db_manager, guild_id, "personal_best_distance", limit)
+            return await get_leaderboard_topk().get_top(self.bot.db_manager, guild_id, "personal_best_distance", limit, server_id)
         except Exception as e:
             logger.error(f"Failed to get top distance: {e}")
             return []
@@ -765,57 +695,17 @@ class AutomatedLeaderboard(discord.Cog):
     async def get_top_streaks(self, guild_id: int, limit: int, server_id: str = None) -> List[Dict[str, Any]]:
         """Get top streak players"""
         try:
-
-            pass
-            query = {
-                "guild_id": guild_id,
-                "longest_streak": {"$gt": 0}
-            }
-
-            # Add server filter if specified
-            if server_id:
-                query["server_id"] = server_id
-
-            cursor = self.bot.db_manager.pvp_data.find(query).sort("longest_streak", -1).limit(limit)
-            return await cursor.to_list(length=None)
+            if not server_id or server_id == "all":
+                return await guild_leaderboards.get_guild_leaderboard(self.bot.db_manager, guild_id, "longest_streak", limit)
+            return await get_leaderboard_topk().get_top(self.bot.db_manager, guild_id, "longest_streak", limit, server_id)
         except Exception as e:
             logger.error(f"Failed to get top streaks: {e}")
             return []
 
     async def get_top_weapons(self, guild_id: int, limit: int, server_id: str = None) -> List[Dict[str, Any]]:
-        """Get top weapons by kill count - using same method as working /leaderboard weapons"""
+        """Get top weapons by kill count with the player holding the most kills for each"""
         try:
-
-            pass
-            # Use exact same query as working leaderboard command
-            cursor = self.bot.db_manager.kill_events.find({
-                "guild_id": guild_id,
-                "is_suicide": False,
-                "weapon": {"$nin": ["Menu Suicide", "Suicide", "Falling", "suicide_by_relocation"]}
-            })
-
-            weapon_events = await cursor.to_list(length=None)
-
-            # Group weapons in Python (same as working command)
-            weapon_stats = {}
-            for event in weapon_events:
-                weapon = event.get('weapon', 'Unknown')
-                killer = event.get('killer', 'Unknown')
-
-                if weapon not in weapon_stats:
-                    weapon_stats[weapon] = {'kills': 0, 'top_killer': killer}
-                weapon_stats[weapon]['kills'] += 1
-
-            # Sort and limit
-            weapons_data = []
-            for weapon, stats in sorted(weapon_stats.items(), key=lambda x: x[1]['kills'], reverse=True)[:limit]:
-                weapons_data.append({
-                    'weapon_name': weapon,
-                    'kills': stats['kills'],
-                    'top_user': stats['top_killer']
-                })
-
-            return weapons_data
+            return await weapon_counters.get_top_weapons(self.bot.db_manager, guild_id, limit, server_id)
         except Exception as e:
             logger.error(f"Failed to get top weapons: {e}")
             return []
@@ -823,67 +713,16 @@ class AutomatedLeaderboard(discord.Cog):
     async def get_top_factions(self, guild_id: int, limit: int = 1, server_id: str = None) -> List[Dict[str, Any]]:
         """Get top factions by total kills - aggregate stats from all members including alts"""
         try:
-
-            pass
-            # Get all factions for this guild first
-            factions_cursor = self.bot.db_manager.factions.find({"guild_id": guild_id})
-            all_factions = await factions_cursor.to_list(length=None)
-
-            faction_stats = {}
-
-            # Process each faction (same logic as working leaderboard command)
-            for faction_doc in all_factions:
-                faction_name = faction_doc.get('faction_name')
-                faction_tag = faction_doc.get('faction_tag')
-                faction_display = faction_tag if faction_tag else faction_name
-
-                if not faction_display:
-                    continue
-
-                faction_stats[faction_display] = {
-                    'kills': 0, 
-                    'deaths': 0, 
-                    'members': set(),
-                    'faction_name': faction_name
+            factions = await faction_stats.get_faction_leaderboard(self.bot.db_manager, guild_id, limit, server_id)
+            return [
+                {
+                    'faction_name': faction['faction_name'],
+                    'kills': faction['kills'],
+                    'deaths': faction['deaths'],
+                    'members': faction['active_characters']
                 }
-
-                # Get stats for each member and their alts
-                for discord_id in faction_doc.get('members', []):
-                    # Get player's linked characters
-                    player_link = await self.bot.db_manager.players.find_one({
-                        "guild_id": guild_id,
-                        "discord_id": discord_id
-                    })
-
-                    if not player_link:
-                        continue
-
-                    # Get stats for each character (main and alts)
-                    for character in player_link.get('linked_characters', []):
-                        player_stat = await self.bot.db_manager.pvp_data.find_one({
-                            "guild_id": guild_id,
-                            "player_name": character
-                        })
-
-                        if player_stat:
-                            faction_stats[faction_display]['kills'] += player_stat.get('kills', 0)
-                            faction_stats[faction_display]['deaths'] += player_stat.get('deaths', 0)
-                            faction_stats[faction_display]['members'].add(character)
-
-            # Convert to list format and sort by kills
-            factions_list = []
-            for faction_display, stats in faction_stats.items():
-                factions_list.append({
-                    'faction_name': faction_display,
-                    'kills': stats['kills'],
-                    'deaths': stats['deaths'],
-                    'members': len(stats['members'])
-                })
-
-            # Sort by kills and limit
-            factions_list.sort(key=lambda x: x['kills'], reverse=True)
-            return factions_list[:limit]
-            
+                for faction in factions
+            ]
         except Exception as e:
             logger.error(f"Failed to get top factions: {e}")
             return []
@@ -943,57 +782,16 @@ class AutomatedLeaderboard(discord.Cog):
     async def get_top_faction(self, guild_id: int, limit: int) -> List[Dict[str, Any]]:
         """Get top faction"""
         try:
-
-            pass
-            factions_cursor = self.bot.db_manager.factions.find({"guild_id": guild_id})
-            all_factions = await factions_cursor.to_list(length=None)
-
-            faction_stats = {}
-
-            for faction_doc in all_factions:
-                faction_name = faction_doc.get('faction_name')
-                faction_tag = faction_doc.get('faction_tag')
-                faction_display = faction_tag if faction_tag else faction_name
-
-                if not faction_display:
-                    continue
-
-                faction_stats[faction_display] = {
-                    'kills': 0, 
-                    'deaths': 0, 
-                    'members': set(),
-                    'faction_name': faction_name
+            factions = await faction_stats.get_faction_leaderboard(self.bot.db_manager, guild_id, limit)
+            return [
+                {
+                    'faction_name': faction['full_name'],
+                    'kills': faction['kills'],
+                    'deaths': faction['deaths'],
+                    'member_count': faction['active_characters']
                 }
-
-                # Get stats for each member
-                for discord_id in faction_doc.get('members', []):
-                    player_link = await self.bot.db_manager.players.find_one({
-                        "guild_id": guild_id,
-                        "discord_id": discord_id
-                    })
-
-                    if not player_link:
-                        continue
-
-                    for character in player_link.get('linked_characters', []):
-                        player_stat = await self.bot.db_manager.pvp_data.find_one({
-                            "guild_id": guild_id,
-                            "player_name": character
-                        })
-
-                        if player_stat:
-                            faction_stats[faction_display]['kills'] += player_stat.get('kills', 0)
-                            faction_stats[faction_display]['deaths'] += player_stat.get('deaths', 0)
-                            faction_stats[faction_display]['members'].add(character)
-
-            # Convert member sets to counts and sort by kills
-            for faction_name in faction_stats:
-                faction_stats[faction_name]['member_count'] = len(faction_stats[faction_name]['members'])
-                del faction_stats[faction_name]['members']
-
-            sorted_factions = sorted(faction_stats.items(), key=lambda x: x[1]['kills'], reverse=True)[:limit]
-
-            return [{'faction_name': name, **stats} for name, stats in sorted_factions]
+                for faction in factions
+            ]
         except Exception as e:
             logger.error(f"Failed to get top faction: {e}")
             return []
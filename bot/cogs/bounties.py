@@ -14,6 +14,8 @@ import discord
 import discord
 import discord
 from discord.ext import commands
+from bot.cogs.autocomplete import ServerAutocomplete
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 logger = logging.getLogger(__name__)
 
@@ -30,27 +32,11 @@ class Bounties(discord.Cog):
     
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access - unified validation"""
-        try:
-
-            pass
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            else:
-                return False
-        except Exception as e:
-            logger.error(f"Premium access check failed: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
 
     async def check_premium_server(self, guild_id: int) -> bool:
         """Check if guild has premium access for bounty features"""
-        try:
-
-            pass
-            # Bounties is guild-wide premium feature - check if guild has any premium access
-            return await self.bot.db_manager.has_premium_access(guild_id)
-        except Exception as e:
-            logger.error(f"Premium check failed for bounties: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
 
     async def get_player_character_names(self, guild_id: int, discord_id: int) -> List[str]:
         """Get all character names for a Discord user"""
@@ -90,18 +76,13 @@ class Bounties(discord.Cog):
             if not target_name:
                 return None
 
-            # Find player in PvP data (case-insensitive match)
-            cursor = self.bot.db_manager.pvp_data.find({
-                'guild_id': guild_id,
-                'player_name': {'$regex': f'^{target_name}$', '$options': 'i'}
-            })
-
-            async for player_doc in cursor:
-                actual_player_name = player_doc.get('player_name')
-                if actual_player_name:
-                    # Find Discord ID for this character
-                    discord_id = await self.find_discord_user_by_character(guild_id or 0, actual_player_name)
-                    return actual_player_name, discord_id
+            # Find player in PvP data (case-insensitive, indexed on player_name_key)
+            player_doc = await self.bot.db_manager.find_player_by_character_name(guild_id, target_name)
+            actual_player_name = player_doc.get('player_name') if player_doc else None
+            if actual_player_name:
+                # Find Discord ID for this character
+                discord_id = await self.find_discord_user_by_character(guild_id or 0, actual_player_name)
+                return actual_player_name, discord_id
 
             return None
 
@@ -184,8 +165,11 @@ class Bounties(discord.Cog):
                 resolve_result = await self.resolve_target(ctx, target)
 
             if not resolve_result:
+                suggestion = "" if target_user else await ServerAutocomplete.suggest_player_names(
+                    self.bot.db_manager, guild_id, target
+                )
                 await ctx.respond(
-                    "Unable to find a linked user or matching player by that name.",
+                    f"Unable to find a linked user or matching player by that name.{suggestion}",
                     ephemeral=True
                 )
                 return
@@ -542,7 +526,7 @@ class Bounties(discord.Cog):
                 }
             ]
 
-            top_killers = await self.bot.db_manager.kill_events.aggregate(pipeline).to_list(length=None)
+            top_killers = await self.bot.db_manager.aggregate_kill_events(pipeline).to_list(length=None)
 
             for killer_data in top_killers:
                 killer_name = killer_data['_id']
@@ -669,7 +653,8 @@ class Bounties(discord.Cog):
 
     @bounty.command(name="set", description="Set a bounty on a player")
     async def bounty_set_cmd(self, ctx: discord.ApplicationContext, 
-                            target: discord.Option(str, "Target player name or @mention"),
+                            target: discord.Option(str, "Target player name or @mention",
+                                                   autocomplete=ServerAutocomplete.autocomplete_player_name),
                             amount: discord.Option(int, "Bounty amount", min_value=100)):
         """Set a bounty on a player"""
         try:
@@ -696,7 +681,8 @@ class Bounties(discord.Cog):
             # Resolve target
             target_result = await self.resolve_target(ctx, target)
             if not target_result:
-                await ctx.respond("Target not found or invalid!", ephemeral=True)
+                suggestion = await ServerAutocomplete.suggest_player_names(self.bot.db_manager, guild_id, target)
+                await ctx.respond(f"Target not found or invalid!{suggestion}", ephemeral=True)
                 return
                 
             target_name, target_discord_id = target_result
@@ -11,6 +11,7 @@ import asyncio
 import logging
 from datetime import datetime
 from typing import Dict, Any
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 logger = logging.getLogger(__name__)
 
@@ -22,16 +23,7 @@ class CacheManagement(discord.Cog):
     
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access - unified validation"""
-        try:
-
-            pass
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            else:
-                return False
-        except Exception as e:
-            logger.error(f"Premium access check failed: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
     
     cache_group = SlashCommandGroup(
         name="cache",
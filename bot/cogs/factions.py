@@ -8,6 +8,9 @@ from typing import Dict, List, Optional, Any
 import discord
 from discord.ext import commands
 from bot.utils.embed_factory import EmbedFactory
+from bot.utils import faction_stats
+from bot.utils.name_index import get_name_index
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 logger = logging.getLogger(__name__)
 
@@ -24,29 +27,11 @@ class Factions(discord.Cog):
     
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access - unified validation"""
-        try:
-
-            pass
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            elif hasattr(self.bot, 'db_manager') and hasattr(self.bot.db_manager, 'has_premium_access'):
-                return await self.bot.db_manager.has_premium_access(guild_id)
-            else:
-                return False
-        except Exception as e:
-            logger.error(f"Premium access check failed: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
 
     async def check_premium_server(self, guild_id: int) -> bool:
         """Check if guild has premium access for faction features"""
-        try:
-
-            pass
-            # Factions is guild-wide premium feature - check if guild has any premium access
-            return await self.bot.db_manager.has_premium_access(guild_id)
-        except Exception as e:
-            logger.error(f"Premium check failed for factions: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
 
     async def get_user_faction(self, guild_id: int, discord_id: int) -> Optional[Dict[str, Any]]:
         """Get the faction a user belongs to"""
@@ -58,42 +43,12 @@ class Factions(discord.Cog):
     async def generate_faction_stats(self, guild_id: int, member_ids: List[int]) -> Dict[str, Any]:
         """Generate combined stats for faction members using correct data structure"""
         try:
-
-            pass
-            total_kills = 0
-            total_deaths = 0
-            total_distance = 0.0
-            
-            for member_id in member_ids:
-                # Get linked player names for this Discord user
-                user_link = await self.bot.db_manager.user_links.find_one({
-                    'guild_id': guild_id,
-                    'discord_id': member_id
-                })
-                
-                if user_link:
-                    player_names = user_link.get('player_names', [])
-                    
-                    # Get stats from pvp_data for each linked player name
-                    for player_name in player_names:
-                        cursor = self.bot.db_manager.pvp_data.find({
-                            'guild_id': guild_id,
-                            'player_name': player_name
-                        })
-                        
-                        async for player_stats in cursor:
-                            total_kills += player_stats.get('kills', 0)
-                            total_deaths += player_stats.get('deaths', 0)
-                            total_distance += player_stats.get('total_distance', 0.0)
-            
-            # Calculate K/D ratio
-            kdr = total_kills / total_deaths if total_deaths > 0 else total_kills
-            
+            totals = await faction_stats.get_member_totals(self.bot.db_manager, guild_id, member_ids)
             return {
-                'total_kills': total_kills,
-                'total_deaths': total_deaths,
-                'total_distance': total_distance,
-                'kdr': kdr
+                'total_kills': totals['kills'],
+                'total_deaths': totals['deaths'],
+                'total_distance': totals['total_distance'],
+                'kdr': totals['kdr']
             }
         except Exception as e:
             logger.error(f"Failed to generate faction stats: {e}")
@@ -111,18 +66,11 @@ class Factions(discord.Cog):
             pass
             guild_id = ctx.interaction.guild_id
 
-            # Get all factions for this guild
-            cursor = self.bot.db_manager.factions.find({'guild_id': guild_id}).sort('faction_name', 1)
-            factions = await cursor.to_list(length=25)  # Limit to 25 for autocomplete
+            # Served from the in-memory name index
+            factions = await get_name_index().complete_factions(self.bot.db_manager, guild_id, ctx.value or "")
 
             # Return faction names for autocomplete
-            return [
-                discord.OptionChoice(
-                    name=faction['faction_name'],
-                    value=faction['faction_name']
-                )
-                for faction in factions
-            ]
+            return [discord.OptionChoice(name=name, value=name) for name, _ in factions]
 
         except Exception as e:
             logger.error(f"Autocomplete error: {e}")
@@ -133,45 +81,17 @@ class Factions(discord.Cog):
         try:
 
             pass
+            totals = await faction_stats.get_faction_totals(self.bot.db_manager, guild_id, faction_data['_id'])
             combined_stats = {
-                'total_kills': 0,
-                'total_deaths': 0,
-                'total_suicides': 0,
-                'total_kdr': 0.0,
+                'total_kills': totals['kills'],
+                'total_deaths': totals['deaths'],
+                'total_suicides': totals['suicides'],
+                'total_kdr': totals['kdr'],
                 'member_count': len(faction_data['members']),
-                'best_streak': 0,
-                'total_distance': 0.0
+                'best_streak': totals['best_streak'],
+                'total_distance': totals['total_distance']
             }
 
-            # Get stats for all members
-            for member_id in faction_data['members']:
-                # Get member's linked characters
-                player_data = await self.bot.db_manager.get_linked_player(guild_id or 0, member_id)
-                if not player_data:
-                    continue
-
-                # Get stats for each character across all servers
-                for character in player_data['linked_characters']:
-                    cursor = self.bot.db_manager.pvp_data.find({
-                        'guild_id': guild_id,
-                        'player_name': character
-                    })
-
-                    async for server_stats in cursor:
-                        combined_stats['total_kills'] += server_stats.get('kills', 0)
-                        combined_stats['total_deaths'] += server_stats.get('deaths', 0)
-                        combined_stats['total_suicides'] += server_stats.get('suicides', 0)
-                        combined_stats['total_distance'] += server_stats.get('total_distance', 0.0)
-
-                        if server_stats and server_stats.get('longest_streak', 0) > combined_stats['best_streak']:
-                            combined_stats['best_streak'] = server_stats.get('longest_streak', 0)
-
-            # Calculate faction KDR safely
-            if combined_stats['total_deaths'] > 0:
-                combined_stats['total_kdr'] = combined_stats['total_kills'] / combined_stats['total_deaths']
-            else:
-                combined_stats['total_kdr'] = float(combined_stats['total_kills'])
-
             return combined_stats
 
         except Exception as e:
@@ -270,6 +190,7 @@ class Factions(discord.Cog):
             }
 
             await self.bot.db_manager.factions.insert_one(faction_doc)
+            get_name_index().add_faction(guild_id, name)
 
             # Create success embed
             # Create success embed
@@ -544,6 +465,7 @@ class Factions(discord.Cog):
                 else:
                     # Last member, delete faction
                     await self.bot.db_manager.factions.delete_one({'_id': faction['_id']})
+                    get_name_index().remove_faction(guild_id, faction['faction_name'])
 
                     embed = discord.Embed(
                         title="🏛️ Faction Disbanded",
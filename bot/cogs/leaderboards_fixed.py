@@ -12,7 +12,11 @@ import re
 from datetime import datetime, timezone
 from typing import Optional, Tuple, Dict, Any, List
 from bot.utils.embed_factory import EmbedFactory
+from bot.utils import faction_stats, guild_leaderboards, weapon_counters
+from bot.utils.leaderboard_topk import get_leaderboard_topk
+from bot.utils.unified_cache import get_cache
 from bot.cogs.autocomplete import ServerAutocomplete
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 logger = logging.getLogger(__name__)
 
@@ -41,18 +45,7 @@ class LeaderboardsFixed(discord.Cog):
     
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access - unified validation"""
-        try:
-
-            pass
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            elif hasattr(self.bot, 'db_manager') and hasattr(self.bot.db_manager, 'has_premium_access'):
-                return await self.bot.db_manager.has_premium_access(guild_id)
-            else:
-                return False
-        except Exception as e:
-            logger.error(f"Premium access check failed: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
 
     @discord.slash_command(
         name="leaderboard",
@@ -208,19 +201,9 @@ class LeaderboardsFixed(discord.Cog):
     async def get_top_kills(self, guild_id: int, server_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get top killers for a specific server"""
         try:
-
-            pass
-            query = {
-                "guild_id": guild_id,
-                "kills": {"$gt": 0}
-            }
-
-            # Add server filter if specified
-            if server_id and server_id.strip():
-                query["server_id"] = server_id
-
-            cursor = self.bot.db_manager.pvp_data.find(query).sort("kills", -1).limit(limit)
-            return await cursor.to_list(length=None)
+            if not server_id or not server_id.strip():
+                return await guild_leaderboards.get_guild_leaderboard(self.bot.db_manager, guild_id, "kills", limit)
+            return await get_leaderboard_topk().get_top(self.bot.db_manager, guild_id, "kills", limit, server_id)
         except Exception as e:
             logger.error(f"Error getting top kills: {e}")
             return []
@@ -256,71 +239,32 @@ class LeaderboardsFixed(discord.Cog):
                 description = descriptions['kills']
 
             elif stat_type == 'deaths':
-                # Guild-wide query
-                cursor = self.bot.db_manager.pvp_data.find({
-                    "guild_id": guild_id,
-                    "deaths": {"$gt": 0}
-                }).sort("deaths", -1).limit(10)
-                players = await cursor.to_list(length=None)
+                # Guild-wide, combined per player across servers
+                players = await guild_leaderboards.get_guild_leaderboard(self.bot.db_manager, guild_id, "deaths", 10)
                 title = f"{random.choice(title_pools['deaths'])} - {server_name}"
                 description = descriptions['deaths']
 
             elif stat_type == 'kdr':
-                # Guild-wide query
-                cursor = self.bot.db_manager.pvp_data.find({
-                    "guild_id": guild_id,
-                    "kills": {"$gte": 1}
-                }).limit(50)
-                all_players = await cursor.to_list(length=None)
-
-                # Calculate KDR and sort in Python
-                for player in all_players:
-                    kills = player.get('kills', 0)
-                    deaths = player.get('deaths', 0)
-                    player['kdr'] = kills / max(deaths, 1) if deaths > 0 else float(kills)
-
-                players = sorted(all_players, key=lambda x: x['kdr'], reverse=True)[:10]
+                # Guild-wide KDR combined across servers, qualified by minimum kills
+                players = await guild_leaderboards.get_guild_leaderboard(self.bot.db_manager, guild_id, "kdr", 10)
                 title = f"{random.choice(title_pools['kdr'])} - {server_name}"
                 description = descriptions['kdr']
 
             elif stat_type == 'distance':
-                # Guild-wide query for distance leaderboard
-                cursor = self.bot.db_manager.pvp_data.find({
-                    "guild_id": guild_id,
-                    "personal_best_distance": {"$gt": 0}
-                }).sort("personal_best_distance", -1).limit(10)
-                players = await cursor.to_list(length=None)
+                # Guild-wide best distance per player across servers
+                players = await guild_leaderboards.get_guild_leaderboard(self.bot.db_manager, guild_id, "personal_best_distance", 10)
                 title = f"{random.choice(title_pools['distance'])} - {server_name}"
                 description = descriptions['distance']
 
             elif stat_type == 'weapons':
-                # Guild-wide weapons query
-                cursor = self.bot.db_manager.kill_events.find({
-                    "guild_id": guild_id,
-                    "is_suicide": False,
-                    "weapon": {"$nin": ["Menu Suicide", "Suicide", "Falling", "suicide_by_relocation"]}
-                })
-
-                weapon_events = await cursor.to_list(length=None)
-
-                # Group weapons in Python
-                weapon_stats = {}
-                for event in weapon_events:
-                    weapon = event.get('weapon', 'Unknown')
-                    killer = event.get('killer', 'Unknown')
-
-                    if weapon not in weapon_stats:
-                        weapon_stats[weapon] = {'kills': 0, 'top_killer': killer}
-                    weapon_stats[weapon]['kills'] += 1
-
-                # Sort and limit
-                weapons_data = []
-                for weapon, stats in sorted(weapon_stats.items(), key=lambda x: x[1]['kills'], reverse=True)[:10]:
-                    weapons_data.append({
-                        '_id': weapon,
-                        'kills': stats['kills'],
-                        'top_killer': stats['top_killer']
-                    })
+                # Guild-wide weapons from the weapon counters
+                top_weapons = await get_cache().get_or_load_leaderboard(
+                    guild_id, 'weapons', lambda: weapon_counters.get_top_weapons(self.bot.db_manager, guild_id, 10)
+                )
+                weapons_data = [
+                    {'_id': weapon['weapon_name'], 'kills': weapon['kills'], 'top_killer': weapon['top_user']}
+                    for weapon in top_weapons
+                ]
 
                 if not weapons_data:
                     return None, None
@@ -361,61 +305,21 @@ class LeaderboardsFixed(discord.Cog):
                 return embed, file
 
             elif stat_type == 'factions':
-                # Get all factions for this guild first
-                factions_cursor = self.bot.db_manager.factions.find({"guild_id": guild_id})
-                all_factions = await factions_cursor.to_list(length=None)
-
-                faction_stats = {}
-
-                # Process each faction
-                for faction_doc in all_factions:
-                    faction_name = faction_doc.get('faction_name')
-                    faction_tag = faction_doc.get('faction_tag')
-                    faction_display = faction_tag if faction_tag else faction_name
-
-                    if not faction_display:
-                        continue
-
-                    faction_stats[faction_display] = {
-                        'kills': 0, 
-                        'deaths': 0, 
-                        'members': set(),
-                        'faction_name': faction_name
-                    }
-
-                    # Get stats for each member
-                    for discord_id in faction_doc.get('members', []):
-                        # Get player's linked characters
-                        player_link = await self.bot.db_manager.players.find_one({
-                            "guild_id": guild_id,
-                            "discord_id": discord_id
-                        })
-
-                        if not player_link:
-                            continue
-
-                        # Get stats for each character
-                        for character in player_link.get('linked_characters', []):
-                            player_stat = await self.bot.db_manager.pvp_data.find_one({
-                                "guild_id": guild_id,
-                                "player_name": character
-                            })
-
-                            if player_stat:
-                                faction_stats[faction_display]['kills'] += player_stat.get('kills', 0)
-                                faction_stats[faction_display]['deaths'] += player_stat.get('deaths', 0)
-                                faction_stats[faction_display]['members'].add(character)
-
-                # Convert member sets to counts
-                for faction_name in faction_stats:
-                    faction_stats[faction_name]['member_count'] = len(faction_stats[faction_name]['members'])
-                    del faction_stats[faction_name]['members']
-
-                if not faction_stats:
+                # Faction totals from one $lookup aggregation
+                factions = await get_cache().get_or_load_leaderboard(
+                    guild_id, 'factions', lambda: faction_stats.get_faction_leaderboard(self.bot.db_manager, guild_id, 10)
+                )
+                if not factions:
                     return None, None
 
-                # Sort by kills
-                sorted_factions = sorted(faction_stats.items(), key=lambda x: x[1]['kills'], reverse=True)[:10]
+                sorted_factions = [
+                    (faction['faction_name'], {
+                        'kills': faction['kills'],
+                        'deaths': faction['deaths'],
+                        'member_count': faction['active_characters']
+                    })
+                    for faction in factions
+                ]
 
                 leaderboard_text = []
                 for i, (faction_name, stats) in enumerate(sorted_factions, 1):
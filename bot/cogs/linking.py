@@ -2,6 +2,8 @@ import discord
 from discord.ext import commands
 import logging
 
+from bot.cogs.autocomplete import ServerAutocomplete
+
 logger = logging.getLogger(__name__)
 
 class Linking(commands.Cog):
@@ -9,7 +11,9 @@ class Linking(commands.Cog):
         self.bot = bot
 
     @discord.slash_command(name="link", description="Link your Discord account to a character")
-    async def link(self, ctx: discord.ApplicationContext, character_name: str):
+    async def link(self, ctx: discord.ApplicationContext,
+                   character_name: discord.Option(str, "Character name",
+                                                  autocomplete=ServerAutocomplete.autocomplete_player_name)):
         """Link Discord account to game character"""
         # IMMEDIATE defer - must be first line to prevent timeout
         await ctx.defer()
@@ -28,12 +32,22 @@ class Linking(commands.Cog):
                 await ctx.followup.send("Please provide a valid character name!", ephemeral=True)
                 return
             
+            # Use the stored spelling of a known character; hint at close matches for unknown ones
+            suggestion = ""
+            player_doc = await self.bot.db_manager.find_player_by_character_name(guild_id, character_name)
+            if player_doc:
+                character_name = player_doc.get('player_name', character_name)
+            else:
+                suggestion = await ServerAutocomplete.suggest_player_names(self.bot.db_manager, guild_id, character_name)
+            
             # Basic linking logic - you can implement database operations here
             embed = discord.Embed(
                 title="✅ Character Linked",
                 description=f"Successfully linked **{character_name}** to your Discord account",
                 color=0x00ff00
             )
+            if suggestion:
+                embed.add_field(name="Not seen yet", value=f"No kills or deaths recorded for **{character_name}**.{suggestion}", inline=False)
             
             await ctx.followup.send(embed=embed)
             
@@ -11,6 +11,7 @@ from discord.ext import commands
 from bot.cogs.autocomplete import ServerAutocomplete
 from bot.parsers.scalable_historical_parser import ScalableHistoricalParser
 from discord import Option
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 logger = logging.getLogger(__name__)
 
@@ -28,20 +29,7 @@ class Parsers(discord.Cog):
     
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access - unified validation"""
-        try:
-
-            pass
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            elif hasattr(self.bot, 'db_manager') and hasattr(self.bot.db_manager, 'has_premium_access'):
-                return await self.bot.db_manager.has_premium_access(guild_id)
-            else:
-                return False
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Premium access check failed: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
 
     # Create subcommand group using SlashCommandGroup
     parser = discord.SlashCommandGroup("parser", "Parser management commands")
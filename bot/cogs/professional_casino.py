@@ -8,6 +8,7 @@ import random
 import logging
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 logger = logging.getLogger(__name__)
 
@@ -1140,18 +1141,7 @@ class ProfessionalCasino(discord.Cog):
     
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access - unified validation"""
-        try:
-
-            pass
-            pass
-            pass
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            else:
-                return False
-        except Exception as e:
-            logger.error(f"Premium access check failed: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
     
     @discord.slash_command(name="casino", description="Enter the Emerald Elite Casino - Professional Gaming Experience")
     async def casino(self, ctx: discord.ApplicationContext):
@@ -14,9 +14,15 @@ import discord
 from discord.ext import commands
 from bot.utils.embed_factory import EmbedFactory
 from bot.cogs.autocomplete import ServerAutocomplete
+from bot.utils.presence_tracker import get_presence_tracker
+from bot.utils.player_profiles import EXCLUDED_WEAPONS, profile_id, summarize_profiles, rebuild_player_profiles
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 logger = logging.getLogger(__name__)
 
+# How many top victims/killers each facet returns before merging with rollups
+RIVAL_CANDIDATES = 10
+
 def should_use_inline(field_value: str, max_inline_chars: int = 20) -> bool:
     """Determine if field should be inline based on content length to prevent wrapping"""
     # Remove Discord formatting for accurate length calculation
@@ -35,18 +41,7 @@ class Stats(discord.Cog):
     
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access - unified validation"""
-        try:
-
-            pass
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            elif hasattr(self.bot, 'db_manager') and hasattr(self.bot.db_manager, 'has_premium_access'):
-                return await self.bot.db_manager.has_premium_access(guild_id)
-            else:
-                return False
-        except Exception as e:
-            logger.error(f"Premium access check failed: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
 
     async def resolve_player(self, ctx: discord.ApplicationContext, target) -> Optional[Tuple[List[str], str]]:
         """
@@ -89,16 +84,11 @@ class Stats(discord.Cog):
             if not target_name:
                 return None
             
-            # Find player in PvP data (case-insensitive match)
-            cursor = self.bot.db_manager.pvp_data.find({
-                'guild_id': guild_id,
-                'player_name': {'$regex': f'^{target_name}$', '$options': 'i'}
-            })
-            
-            async for player_doc in cursor:
-                actual_player_name = player_doc.get('player_name')
-                if actual_player_name:
-                    return [actual_player_name], actual_player_name
+            # Find player in PvP data (case-insensitive, indexed on player_name_key)
+            player_doc = await self.bot.db_manager.find_player_by_character_name(guild_id, target_name)
+            actual_player_name = player_doc.get('player_name') if player_doc else None
+            if actual_player_name:
+                return [actual_player_name], actual_player_name
             
             return None
         
@@ -137,58 +127,56 @@ class Stats(discord.Cog):
                 logger.warning("No player characters provided for stats calculation")
                 return combined_stats
 
-            # Get stats from all servers or specific server
-            for character in player_characters:
+            # Guild-wide stats come straight from the materialized profiles when available
+            if not server_id and await self._apply_player_profiles(guild_id, player_characters, combined_stats):
+                return combined_stats
+
+            # Get stats from all servers or specific server in one query
+            query = {
+                'guild_id': guild_id,
+                'player_name': {'$in': player_characters}
+            }
+            
+            # Add server filter if specified
+            if server_id:
+                query['server_id'] = server_id
+            
+            cursor = self.bot.db_manager.pvp_data.find(query)
+
+            async for server_stats in cursor:
                 try:
+                    if not isinstance(server_stats, dict):
+                        logger.warning(f"Invalid server_stats type: {type(server_stats)}")
+                        continue
 
-                    pass
-                    query = {
-                        'guild_id': guild_id,
-                        'player_name': character
-                    }
+                    kills = max(0, server_stats.get('kills', 0))
+                    deaths = max(0, server_stats.get('deaths', 0))
+                    suicides = max(0, server_stats.get('suicides', 0))
                     
-                    # Add server filter if specified
-                    if server_id:
-                        query['server_id'] = server_id
+                    combined_stats['kills'] += kills
+                    combined_stats['deaths'] += deaths
+                    combined_stats['suicides'] += suicides
                     
-                    cursor = self.bot.db_manager.pvp_data.find(query)
-
-                    async for server_stats in cursor:
-                        if not isinstance(server_stats, dict):
-                            logger.warning(f"Invalid server_stats type: {type(server_stats)}")
-                            continue
-
-                        # Enhanced logging to track actual data retrieval
-                        logger.debug(f"Processing server stats for {character}: kills={server_stats.get('kills', 0)}, deaths={server_stats.get('deaths', 0)}")
-
-                        kills = max(0, server_stats.get('kills', 0))
-                        deaths = max(0, server_stats.get('deaths', 0))
-                        suicides = max(0, server_stats.get('suicides', 0))
-                        
-                        combined_stats['kills'] += kills
-                        combined_stats['deaths'] += deaths
-                        combined_stats['suicides'] += suicides
-                        
-                        # Track personal best distance (take the maximum across all servers)
-                        pb_distance = float(server_stats.get('personal_best_distance', 0.0))
-                        if pb_distance > combined_stats['personal_best_distance']:
-                            combined_stats['personal_best_distance'] = pb_distance
-                        
-                        # Add to total distance traveled
-                        total_distance = float(server_stats.get('total_distance', 0.0))
-                        combined_stats['total_distance'] += total_distance
-                        
-                        combined_stats['servers_played'] += 1
+                    # Track personal best distance (take the maximum across all servers)
+                    pb_distance = float(server_stats.get('personal_best_distance', 0.0))
+                    if pb_distance > combined_stats['personal_best_distance']:
+                        combined_stats['personal_best_distance'] = pb_distance
+                    
+                    # Add to total distance traveled
+                    total_distance = float(server_stats.get('total_distance', 0.0))
+                    combined_stats['total_distance'] += total_distance
+                    
+                    combined_stats['servers_played'] += 1
 
-                        # Track best streak
-                        best_streak = max(0, server_stats.get('best_streak', 0))
-                        if best_streak > combined_stats['best_streak']:
-                            combined_stats['best_streak'] = best_streak
+                    # Track best streak
+                    best_streak = max(0, server_stats.get('best_streak', 0))
+                    if best_streak > combined_stats['best_streak']:
+                        combined_stats['best_streak'] = best_streak
 
-                        logger.info(f"Character {character}: +{kills} kills, +{deaths} deaths. Total: {combined_stats['kills']} kills, {combined_stats['deaths']} deaths")
+                    logger.debug(f"Character {server_stats.get('player_name')}: +{kills} kills, +{deaths} deaths")
 
                 except Exception as char_error:
-                    logger.error(f"Error processing character {character}: {char_error}")
+                    logger.error(f"Error processing stats for {server_stats.get('player_name')}: {char_error}")
                     continue
 
             # Calculate KDR safely
@@ -197,21 +185,11 @@ class Stats(discord.Cog):
             else:
                 combined_stats['kdr'] = float(combined_stats['kills'])
 
-            # Get weapon statistics and rivals/nemesis
+            # Get weapon statistics and rivals/nemesis in one aggregation
             try:
-
-                pass
-                await self._calculate_weapon_stats(guild_id or 0, player_characters, combined_stats, server_id)
-            except Exception as weapon_error:
-                logger.error(f"Error calculating weapon stats: {weapon_error}")
-
-            try:
-
-
-                pass
-                await self._calculate_rivals_nemesis(guild_id or 0, player_characters, combined_stats, server_id)
-            except Exception as rival_error:
-                logger.error(f"Error calculating rivals/nemesis: {rival_error}")
+                await self._calculate_kill_breakdown(guild_id or 0, player_characters, combined_stats, server_id)
+            except Exception as breakdown_error:
+                logger.error(f"Error calculating weapon and rivalry stats: {breakdown_error}")
 
             return combined_stats
 
@@ -221,86 +199,122 @@ class Stats(discord.Cog):
             logger.error(f"Stack trace: {traceback.format_exc()}")
             return combined_stats
 
-    async def _calculate_weapon_stats(self, guild_id: int, player_characters: List[str], 
-                                    combined_stats: Dict[str, Any], server_id: str = "default"):
-        """Calculate weapon statistics from kill events (excludes suicides)"""
-        try:
-
-            pass
-            weapon_counts = {}
-
-            for character in player_characters:
-                query = {
-                    'guild_id': guild_id,
-                    'killer': character,
-                    'is_suicide': False  # Only count actual PvP kills for weapon stats
-                }
-                
-                # Add server filter if specified
-                if server_id:
-                    query['server_id'] = server_id
-                
-                cursor = self.bot.db_manager.kill_events.find(query)
+    async def _apply_player_profiles(self, guild_id: int, player_characters: List[str],
+                                     combined_stats: Dict[str, Any]) -> bool:
+        """Fill combined stats from player_profiles; returns False if no profile exists yet"""
+        profiles = await self.bot.db_manager.player_profiles.find({
+            '_id': {'$in': [profile_id(guild_id, character) for character in player_characters]}
+        }).to_list(length=len(player_characters))
+        if not profiles:
+            return False
 
-                async for kill_event in cursor:
-                    weapon = kill_event.get('weapon', 'Unknown')
-                    # Skip suicide weapons even if they somehow got through
-                    if weapon not in ['Menu Suicide', 'Suicide', 'Falling']:
-                        weapon_counts[weapon] = weapon_counts.get(weapon, 0) + 1
+        summary = summarize_profiles(profiles, player_characters)
+        for field in ('kills', 'deaths', 'suicides', 'best_streak', 'servers_played'):
+            combined_stats[field] = summary[field]
+        combined_stats['personal_best_distance'] = summary['personal_best_distance']
+        combined_stats['total_distance'] = float(sum(profile.get('distance_sum', 0) for profile in profiles))
+        combined_stats['kdr'] = combined_stats['kills'] / combined_stats['deaths'] if combined_stats['deaths'] > 0 else float(combined_stats['kills'])
+
+        if summary['weapon_stats']:
+            combined_stats['weapon_stats'] = summary['weapon_stats']
+            combined_stats['favorite_weapon'] = max(summary['weapon_stats'], key=summary['weapon_stats'].get)
+
+        if summary['victims']:
+            most_killed_player = max(summary['victims'], key=summary['victims'].get)
+            combined_stats['most_eliminated_player'] = most_killed_player
+            combined_stats['most_eliminated_count'] = summary['victims'][most_killed_player]
+
+        if summary['killed_by']:
+            killed_by_most_player = max(summary['killed_by'], key=summary['killed_by'].get)
+            combined_stats['eliminated_by_most_player'] = killed_by_most_player
+            combined_stats['eliminated_by_most_count'] = summary['killed_by'][killed_by_most_player]
+
+        combined_stats['rivalry_score'] = combined_stats['most_eliminated_count'] - combined_stats['eliminated_by_most_count']
+        return True
+
+    async def _calculate_kill_breakdown(self, guild_id: int, player_characters: List[str], 
+                                        combined_stats: Dict[str, Any], server_id: str = "default"):
+        """Calculate weapon statistics and rivalry intelligence with a single $facet aggregation"""
+        try:
+            match = {
+                'guild_id': guild_id,
+                'is_suicide': False,  # Only count actual PvP kills
+                '$or': [
+                    {'killer': {'$in': player_characters}},
+                    {'victim': {'$in': player_characters}}
+                ]
+            }
+            
+            # Add server filter if specified
+            if server_id:
+                match['server_id'] = server_id
+            
+            # Kills already rolled up by retention are unioned in as counted rows, so the
+            # rival candidates are ranked on full totals before the limit applies
+            rollup_query = {'guild_id': guild_id, 'type': 'player', 'player_name': {'$in': player_characters}}
+            if server_id:
+                rollup_query['server_id'] = server_id
+
+            def rollup_rows(field: str, kind: str, row: Dict[str, Any]) -> Dict[str, Any]:
+                return {'$map': {
+                    'input': {'$objectToArray': {'$ifNull': [f'${field}', {}]}},
+                    'as': 'entry',
+                    'in': {'kind': kind, 'count': '$$entry.v', **row}
+                }}
+
+            pipeline = [
+                {'$match': match},
+                {'$project': {'_id': 0, 'killer': 1, 'victim': 1, 'weapon': {'$ifNull': ['$weapon', 'Unknown']},
+                              'count': {'$literal': 1}}},
+                {'$unionWith': {
+                    'coll': self.bot.db_manager.kill_rollups.name,
+                    'pipeline': [
+                        {'$match': rollup_query},
+                        {'$project': {'_id': 0, 'rows': {'$concatArrays': [
+                            rollup_rows('weapons', 'weapon', {'killer': '$player_name', 'weapon': '$$entry.k'}),
+                            rollup_rows('victims', 'victim', {'killer': '$player_name', 'victim': '$$entry.k'}),
+                            rollup_rows('killed_by', 'killer', {'killer': '$$entry.k', 'victim': '$player_name'})
+                        ]}}},
+                        {'$unwind': '$rows'},
+                        {'$replaceRoot': {'newRoot': '$rows'}}
+                    ]
+                }},
+                {'$facet': {
+                    'weapons': [
+                        {'$match': {'kind': {'$in': [None, 'weapon']}, 'killer': {'$in': player_characters},
+                                    'weapon': {'$nin': list(EXCLUDED_WEAPONS)}}},
+                        {'$group': {'_id': '$weapon', 'count': {'$sum': '$count'}}}
+                    ],
+                    'victims': [
+                        # Don't count alt kills
+                        {'$match': {'kind': {'$in': [None, 'victim']}, 'killer': {'$in': player_characters},
+                                    'victim': {'$nin': player_characters}}},
+                        {'$group': {'_id': '$victim', 'count': {'$sum': '$count'}}},
+                        {'$sort': {'count': -1}},
+                        {'$limit': RIVAL_CANDIDATES}
+                    ],
+                    'killers': [
+                        # Don't count alt deaths
+                        {'$match': {'kind': {'$in': [None, 'killer']}, 'victim': {'$in': player_characters},
+                                    'killer': {'$nin': player_characters}}},
+                        {'$group': {'_id': '$killer', 'count': {'$sum': '$count'}}},
+                        {'$sort': {'count': -1}},
+                        {'$limit': RIVAL_CANDIDATES}
+                    ]
+                }}
+            ]
+            
+            result = await self.bot.db_manager.aggregate_kill_events(pipeline).to_list(length=1)
+            facets = result[0] if result else {}
+            
+            weapon_counts = {doc['_id'] or 'Unknown': doc['count'] for doc in facets.get('weapons', [])}
+            kills_against = {doc['_id']: doc['count'] for doc in facets.get('victims', []) if doc['_id']}
+            deaths_to = {doc['_id']: doc['count'] for doc in facets.get('killers', []) if doc['_id']}
 
             if weapon_counts:
                 combined_stats['favorite_weapon'] = max(weapon_counts.keys(), key=lambda x: weapon_counts[x])
                 combined_stats['weapon_stats'] = weapon_counts
 
-        except Exception as e:
-            logger.error(f"Failed to calculate weapon stats: {e}")
-
-    async def _calculate_rivals_nemesis(self, guild_id: int, player_characters: List[str], 
-                                      combined_stats: Dict[str, Any], server_id: str = "default"):
-        """Calculate enhanced rivalry intelligence"""
-        try:
-
-            pass
-            kills_against = {}
-            deaths_to = {}
-
-            for character in player_characters:
-                # Count kills against others
-                query_kills = {
-                    'guild_id': guild_id,
-                    'killer': character,
-                    'is_suicide': False
-                }
-                
-                # Add server filter if specified
-                if server_id:
-                    query_kills['server_id'] = server_id
-                
-                cursor = self.bot.db_manager.kill_events.find(query_kills)
-
-                async for kill_event in cursor:
-                    victim = kill_event.get('victim')
-                    if victim and victim not in player_characters:  # Don't count alt kills
-                        kills_against[victim] = kills_against.get(victim, 0) + 1
-
-                # Count deaths to others
-                query_deaths = {
-                    'guild_id': guild_id,
-                    'victim': character,
-                    'is_suicide': False
-                }
-                
-                # Add server filter if specified
-                if server_id:
-                    query_deaths['server_id'] = server_id
-                
-                cursor = self.bot.db_manager.kill_events.find(query_deaths)
-
-                async for kill_event in cursor:
-                    killer = kill_event.get('killer')
-                    if killer and killer not in player_characters:  # Don't count alt deaths
-                        deaths_to[killer] = deaths_to.get(killer, 0) + 1
-
             # Enhanced rivalry calculation
             if kills_against:
                 most_killed_player = max(kills_against.keys(), key=lambda x: kills_against[x])
@@ -318,11 +332,12 @@ class Stats(discord.Cog):
             combined_stats['rivalry_score'] = most_eliminated_count - eliminated_by_most_count
 
         except Exception as e:
-            logger.error(f"Failed to calculate rivalry intelligence: {e}")
+            logger.error(f"Failed to calculate weapon and rivalry stats: {e}")
 
     @discord.slash_command(name="stats", description="View PvP statistics for yourself, a user, or a player name")
     async def stats(self, ctx: discord.ApplicationContext, 
-                   target: discord.Option(str, "Target user or player name", required=False) = None,
+                   target: discord.Option(str, "Target user or player name", required=False,
+                                         autocomplete=ServerAutocomplete.autocomplete_player_name) = None,
                    server: discord.Option(str, "Server to view stats for", required=False) = None):
         """View PvP statistics for yourself, another user, or a player name"""
         import asyncio
@@ -487,20 +502,21 @@ class Stats(discord.Cog):
                     # It's a raw player name
                     resolve_result = await self.resolve_player(ctx, target)
                     if not resolve_result:
+                        suggestion = await ServerAutocomplete.suggest_player_names(self.bot.db_manager, guild_id, target)
                         try:
 
                             pass
                             if hasattr(ctx, 'response') and not ctx.response.is_done():
 
                                 await ctx.respond(
-                            "Unable to find a linked user or matching player by that name.",
+                            f"Unable to find a linked user or matching player by that name.{suggestion}",
                             ephemeral=True
                         )
 
                             else:
 
                                 await ctx.followup.send(
-                            "Unable to find a linked user or matching player by that name.",
+                            f"Unable to find a linked user or matching player by that name.{suggestion}",
                             ephemeral=True
                         )
 
@@ -717,11 +733,11 @@ class Stats(discord.Cog):
                 })
                 
                 # Check if player has any kill events
-                kills_exist = await self.bot.db_manager.kill_events.find_one({
+                kills_exist = await self.bot.db_manager.find_kill_events({
                     'guild_id': guild_id,
                     'killer': character,
                     'server_id': server_id if server_id else {'$exists': True}
-                })
+                }, limit=1).to_list(length=1)
                 
                 if pvp_exists or kills_exist:
                     return True
@@ -864,8 +880,8 @@ class Stats(discord.Cog):
                 await ctx.respond("Processing...", ephemeral=True)
 
             # Get stats for both players
-            stats1 = await self.get_player_combined_stats(guild_id or 0, player1_data['linked_characters'])
-            stats2 = await self.get_player_combined_stats(guild_id or 0, player2_data['linked_characters'])
+            stats1 = await self.get_player_combined_stats(guild_id or 0, player1_data['linked_characters'], None)
+            stats2 = await self.get_player_combined_stats(guild_id or 0, player2_data['linked_characters'], None)
 
             # Use EmbedFactory for comparison embed
             embed_data = {
@@ -959,12 +975,11 @@ class Stats(discord.Cog):
             guild_id = ctx.guild.id
             logger.info(f"Processing /online command for guild {guild_id}")
             
-            # Fast, optimized database query - get online and queued players
+            # Serve from the in-memory presence registry (seeded once per server)
+            tracker = get_presence_tracker()
             try:
-                sessions = await self.bot.db_manager.player_sessions.find(
-                    {'guild_id': guild_id, 'state': {'$in': ['online', 'queued']}},
-                    {'player_name': 1, 'eos_id': 1, 'server_name': 1, 'server_id': 1, 'state': 1, '_id': 0}
-                ).limit(50).to_list(length=50)
+                await tracker.ensure_guild_seeded(self.bot.db_manager, guild_id)
+                sessions = tracker.get_active_players(guild_id)[:50]
                 
             except Exception as e:
                 logger.error(f"Database query failed in /online: {e}")
@@ -1222,5 +1237,33 @@ class Stats(discord.Cog):
 
             logger.error(f"Failed to send response: {e}")
 
+    @discord.slash_command(name="rebuild_profiles", description="Recompute player profiles from kill history")
+    @discord.default_permissions(administrator=True)
+    async def rebuild_profiles(self, ctx: discord.ApplicationContext):
+        """Rebuild the player_profiles view for this guild (backfill after imports or upgrades)"""
+        # Immediate defer to prevent Discord timeout
+        await ctx.defer(ephemeral=True)
+        
+        try:
+            if not ctx.guild:
+                await ctx.followup.send("This command can only be used in a server!", ephemeral=True)
+                return
+            
+            processed = await rebuild_player_profiles(self.bot.db_manager, ctx.guild.id)
+            
+            embed = discord.Embed(
+                title="✅ Player Profiles Rebuilt",
+                description=f"Recomputed profiles from {processed:,} kill events.",
+                color=0x00ff00
+            )
+            await ctx.followup.send(embed=embed, ephemeral=True)
+            
+        except Exception as e:
+            logger.error(f"Error in rebuild_profiles command: {e}")
+            try:
+                await ctx.followup.send("An error occurred while rebuilding player profiles.", ephemeral=True)
+            except:
+                pass
+
 def setup(bot):
     bot.add_cog(Stats(bot))
\ No newline at end of file
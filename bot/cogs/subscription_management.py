@@ -10,6 +10,7 @@ from datetime import datetime
 import asyncio
 from bot.utils.premium_manager_v2 import home_guild_admin_only, bot_owner_only, guild_admin_only
 from bot.cogs.autocomplete import ServerAutocomplete
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 
 class SubscriptionManagement(discord.Cog):
@@ -28,20 +29,7 @@ class SubscriptionManagement(discord.Cog):
     
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access - unified validation"""
-        try:
-
-            pass
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            elif hasattr(self.bot, 'db_manager') and hasattr(self.bot.db_manager, 'has_premium_access'):
-                return await self.bot.db_manager.has_premium_access(guild_id)
-            else:
-                return False
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Premium access check failed: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
         
     async def cog_load(self):
         """Initialize premium manager when cog loads"""
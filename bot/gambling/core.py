@@ -13,6 +13,7 @@ import discord
 import discord
 from discord.ext import commands
 from bot.utils.embed_factory import EmbedFactory
+from bot.utils.premium_entitlements import get_premium_entitlements
 
 logger = logging.getLogger(__name__)
 
@@ -24,14 +25,7 @@ class GamblingCore:
         
     async def check_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access - unified validation"""
-        try:
-            if hasattr(self.bot, 'premium_manager_v2'):
-                return await self.bot.premium_manager_v2.has_premium_access(guild_id)
-            else:
-                return False
-        except Exception as e:
-            logger.error(f"Premium check failed: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self.bot.db_manager, guild_id)
             
     async def get_user_balance(self, guild_id: int, user_id: int) -> int:
         """Get user's current balance"""
@@ -4,15 +4,56 @@ Emerald's Killfeed - Database Models and Architecture
 Implements PHASE 1 data architecture requirements with bulletproof error handling
 """
 
+import os
 import logging
 import asyncio
+import hashlib
 from typing import Optional, Dict, List, Any
 from datetime import datetime, timezone, timezone, timedelta
 from motor.motor_asyncio import AsyncIOMotorClient
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bot.utils import kill_event_buckets, player_profiles, weapon_counters
+from bot.utils.unified_cache import get_cache
+from bot.utils.leaderboard_topk import get_leaderboard_topk
+from bot.utils.name_index import get_name_index, normalize_name
+from bot.utils.presence_tracker import get_presence_tracker
+from bot.utils.channel_router import get_channel_routes
+from bot.utils.premium_entitlements import get_premium_entitlements
+from bot.utils.retention_manager import get_retention_manager
 
 logger = logging.getLogger(__name__)
 
+def make_kill_event_id(guild_id: int, server_id: str, kill_data: Dict[str, Any]) -> str:
+    """Build a deterministic kill event _id so replays of the same line are idempotent
+
+    Every ingest path keeps the source log line, so the id is built from it alone (plus guild, server and
+    timestamp); the parsed fields differ between paths (ids vs names, normalized vs raw weapon).
+    """
+    timestamp = kill_data.get("timestamp")
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        timestamp = timestamp.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+    raw_line = str(kill_data.get("raw_line") or "").strip()
+    if raw_line:
+        event_key = hashlib.sha1(raw_line.encode('utf-8')).hexdigest()
+    else:
+        # No source line: fall back to the fields every path fills in the same normalized form
+        weapon = normalize_name(kill_data.get("weapon"))
+        if kill_data.get("is_suicide") or 'suicide' in weapon:
+            weapon = "suicide"
+        event_key = "|".join([normalize_name(kill_data.get("killer")), normalize_name(kill_data.get("victim")), weapon])
+
+    key_parts = [str(guild_id), str(server_id), str(timestamp or ""), event_key]
+    return hashlib.blake2b("|".join(key_parts).encode('utf-8'), digest_size=16).hexdigest()
+
+def make_player_name_key(player_name: Any) -> str:
+    """Normalize a player name for indexed lookups (casefolded, whitespace collapsed)"""
+    return normalize_name(player_name)
+
 class DatabaseManager:
     """
     Database manager implementing PHASE 1 architecture with comprehensive error handling:
@@ -37,6 +78,7 @@ class DatabaseManager:
         self.premium = self.db.premium
         self.server_premium_status = self.db.server_premium_status
         self.kill_events = self.db.kill_events
+        self.kill_event_buckets = self.db.kill_event_buckets
         self.parser_states = self.db.parser_states
         self.shared_parser_states = self.db.shared_parser_states
         self.player_sessions = self.db.player_sessions
@@ -44,6 +86,20 @@ class DatabaseManager:
         self.bot_config = self.db.bot_config
         self.premium_limits = self.db.premium_limits
         self.wallet_events = self.db.wallet_events
+        self.kill_rollups = self.db.kill_rollups
+        self.player_profiles = self.db.player_profiles
+        self.weapon_counters = self.db.weapon_counters
+
+        # Kill event storage mode: "documents" (one doc per kill) or "buckets" (one doc per server per hour)
+        self.kill_event_storage = os.getenv('KILL_EVENT_STORAGE', 'documents').lower()
+
+        # Minimum kills before a player appears on KDR leaderboards
+        self.kdr_min_kills = int(os.getenv('KDR_MIN_KILLS', '5'))
+    
+    @property
+    def uses_kill_buckets(self) -> bool:
+        """Whether kill events are stored in hourly buckets"""
+        return self.kill_event_storage == 'buckets'
     
     @property
     def admin(self):
@@ -59,11 +115,14 @@ class DatabaseManager:
         try:
             logger.info("Starting comprehensive database initialization...")
             
-            # STEP 1: Aggressive cleanup of ALL conflicts before ANY index creation
-            await self._bulletproof_database_cleanup()
+            # STEP 1: Versioned one-time migrations (duplicates, legacy indexes, stale config)
+            await self._run_schema_migrations()
+
+            await self._check_kill_event_storage()
 
-            # STEP 2: Drop and recreate problematic indexes to ensure clean state
-            await self._reset_problematic_indexes()
+            # STEP 2: Reset runtime state for cold start
+            await self._reset_runtime_state()
+            await self._sync_kdr_qualification()
 
             # STEP 3: Create all indexes with proper error handling
             await self._create_all_indexes_safely()
@@ -76,221 +135,93 @@ class DatabaseManager:
             logger.error(f"Initialization traceback: {traceback.format_exc()}")
             raise
 
-    async def _bulletproof_database_cleanup(self):
-        """Comprehensive cleanup that handles ALL types of conflicts"""
+    async def _run_schema_migrations(self):
+        """Apply pending one-time data migrations; a current schema skips this entirely"""
         try:
-            logger.info("PHASE 1: Aggressive database cleanup starting...")
-            
-            # 1. Complete parser_states cleanup
-            logger.info("Cleaning parser_states collection...")
-            
-            # Find ALL documents and group by logical key
-            all_parser_docs = await self.parser_states.find({}).to_list(length=None)
-            logger.info(f"Found {len(all_parser_docs)} parser_states documents")
-            
-            # Group by logical compound key regardless of data types
-            logical_groups = {}
-            for doc in all_parser_docs:
-                try:
-                    # Normalize key components
-                    guild_id = int(doc.get('guild_id', ''))
-                    server_id = str(doc.get('server_id', ''))
-                    parser_type = str(doc.get('parser_type', 'log_parser'))
-                    
-                    logical_key = f"{guild_id}_{server_id}_{parser_type}"
-                    
-                    if logical_key not in logical_groups:
-                        logical_groups[logical_key] = []
-                    logical_groups[logical_key].append(doc)
-                except Exception as doc_error:
-                    logger.warning(f"Error processing parser doc: {doc_error}")
-                    # Mark for deletion
-                    try:
-                        await self.parser_states.delete_one({"_id": doc["_id"]})
-                    except:
-                        pass
-
-            # Keep only the most recent document in each logical group
-            total_cleaned = 0
-            for logical_key, docs in logical_groups.items():
-                if len(docs) > 1:
-                    # Sort by last_updated or _id, keep newest
-                    try:
-                        sorted_docs = sorted(docs, 
-                            key=lambda x: x.get('last_updated', x.get('_id', datetime.min)), 
-                            reverse=True
-                        )
-                        to_keep = sorted_docs[0]
-                        to_delete = sorted_docs[1:]
-                        
-                        delete_ids = [doc["_id"] for doc in to_delete]
-                        result = await self.parser_states.delete_many({"_id": {"$in": delete_ids}})
-                        total_cleaned += result.deleted_count
-                        
-                        logger.debug(f"Cleaned {result.deleted_count} duplicates for {logical_key}")
-                    except Exception as cleanup_error:
-                        logger.error(f"Error cleaning logical group {logical_key}: {cleanup_error}")
-                        # If cleanup fails, delete ALL docs in this group and let them recreate
-                        try:
-                            all_ids = [doc["_id"] for doc in docs]
-                            await self.parser_states.delete_many({"_id": {"$in": all_ids}})
-                            total_cleaned += len(docs)
-                        except:
-                            pass
-
-            if total_cleaned > 0:
-                logger.info(f"Cleaned {total_cleaned} duplicate parser_states documents")
-
-            # 2. Complete player_sessions cleanup
-            logger.info("Cleaning player_sessions collection...")
-            
-            all_session_docs = await self.player_sessions.find({}).to_list(length=None)
-            logger.info(f"Found {len(all_session_docs)} player_sessions documents")
-            
-            session_groups = {}
-            for doc in all_session_docs:
-                try:
-                    guild_id = int(doc.get('guild_id', ''))
-                    server_id = str(doc.get('server_id', ''))
-                    player_id = str(doc.get('player_id', ''))
-                    
-                    logical_key = f"{guild_id}_{server_id}_{player_id}"
-                    
-                    if logical_key not in session_groups:
-                        session_groups[logical_key] = []
-                    session_groups[logical_key].append(doc)
-                except Exception as doc_error:
-                    logger.warning(f"Error processing session doc: {doc_error}")
-                    try:
-                        await self.player_sessions.delete_one({"_id": doc["_id"]})
-                    except:
-                        pass
-
-            session_cleaned = 0
-            for logical_key, docs in session_groups.items():
-                if len(docs) > 1:
-                    try:
-                        sorted_docs = sorted(docs, 
-                            key=lambda x: x.get('last_updated', x.get('_id', datetime.min)), 
-                            reverse=True
-                        )
-                        to_delete = sorted_docs[1:]
-                        
-                        delete_ids = [doc["_id"] for doc in to_delete]
-                        result = await self.player_sessions.delete_many({"_id": {"$in": delete_ids}})
-                        session_cleaned += result.deleted_count
-                    except Exception as cleanup_error:
-                        logger.error(f"Error cleaning session group {logical_key}: {cleanup_error}")
-                        try:
-                            all_ids = [doc["_id"] for doc in docs]
-                            await self.player_sessions.delete_many({"_id": {"$in": all_ids}})
-                            session_cleaned += len(docs)
-                        except:
-                            pass
+            from bot.models.migrations import run_migrations
+            await run_migrations(self)
+        except Exception as e:
+            logger.error(f"Schema migration failed: {e}")
+            import traceback
+            logger.error(f"Migration traceback: {traceback.format_exc()}")
 
-            if session_cleaned > 0:
-                logger.info(f"Cleaned {session_cleaned} duplicate player_sessions documents")
+    async def _check_kill_event_storage(self):
+        """Warn when kill history sits in the store KILL_EVENT_STORAGE does not read"""
+        try:
+            active, other = (self.kill_event_buckets, self.kill_events) if self.uses_kill_buckets else (self.kill_events, self.kill_event_buckets)
+            hidden = await other.estimated_document_count()
+            if hidden:
+                logger.error(
+                    f"KILL_EVENT_STORAGE={self.kill_event_storage} but {other.name} still holds {hidden} documents "
+                    f"that {active.name} does not include; kill history and rebuilds will be missing them "
+                    f"until they are migrated or KILL_EVENT_STORAGE is switched back"
+                )
+        except Exception as e:
+            logger.warning(f"Kill event storage check failed: {e}")
 
-            # 3. Normalize data types in remaining documents
-            logger.info("Normalizing data types...")
-            
-            # Fix parser_states types
-            await self.parser_states.update_many(
-                {"guild_id": {"$type": "string"}},
-                [{"$set": {"guild_id": {"$toLong": "$guild_id"}}}]
+    async def _reset_runtime_state(self):
+        """Reset unified log parser states and force all players offline on bot restart"""
+        try:
+            # Reset parser states to force cold start
+            reset_result = await self.parser_states.update_many(
+                {'parser_type': 'log_parser'},  # Only unified log parser
+                {'$unset': {'last_log_size': ''}}  # Only reset log size, not last_processed
             )
+            logger.info(f"Reset {reset_result.modified_count} unified log parser states for cold start on restart")
             
-            await self.player_sessions.update_many(
-                {"guild_id": {"$type": "string"}},
-                [{"$set": {"guild_id": {"$toLong": "$guild_id"}}}]
+            # Force all player sessions to offline on bot startup (cold start); servers with a
+            # warm-restart snapshot get their online players back on the first parser run
+            player_reset_result = await self.player_sessions.update_many(
+                {"state": {"$in": ["online", "queued"]}},
+                {
+                    "$set": {
+                        "state": "offline",
+                        "last_updated": datetime.now(timezone.utc)
+                    }
+                }
             )
-
-            # 4. Remove any malformed documents
-            malformed_count = 0
-            
-            # Remove parser_states with missing required fields
-            result = await self.parser_states.delete_many({
-                "$or": [
-                    {"guild_id": {"$exists": False}},
-                    {"server_id": {"$exists": False}},
-                    {"server_id": {"$in": [None, ""]}},
-                    {"guild_id": {"$in": [None, ""]}},
-                    {"guild_id": {"$type": "string", "$eq": ""}},
-                    {"server_id": {"$type": "string", "$eq": ""}}
-                ]
-            })
-            malformed_count += result.deleted_count
-
-            # Remove player_sessions with missing required fields
-            result = await self.player_sessions.delete_many({
-                "$or": [
-                    {"guild_id": {"$exists": False}},
-                    {"server_id": {"$exists": False}},
-                    {"player_id": {"$exists": False}},
-                    {"guild_id": {"$in": [None, ""]}},
-                    {"server_id": {"$in": [None, ""]}},
-                    {"player_id": {"$in": [None, ""]}}
-                ]
-            })
-            malformed_count += result.deleted_count
-
-            if malformed_count > 0:
-                logger.info(f"Removed {malformed_count} malformed documents")
-
-            logger.info("PHASE 1: Database cleanup completed")
+            logger.info(f"Cold start: Reset {player_reset_result.modified_count} player sessions to offline state")
             
-            # Reset unified log parser states and force all players offline on bot restart
-            try:
-                # Reset parser states to force cold start
-                reset_result = await self.parser_states.update_many(
-                    {'parser_type': 'log_parser'},  # Only unified log parser
-                    {'$unset': {'last_log_size': ''}}  # Only reset log size, not last_processed
-                )
-                logger.info(f"Reset {reset_result.modified_count} unified log parser states for cold start on restart")
-                
-                # Force all player sessions to offline on bot startup (cold start)
-                player_reset_result = await self.player_sessions.update_many(
-                    {"state": {"$in": ["online", "queued"]}},
-                    {
-                        "$set": {
-                            "state": "offline",
-                            "last_updated": datetime.now(timezone.utc)
-                        }
-                    }
-                )
-                logger.info(f"Cold start: Reset {player_reset_result.modified_count} player sessions to offline state")
-                
-            except Exception as e:
-                logger.warning(f"Cold start reset failed: {e}")
-
         except Exception as e:
-            logger.error(f"Bulletproof cleanup failed: {e}")
-            import traceback
-            logger.error(f"Cleanup traceback: {traceback.format_exc()}")
-
-    async def _reset_problematic_indexes(self):
-        """Drop and recreate indexes that are causing conflicts"""
+            logger.warning(f"Cold start reset failed: {e}")
+
+    def _kdr_stage(self) -> Dict[str, Any]:
+        """Update pipeline stage deriving kdr and leaderboard qualification from stored kills/deaths"""
+        kills = {"$ifNull": ["$kills", 0]}
+        deaths = {"$ifNull": ["$deaths", 0]}
+        return {"$set": {
+            "kdr": {"$cond": [{"$gt": [deaths, 0]}, {"$divide": [kills, deaths]}, {"$toDouble": kills}]},
+            "qualified": {"$gte": [kills, self.kdr_min_kills]}
+        }}
+
+    async def _sync_kdr_qualification(self):
+        """Recompute kdr/qualified for all players when the minimum kills threshold changes"""
         try:
-            logger.info("PHASE 2: Resetting problematic indexes...")
-            
-            # Drop parser_states indexes
-            try:
-                await self.parser_states.drop_indexes()
-                logger.info("Dropped all parser_states indexes")
-            except Exception as e:
-                logger.debug(f"Index drop for parser_states: {e}")
-
-            # Drop player_sessions indexes
-            try:
-                await self.player_sessions.drop_indexes()
-                logger.info("Dropped all player_sessions indexes")
-            except Exception as e:
-                logger.debug(f"Index drop for player_sessions: {e}")
+            stored = await self.bot_config.find_one({"_id": "kdr_qualification"})
+            if stored and stored.get("min_kills") == self.kdr_min_kills:
+                return
 
-            logger.info("PHASE 2: Index reset completed")
+            result = await self.pvp_data.update_many({}, [self._kdr_stage()])
+            await self.bot_config.update_one(
+                {"_id": "kdr_qualification"},
+                {"$set": {"min_kills": self.kdr_min_kills, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            logger.info(f"KDR qualification set to {self.kdr_min_kills} kills ({result.modified_count} players updated)")
+        except Exception as e:
+            logger.warning(f"KDR qualification sync failed: {e}")
 
+    async def refresh_kdr(self, guild_id: int, server_id: str, player_names: Optional[List[str]] = None):
+        """Recompute kdr/qualified after bulk stat writes, for the given players or the whole server"""
+        query = {"guild_id": guild_id, "server_id": server_id}
+        if player_names is not None:
+            if not player_names:
+                return
+            query["player_name"] = {"$in": list(player_names)}
+        try:
+            await self.pvp_data.update_many(query, [self._kdr_stage()])
         except Exception as e:
-            logger.error(f"Index reset failed: {e}")
+            logger.error(f"Failed to refresh KDR: {e}")
 
     async def _create_all_indexes_safely(self):
         """Create all indexes with comprehensive error handling"""
@@ -317,15 +248,39 @@ class DatabaseManager:
                 await self.pvp_data.create_index([("guild_id", 1), ("server_id", 1), ("player_name", 1)], unique=True)
                 await self.pvp_data.create_index([("guild_id", 1), ("server_id", 1), ("kills", -1)])
                 await self.pvp_data.create_index([("guild_id", 1), ("server_id", 1), ("kdr", -1)])
+                await self.pvp_data.create_index(
+                    [("guild_id", 1), ("server_id", 1), ("qualified", 1), ("kdr", -1)],
+                    name="qualified_kdr",
+                    partialFilterExpression={"qualified": True}
+                )
+                await self.pvp_data.create_index([("guild_id", 1), ("player_name", 1)])
+                await self.pvp_data.create_index([("guild_id", 1), ("player_name_key", 1)])
+                await self.pvp_data.create_index(
+                    [("guild_id", 1), ("player_name", 1), ("server_id", 1), ("kills", 1), ("deaths", 1),
+                     ("suicides", 1), ("personal_best_distance", 1), ("longest_streak", 1), ("best_streak", 1)],
+                    name="guild_player_totals_covering"
+                )
                 logger.debug("PvP data indexes created")
             except Exception as e:
                 logger.warning(f"PvP data index creation: {e}")
 
             # Kill events indexes (server-scoped)
             try:
-                await self.kill_events.create_index([("guild_id", 1), ("server_id", 1), ("timestamp", -1)])
-                await self.kill_events.create_index([("guild_id", 1), ("server_id", 1), ("killer", 1)])
-                await self.kill_events.create_index([("guild_id", 1), ("server_id", 1), ("victim", 1)])
+                if self.uses_kill_buckets:
+                    await self.kill_event_buckets.create_index([("guild_id", 1), ("server_id", 1), ("hour", -1)])
+                else:
+                    await self.kill_events.create_index([("guild_id", 1), ("server_id", 1), ("timestamp", -1)])
+                    await self.kill_events.create_index([("guild_id", 1), ("server_id", 1), ("killer", 1)])
+                    await self.kill_events.create_index([("guild_id", 1), ("server_id", 1), ("victim", 1)])
+                    # Covering indexes for per-player weapon and rivalry breakdowns
+                    await self.kill_events.create_index(
+                        [("guild_id", 1), ("killer", 1), ("is_suicide", 1), ("server_id", 1), ("weapon", 1), ("victim", 1)],
+                        name="killer_breakdown_covering"
+                    )
+                    await self.kill_events.create_index(
+                        [("guild_id", 1), ("victim", 1), ("is_suicide", 1), ("server_id", 1), ("killer", 1), ("weapon", 1)],
+                        name="victim_breakdown_covering"
+                    )
                 logger.debug("Kill events indexes created")
             except Exception as e:
                 logger.warning(f"Kill events index creation: {e}")
@@ -337,6 +292,17 @@ class DatabaseManager:
             except Exception as e:
                 logger.warning(f"Economy index creation: {e}")
 
+            # Retention indexes (rollups and time-ordered scans)
+            try:
+                await self.kill_rollups.create_index([("guild_id", 1), ("server_id", 1), ("type", 1)])
+                await self.player_profiles.create_index([("guild_id", 1), ("player_name", 1)])
+                await self.weapon_counters.create_index([("guild_id", 1), ("server_id", 1), ("weapon", 1)])
+                await self.wallet_events.create_index([("guild_id", 1), ("timestamp", 1)])
+                await self.player_sessions.create_index([("guild_id", 1), ("server_id", 1), ("state", 1), ("last_seen", 1)])
+                logger.debug("Retention indexes created")
+            except Exception as e:
+                logger.warning(f"Retention index creation: {e}")
+
             # Faction indexes (guild-scoped)
             try:
                 await self.factions.create_index([("guild_id", 1), ("faction_name", 1)], unique=True)
@@ -450,6 +416,7 @@ class DatabaseManager:
         }
 
         await self.guilds.insert_one(guild_doc)
+        get_channel_routes().invalidate(guild_id)
         logger.info(f"Created guild: {guild_name} ({guild_id})")
         return guild_doc
 
@@ -478,6 +445,8 @@ class DatabaseManager:
                     "updated_at": datetime.now(timezone.utc)
                 }
                 insert_result = await self.guilds.insert_one(new_guild)
+                get_name_index().invalidate_servers(guild_id)
+                get_channel_routes().invalidate(guild_id)
                 logger.info(f"Created new guild document for {guild_id} with server {server_config.get('_id')}")
                 return insert_result.inserted_id is not None
             else:
@@ -489,6 +458,8 @@ class DatabaseManager:
                         "$set": {"updated_at": datetime.now(timezone.utc)}
                     }
                 )
+                get_name_index().invalidate_servers(guild_id)
+                get_channel_routes().invalidate(guild_id)
                 logger.info(f"Added server {server_config.get('_id')} to existing guild {guild_id}")
                 return result.modified_count > 0
         except Exception as e:
@@ -514,6 +485,8 @@ class DatabaseManager:
                     {"$pull": {"servers": {"server_id": server_id}}}
                 )
 
+            get_name_index().invalidate_servers(guild_id)
+            get_channel_routes().invalidate(guild_id)
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Failed to remove server from guild {guild_id}: {e}")
@@ -523,18 +496,7 @@ class DatabaseManager:
     async def find_player_in_pvp_data(self, guild_id: int, character_name: str) -> Optional[str]:
         """Find player in PvP data with case-insensitive search, returns actual player name if found"""
         try:
-            # Search for player with case-insensitive regex that handles spaces
-            # Remove extra spaces and normalize the search term
-            normalized_search = ' '.join(character_name.strip().split())
-
-            # Create case-insensitive regex pattern
-            escaped_search = normalized_search.replace(' ', r'\s+')
-            pattern = f"^{escaped_search}$"
-
-            player_doc = await self.pvp_data.find_one({
-                "guild_id": guild_id,
-                "player_name": {"$regex": pattern, "$options": "i"}
-            })
+            player_doc = await self.find_player_by_character_name(guild_id, character_name)
 
             if player_doc:
                 return player_doc["player_name"]  # Return the actual player name from database
@@ -717,6 +679,7 @@ class DatabaseManager:
                         "guild_id": guild_id,
                         "server_id": server_id,
                         "player_name": player_name,
+                        "player_name_key": make_player_name_key(player_name),
                         "created_at": datetime.now(timezone.utc),
                         "kdr": 0.0,
                         "favorite_weapon": None,
@@ -758,6 +721,7 @@ class DatabaseManager:
                         },
                         {
                             "$set": stats_update,
+                            "$setOnInsert": {"player_name_key": make_player_name_key(player_name)},
                             "$currentDate": {"last_updated": True}
                         },
                         upsert=True
@@ -775,6 +739,7 @@ class DatabaseManager:
                     kills = stats_update.get("kills", current_doc.get("kills", 0) if current_doc else 0)
                     deaths = stats_update.get("deaths", current_doc.get("deaths", 0) if current_doc else 0)
                     stats_update["kdr"] = kills / max(deaths, 1) if deaths > 0 else float(kills)
+                    stats_update["qualified"] = kills >= self.kdr_min_kills
 
                 if not current_doc:
                     # Create new document
@@ -782,6 +747,7 @@ class DatabaseManager:
                         "guild_id": guild_id,
                         "server_id": server_id,
                         "player_name": player_name,
+                        "player_name_key": make_player_name_key(player_name),
                         "created_at": datetime.now(timezone.utc),
                         "last_updated": datetime.now(timezone.utc),
                         "kills": 0,
@@ -818,21 +784,10 @@ class DatabaseManager:
     async def _update_kdr(self, guild_id: int, server_id: str, player_name: str):
         """Helper method to update KDR calculation"""
         try:
-            current_doc = await self.pvp_data.find_one({
-                "guild_id": guild_id,
-                "server_id": server_id,
-                "player_name": player_name
-            })
-
-            if current_doc:
-                kills = current_doc.get("kills", 0)
-                deaths = current_doc.get("deaths", 0)
-                kdr = kills / max(deaths, 1) if deaths > 0 else float(kills)
-
-                await self.pvp_data.update_one(
-                    {"guild_id": guild_id, "server_id": server_id, "player_name": player_name},
-                    {"$set": {"kdr": kdr}}
-                )
+            await self.pvp_data.update_one(
+                {"guild_id": guild_id, "server_id": server_id, "player_name": player_name},
+                [self._kdr_stage()]
+            )
         except Exception as e:
             logger.error(f"Failed to update KDR: {e}")
 
@@ -868,8 +823,11 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Failed to reset player streak: {e}")
 
-    async def add_kill_event(self, guild_id: int, server_id: str, kill_data: Dict[str, Any]):
-        """Add a kill event to the database with enhanced distance validation"""
+    async def add_kill_event(self, guild_id: int, server_id: str, kill_data: Dict[str, Any]) -> bool:
+        """Add a kill event to the database with enhanced distance validation
+
+        Returns False without touching player stats when the event was already recorded.
+        """
         try:
             # PHASE 1 FIX: Ensure distance is properly validated before DB insertion
             distance = kill_data.get("distance", 0)
@@ -885,6 +843,7 @@ class DatabaseManager:
             distance = max(0.0, min(distance, 5000.0))
 
             kill_event = {
+                "_id": make_kill_event_id(guild_id, server_id, kill_data),
                 "guild_id": guild_id,
                 "server_id": server_id,
                 "timestamp": kill_data.get("timestamp", datetime.now(timezone.utc)),
@@ -900,12 +859,22 @@ class DatabaseManager:
                 "raw_line": kill_data.get("raw_line", "")
             }
 
-            await self.kill_events.insert_one(kill_event)
+            if self.uses_kill_buckets:
+                if not await self.insert_kill_events([kill_event]):
+                    logger.debug(f"Skipping already recorded kill event {kill_event['_id']}")
+                    return False
+            else:
+                try:
+                    await self.kill_events.insert_one(kill_event)
+                except DuplicateKeyError:
+                    logger.debug(f"Skipping already recorded kill event {kill_event['_id']}")
+                    return False
             logger.debug(f"Added kill event: {kill_data['killer']} -> {kill_data['victim']} (distance: {distance}m)")
             
             # Update player stats for killer (if not suicide)
+            best_streaks = {}
             if not kill_data.get('is_suicide', False):
-                await self.increment_player_kill(
+                best_streaks[kill_event["killer"]] = await self.increment_player_kill(
                     guild_id, 
                     server_id, 
                     kill_data.get('killer', ''), 
@@ -920,8 +889,190 @@ class DatabaseManager:
                 kill_data.get('victim', '')
             )
 
+            await self.record_kill_aggregates(guild_id, server_id, [kill_event], best_streaks)
+            return True
+
         except Exception as e:
             logger.error(f"Failed to add kill event: {e}")
+            return False
+
+    async def insert_kill_events(self, kill_events: List[Dict[str, Any]]) -> set:
+        """Bulk insert kill events that carry deterministic _ids, ignoring duplicates
+
+        Returns the set of _ids that were newly inserted.
+        """
+        if not kill_events:
+            return set()
+
+        for kill_event in kill_events:
+            if "_id" not in kill_event:
+                kill_event["_id"] = make_kill_event_id(
+                    kill_event.get("guild_id"), kill_event.get("server_id"), kill_event
+                )
+
+        if self.uses_kill_buckets:
+            return await self._insert_kill_event_buckets(kill_events)
+
+        all_ids = [kill_event["_id"] for kill_event in kill_events]
+        try:
+            await self.kill_events.insert_many(kill_events, ordered=False)
+            return set(all_ids)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            other_errors = [err for err in write_errors if err.get("code") != 11000]
+            if other_errors:
+                logger.error(f"Kill event bulk insert had {len(other_errors)} non-duplicate errors: {other_errors[0].get('errmsg')}")
+
+            failed_indexes = {err.get("index") for err in write_errors}
+            inserted = {event_id for index, event_id in enumerate(all_ids) if index not in failed_indexes}
+            skipped = len(all_ids) - len(inserted)
+            if skipped:
+                logger.debug(f"Skipped {skipped} already recorded kill events")
+            return inserted
+
+    async def record_kill_aggregates(self, guild_id: int, server_id: str, kill_events: List[Dict[str, Any]],
+                                     best_streaks: Optional[Dict[str, int]] = None):
+        """Update every ingest-maintained view for newly recorded kill events and mark the server dirty"""
+        await self.update_player_profiles(guild_id, server_id, kill_events, best_streaks)
+        await self.update_weapon_counters(guild_id, server_id, kill_events)
+        try:
+            players = {event.get("killer") for event in kill_events} | {event.get("victim") for event in kill_events}
+            get_name_index().add_characters(guild_id, players)
+            await get_leaderboard_topk().refresh_players(self, guild_id, server_id, players)
+        except Exception as e:
+            logger.error(f"Failed to update in-memory leaderboards: {e}")
+        await get_cache().invalidate_leaderboard_snapshots(guild_id, server_id)
+
+    async def update_player_profiles(self, guild_id: int, server_id: str, kill_events: List[Dict[str, Any]],
+                                     best_streaks: Optional[Dict[str, int]] = None):
+        """Fold newly recorded kill events into the player_profiles materialized view"""
+        try:
+            operations = player_profiles.build_profile_operations(guild_id, server_id, kill_events, best_streaks)
+            if operations:
+                await self.player_profiles.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to update player profiles: {e}")
+
+    async def update_weapon_counters(self, guild_id: int, server_id: str, kill_events: List[Dict[str, Any]]):
+        """Fold newly recorded kill events into the per-server weapon/killer counters"""
+        try:
+            operations = weapon_counters.build_counter_operations(guild_id, server_id, kill_events)
+            if operations:
+                await self.weapon_counters.bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.error(f"Failed to update weapon counters: {e}")
+
+    async def _insert_kill_event_buckets(self, kill_events: List[Dict[str, Any]]) -> set:
+        """Append kill events to their hourly buckets, skipping ids already in a bucket
+
+        Each kill is pushed by its own conditional upsert on the bucket's ids array, so concurrent
+        ingests of the same batch cannot both add it. The filter is not a plain equality, so MongoDB
+        does not retry an upsert that lost the race to create a bucket; those are re-issued once.
+        """
+        buckets = kill_event_buckets.group_into_buckets(kill_events)
+
+        operations = []
+        kill_ids = []
+        seen = set()
+        for bucket_id, bucket in buckets.items():
+            for kill_event in bucket["kills"]:
+                if kill_event["_id"] in seen:
+                    continue
+                seen.add(kill_event["_id"])
+                kill_ids.append(kill_event["_id"])
+                operations.append(UpdateOne(
+                    {"_id": bucket_id, "ids": {"$ne": kill_event["_id"]}},
+                    {
+                        "$setOnInsert": {
+                            "guild_id": bucket["guild_id"],
+                            "server_id": bucket["server_id"],
+                            "hour": bucket["hour"]
+                        },
+                        "$push": {"ids": kill_event["_id"], "k": kill_event_buckets.to_kill_tuple(kill_event)},
+                        "$inc": {"count": 1}
+                    },
+                    upsert=True
+                ))
+
+        if not operations:
+            return set()
+
+        inserted = set(kill_ids)
+        failed = await self._write_kill_bucket_operations(operations)
+        if failed:
+            # Either the bucket already holds the id or another ingest created the bucket first;
+            # once the bucket exists the retry tells the two apart
+            retry_failed = await self._write_kill_bucket_operations([operations[index] for index in failed])
+            inserted.difference_update(kill_ids[failed[index]] for index in retry_failed)
+
+        skipped = len(kill_events) - len(inserted)
+        if skipped:
+            logger.debug(f"Skipped {skipped} already recorded kill events")
+        return inserted
+
+    async def _write_kill_bucket_operations(self, operations: List[UpdateOne]) -> List[int]:
+        """Run bucket upserts, returning the indexes that failed with a duplicate key"""
+        try:
+            await self.kill_event_buckets.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            duplicates = []
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") != 11000:
+                    raise
+                duplicates.append(error["index"])
+            return sorted(duplicates)
+        return []
+
+    def find_kill_events(self, query: Dict[str, Any], sort: Optional[List[tuple]] = None, limit: int = 0):
+        """Query kill events in either storage mode, returning an async cursor of per-kill documents"""
+        if self.uses_kill_buckets:
+            pipeline = kill_event_buckets.expand_stages(query)
+            if sort:
+                pipeline.append({"$sort": dict(sort)})
+            if limit:
+                pipeline.append({"$limit": limit})
+            return self.kill_event_buckets.aggregate(pipeline)
+
+        cursor = self.kill_events.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return cursor
+
+    def aggregate_kill_events(self, pipeline: List[Dict[str, Any]]):
+        """Run a kill_events aggregation pipeline in either storage mode"""
+        if self.uses_kill_buckets:
+            return self.kill_event_buckets.aggregate(kill_event_buckets.rewrite_pipeline(pipeline))
+        return self.kill_events.aggregate(pipeline)
+
+    async def count_kill_events(self, query: Dict[str, Any]) -> int:
+        """Count kill events matching a query in either storage mode"""
+        if self.uses_kill_buckets:
+            result = await self.aggregate_kill_events([{"$match": query}, {"$count": "count"}]).to_list(length=1)
+            return result[0]["count"] if result else 0
+        return await self.kill_events.count_documents(query)
+
+    async def clear_server_kill_events(self, guild_id: int, server_id: str) -> int:
+        """Delete all kill events for a server, returning the number of kills removed"""
+        query = {"guild_id": guild_id, "server_id": server_id}
+        # Profiles mix every server's kills, so this server's share is taken out before re-ingest adds it back
+        try:
+            await player_profiles.subtract_server_profiles(self, guild_id, server_id)
+        except Exception as e:
+            logger.error(f"Failed to subtract server {server_id} from player profiles of guild {guild_id}: {e}")
+
+        # Counters are rebuilt by re-ingesting the server's history
+        await self.weapon_counters.delete_many(query)
+        get_leaderboard_topk().invalidate_server(guild_id, server_id)
+        if self.uses_kill_buckets:
+            removed = await self.count_kill_events(query)
+            await self.kill_event_buckets.delete_many(query)
+        else:
+            removed = (await self.kill_events.delete_many(query)).deleted_count
+        # Re-ingest brings back kills retention already rolled up, so the server's rollups and cursors go too
+        await get_retention_manager(self).forget_server(guild_id, server_id)
+        return removed
 
     async def increment_player_kill(self, guild_id: int, server_id: str, player_name: str, distance: float = 0.0, event_timestamp: Optional[datetime] = None):
         """Increment player kill count and update streak/distance stats with chronological validation"""
@@ -992,6 +1143,7 @@ class DatabaseManager:
                 update_data["last_kill_timestamp"] = event_timestamp
 
             await self.update_pvp_stats(guild_id, server_id, player_name, update_data)
+            return longest_streak
 
         except Exception as e:
             logger.error(f"Failed to increment player kill: {e}")
@@ -1010,21 +1162,11 @@ class DatabaseManager:
             logger.error(f"Failed to increment player death: {e}")
 
     async def find_player_by_character_name(self, guild_id: int, character_name: str) -> Optional[Dict]:
-        """Find a player document by searching linked character names (case-insensitive, space-normalized)"""
+        """Find a player document by character name (case-insensitive, space-normalized index point read)"""
         try:
-            # Normalize the search term
-            normalized_search = ' '.join(character_name.strip().split())
-
-            # Create case-insensitive regex pattern
-            escaped_search = normalized_search.replace(' ', r'\s+')
-            pattern = f"^{escaped_search}$"
-
             player_doc = await self.pvp_data.find_one({
                 "guild_id": guild_id,
-                "player_name": {
-                    "$regex": pattern,
-                    "$options": "i"
-                }
+                "player_name_key": make_player_name_key(character_name)
             })
 
             return player_doc
@@ -1035,9 +1177,11 @@ class DatabaseManager:
 
     async def get_recent_kills(self, guild_id: int, server_id: str, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent kill events for server"""
-        cursor = self.kill_events.find(
-            {"guild_id": guild_id, "server_id": server_id}
-        ).sort("timestamp", -1).limit(limit)
+        cursor = self.find_kill_events(
+            {"guild_id": guild_id, "server_id": server_id},
+            sort=[("timestamp", -1)],
+            limit=limit
+        )
 
         return await cursor.to_list(length=limit)
 
@@ -1169,36 +1313,11 @@ class DatabaseManager:
             return False
 
     async def get_active_player_count(self, guild_id: int, server_name: str) -> int:
-        """Get count of active (online) players for a specific server with automatic cleanup"""
+        """Get count of active (online) players for a specific server from the presence registry"""
         try:
-            # First, clean up stale sessions (older than 30 minutes should be considered disconnected)
-            stale_cutoff = datetime.now(timezone.utc) - timedelta(minutes=30)
-            
-            stale_cleanup = await self.player_sessions.update_many(
-                {
-                    "guild_id": guild_id,
-                    "server_name": server_name,
-                    "state": "online",
-                    "last_updated": {"$lt": stale_cutoff}
-                },
-                {
-                    "$set": {
-                        "state": "offline",
-                        "last_updated": datetime.now(timezone.utc)
-                    }
-                }
-            )
-            
-            if stale_cleanup.modified_count > 0:
-                logger.info(f"Auto-cleaned {stale_cleanup.modified_count} stale online sessions for {server_name}")
-            
-            # Now count actual online players
-            count = await self.player_sessions.count_documents({
-                "guild_id": guild_id,
-                "server_name": server_name,
-                "state": "online"
-            })
-            return count
+            tracker = get_presence_tracker()
+            await tracker.ensure_guild_seeded(self, guild_id)
+            return tracker.get_online_count(guild_id, server_name=server_name)
         except Exception as e:
             logger.error(f"Failed to get active player count for {server_name}: {e}")
             return 0
@@ -1257,6 +1376,25 @@ class DatabaseManager:
 
         return await cursor.to_list(length=limit)
 
+    async def get_top_kdr(self, guild_id: int, limit: int = 10, server_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top qualified players by KDR, read in order from the qualified_kdr index"""
+        query: Dict[str, Any] = {"guild_id": guild_id, "qualified": True}
+        if server_id and server_id != "all":
+            query["server_id"] = server_id
+        else:
+            # An $in over the guild's servers lets the index merge-sort per server instead of sorting in memory
+            guild_config = await self.guild_configs.find_one({"guild_id": guild_id}, {"servers._id": 1, "servers.server_id": 1})
+            server_ids = [
+                str(server.get("_id") or server.get("server_id"))
+                for server in (guild_config or {}).get("servers", [])
+                if server.get("_id") or server.get("server_id")
+            ]
+            if server_ids:
+                query["server_id"] = {"$in": server_ids}
+
+        cursor = self.pvp_data.find(query).sort("kdr", -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
     # LOG PARSER SUPPORT METHODS
     async def get_active_premium_servers(self) -> List[Dict[str, Any]]:
         """Get all active premium servers for log parser"""
@@ -1272,14 +1410,19 @@ class DatabaseManager:
                 ]
             }).to_list(length=None)
 
-            # Get server names from guild configurations
+            # Get server names from all the guild configurations involved in one query
+            guild_ids = list({premium_doc.get("guild_id") for premium_doc in premium_servers})
+            guild_configs = {
+                guild_config.get("guild_id"): guild_config
+                async for guild_config in self.guilds.find({"guild_id": {"$in": guild_ids}}, {"guild_id": 1, "servers": 1})
+            }
+
             result = []
             for premium_doc in premium_servers:
                 guild_id = premium_doc.get("guild_id")
                 server_id = premium_doc.get("server_id")
 
-                # Find the guild config to get server name
-                guild_config = await self.guilds.find_one({"guild_id": guild_id})
+                guild_config = guild_configs.get(guild_id)
                 if guild_config:
                     servers = guild_config.get("servers", [])
                     for server in servers:
@@ -1303,9 +1446,11 @@ class DatabaseManager:
     async def get_recent_log_events(self, server_id: str, limit: int = 100) -> List[Dict[str, Any]]:
         """Get recent log events for a server"""
         try:
-            cursor = self.kill_events.find(
-                {"server_id": server_id}
-            ).sort("timestamp", -1).limit(limit)
+            cursor = self.find_kill_events(
+                {"server_id": server_id},
+                sort=[("timestamp", -1)],
+                limit=limit
+            )
 
             return await cursor.to_list(length=limit)
 
@@ -1455,6 +1600,7 @@ class DatabaseManager:
                     "$currentDate": {"last_updated": True}
                 }
             )
+            get_channel_routes().invalidate(guild_id)
             return result.modified_count > 0
         except Exception as e:
             logger.error(f"Failed to update server config: {e}")
@@ -1578,6 +1724,7 @@ class DatabaseManager:
             if empty_factions:
                 faction_ids = [f['_id'] for f in empty_factions]
                 result = await self.factions.delete_many({'_id': {'$in': faction_ids}})
+                get_name_index().invalidate_factions()
                 logger.info(f"Cleaned up {result.deleted_count} empty factions")
 
         except Exception as e:
@@ -1680,20 +1827,7 @@ class DatabaseManager:
 
     async def count_premium_servers(self, guild_id: int) -> int:
         """Count active premium servers for guild"""
-        try:
-            count = await self.server_premium_status.count_documents({
-                "guild_id": guild_id,
-                "is_active": True,
-                "$or": [
-                    {"expires_at": {"$exists": False}},
-                    {"expires_at": None},
-                    {"expires_at": {"$gt": datetime.now(timezone.utc)}}
-                ]
-            })
-            return count
-        except Exception as e:
-            logger.error(f"Failed to count premium servers: {e}")
-            return 0
+        return await get_premium_entitlements().count_premium_servers(self, guild_id)
 
     async def activate_server_premium(self, guild_id: int, server_id: str, activated_by: int, reason: Optional[str] = None) -> bool:
         """Activate premium for a server"""
@@ -1711,6 +1845,7 @@ class DatabaseManager:
                 },
                 upsert=True
             )
+            get_premium_entitlements().grant(guild_id, server_id)
             return True
         except Exception as e:
             logger.error(f"Failed to activate server premium: {e}")
@@ -1730,6 +1865,7 @@ class DatabaseManager:
                     }
                 }
             )
+            get_premium_entitlements().revoke(guild_id, server_id)
             return True
         except Exception as e:
             logger.error(f"Failed to deactivate server premium: {e}")
@@ -1737,30 +1873,11 @@ class DatabaseManager:
 
     async def is_server_premium(self, guild_id: int, server_id: str) -> bool:
         """Check if a specific server is premium"""
-        try:
-            doc = await self.server_premium_status.find_one({
-                "guild_id": guild_id,
-                "server_id": server_id,
-                "is_active": True,
-                "$or": [
-                    {"expires_at": {"$exists": False}},
-                    {"expires_at": None},
-                    {"expires_at": {"$gt": datetime.now(timezone.utc)}}
-                ]
-            })
-            return doc is not None
-        except Exception as e:
-            logger.error(f"Failed to check server premium status: {e}")
-            return False
+        return await get_premium_entitlements().is_server_premium(self, guild_id, server_id)
 
     async def has_premium_access(self, guild_id: int) -> bool:
         """Check if guild has premium access (any server is premium)"""
-        try:
-            count = await self.count_premium_servers(guild_id)
-            return count > 0
-        except Exception as e:
-            logger.error(f"Failed to check premium access: {e}")
-            return False
+        return await get_premium_entitlements().has_premium_access(self, guild_id)
 
     async def list_premium_servers(self, guild_id: int) -> List[Dict[str, Any]]:
         """List all premium servers for guild"""
@@ -0,0 +1,222 @@
+"""
+Emerald's Killfeed - Versioned Database Migrations
+One-time data fixes gated by a stored schema version so a current database skips them entirely
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import List, Tuple, Callable, Awaitable
+
+from pymongo import UpdateOne
+
+from bot.utils.player_profiles import rebuild_player_profiles
+from bot.utils.weapon_counters import rebuild_weapon_counters
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION_ID = "schema_version"
+
+# Numeric string guild ids become longs; anything unconvertible is left as it is instead of failing the update
+_GUILD_ID_TO_LONG = {"$convert": {"input": "$guild_id", "to": "long", "onError": "$guild_id", "onNull": "$guild_id"}}
+
+
+async def _delete_duplicates(collection, key: dict) -> int:
+    """Delete all but the newest document per logical key using a server-side $group"""
+    pipeline = [
+        {"$sort": {"last_updated": -1, "_id": -1}},
+        {"$group": {"_id": key, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$project": {"duplicates": {"$slice": ["$ids", 1, {"$subtract": ["$count", 1]}]}}}
+    ]
+
+    deleted = 0
+    async for group in collection.aggregate(pipeline, allowDiskUse=True):
+        result = await collection.delete_many({"_id": {"$in": group["duplicates"]}})
+        deleted += result.deleted_count
+    return deleted
+
+
+async def dedupe_parser_states(db_manager):
+    """Normalize parser_states types, drop malformed documents and collapse duplicates"""
+    await db_manager.parser_states.update_many(
+        {"guild_id": {"$type": "string", "$ne": ""}},
+        [{"$set": {"guild_id": _GUILD_ID_TO_LONG}}]
+    )
+
+    malformed = await db_manager.parser_states.delete_many({
+        "$or": [
+            {"guild_id": {"$exists": False}},
+            {"server_id": {"$exists": False}},
+            {"guild_id": {"$in": [None, ""]}},
+            {"server_id": {"$in": [None, ""]}}
+        ]
+    })
+
+    duplicates = await _delete_duplicates(db_manager.parser_states, {
+        "guild_id": "$guild_id",
+        "server_id": {"$toString": "$server_id"},
+        "parser_type": {"$ifNull": ["$parser_type", "log_parser"]}
+    })
+    logger.info(f"parser_states: removed {malformed.deleted_count} malformed and {duplicates} duplicate documents")
+
+
+async def dedupe_player_sessions(db_manager):
+    """Normalize player_sessions types, drop sessions without an EOS ID and collapse duplicates"""
+    await db_manager.player_sessions.update_many(
+        {"guild_id": {"$type": "string", "$ne": ""}},
+        [{"$set": {"guild_id": _GUILD_ID_TO_LONG}}]
+    )
+
+    malformed = await db_manager.player_sessions.delete_many({
+        "$or": [
+            {"guild_id": {"$in": [None, ""]}},
+            {"server_id": {"$in": [None, ""]}},
+            {"eos_id": {"$in": [None, ""]}}
+        ]
+    })
+
+    duplicates = await _delete_duplicates(db_manager.player_sessions, {
+        "guild_id": "$guild_id",
+        "server_id": {"$toString": "$server_id"},
+        "eos_id": "$eos_id"
+    })
+    logger.info(f"player_sessions: removed {malformed.deleted_count} malformed and {duplicates} duplicate documents")
+
+
+async def drop_legacy_session_indexes(db_manager):
+    """Drop player_id based session indexes that conflict with EOS ID tracking"""
+    existing = await db_manager.player_sessions.index_information()
+    for name, info in existing.items():
+        fields = [field for field, _ in info.get("key", [])]
+        if "player_id" in fields:
+            await db_manager.player_sessions.drop_index(name)
+            logger.info(f"player_sessions: dropped legacy index {name}")
+
+
+async def backfill_session_defaults(db_manager):
+    """Give sessions written by older versions a state and server name"""
+    await db_manager.player_sessions.update_many(
+        {"state": {"$exists": False}},
+        {"$set": {"state": "offline"}}
+    )
+    await db_manager.player_sessions.update_many(
+        {"server_name": {"$exists": False}},
+        {"$set": {"server_name": "Unknown"}}
+    )
+
+
+async def remove_hardcoded_log_paths(db_manager):
+    """Strip hardcoded log_path/base_path from server configs so the dynamic path is used"""
+    result = await db_manager.guild_configs.update_many(
+        {"$or": [{"servers.log_path": {"$exists": True}}, {"servers.base_path": {"$exists": True}}]},
+        {"$unset": {"servers.$[].log_path": "", "servers.$[].base_path": ""}}
+    )
+    logger.info(f"guild_configs: removed hardcoded log paths from {result.modified_count} guilds")
+
+
+async def backfill_weapon_counters(db_manager):
+    """Build weapon/killer counters from existing kill history"""
+    await rebuild_weapon_counters(db_manager)
+
+
+async def backfill_player_name_keys(db_manager, batch_size: int = 1000):
+    """Give every pvp_data document the normalized player_name_key used for name lookups"""
+    from bot.models.database import make_player_name_key
+
+    updated = 0
+    operations = []
+    cursor = db_manager.pvp_data.find({"player_name_key": {"$exists": False}}, {"player_name": 1})
+    async for doc in cursor:
+        operations.append(UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": {"player_name_key": make_player_name_key(doc.get("player_name"))}}
+        ))
+        if len(operations) >= batch_size:
+            await db_manager.pvp_data.bulk_write(operations, ordered=False)
+            updated += len(operations)
+            operations = []
+    if operations:
+        await db_manager.pvp_data.bulk_write(operations, ordered=False)
+        updated += len(operations)
+    logger.info(f"pvp_data: backfilled player_name_key on {updated} documents")
+
+
+async def backfill_player_profiles(db_manager):
+    """Build player profiles for every guild with existing stats"""
+    for guild_id in await db_manager.pvp_data.distinct("guild_id"):
+        if isinstance(guild_id, int):
+            await rebuild_player_profiles(db_manager, guild_id)
+
+
+async def backfill_kill_bucket_ids(db_manager):
+    """Give kill event buckets the ids array their conditional pushes filter on"""
+    result = await db_manager.kill_event_buckets.update_many(
+        {"ids": {"$exists": False}},
+        [{"$set": {"ids": {"$map": {"input": "$k", "in": {"$arrayElemAt": ["$$this", 0]}}}}}]
+    )
+    logger.info(f"kill_event_buckets: backfilled ids on {result.modified_count} buckets")
+
+
+# Ordered (version, name, migration) list; append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[..., Awaitable[None]]]] = [
+    (1, "dedupe_parser_states", dedupe_parser_states),
+    (2, "dedupe_player_sessions", dedupe_player_sessions),
+    (3, "drop_legacy_session_indexes", drop_legacy_session_indexes),
+    (4, "backfill_session_defaults", backfill_session_defaults),
+    (5, "remove_hardcoded_log_paths", remove_hardcoded_log_paths),
+    (6, "backfill_weapon_counters", backfill_weapon_counters),
+    (7, "backfill_player_name_keys", backfill_player_name_keys),
+    (8, "backfill_player_profiles", backfill_player_profiles),
+    (9, "backfill_kill_bucket_ids", backfill_kill_bucket_ids),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+async def get_schema_version(db_manager) -> int:
+    """Read the stored schema version, 0 if never recorded"""
+    doc = await db_manager.bot_config.find_one({"_id": SCHEMA_VERSION_ID})
+    return int(doc.get("version", 0)) if doc else 0
+
+
+async def _set_schema_version(db_manager, version: int, name: str):
+    await db_manager.bot_config.update_one(
+        {"_id": SCHEMA_VERSION_ID},
+        {
+            "$set": {"version": version, "updated_at": datetime.now(timezone.utc)},
+            "$push": {"applied": {"version": version, "name": name, "applied_at": datetime.now(timezone.utc)}}
+        },
+        upsert=True
+    )
+
+
+async def run_migrations(db_manager) -> int:
+    """Apply pending migrations in order and return the resulting schema version"""
+    version = await get_schema_version(db_manager)
+    if version >= LATEST_VERSION:
+        logger.debug(f"Database schema is current (v{version})")
+        return version
+
+    if version == 0:
+        # A fresh database has nothing to migrate
+        populated = False
+        for collection in (db_manager.parser_states, db_manager.player_sessions, db_manager.guild_configs):
+            if await collection.estimated_document_count() > 0:
+                populated = True
+                break
+        if not populated:
+            await _set_schema_version(db_manager, LATEST_VERSION, "fresh_install")
+            logger.info(f"Fresh database stamped at schema v{LATEST_VERSION}")
+            return LATEST_VERSION
+
+    for migration_version, name, migration in MIGRATIONS:
+        if migration_version <= version:
+            continue
+
+        logger.info(f"Applying migration v{migration_version}: {name}")
+        await migration(db_manager)
+        await _set_schema_version(db_manager, migration_version, name)
+        version = migration_version
+
+    logger.info(f"Database schema migrated to v{version}")
+    return version
@@ -23,6 +23,8 @@ import discord
 from discord.ext import commands
 
 from .killfeed_parser import KillfeedParser
+from bot.models.database import make_player_name_key
+from bot.utils.leaderboard_topk import get_leaderboard_topk
 
 logger = logging.getLogger(__name__)
 
@@ -682,7 +684,7 @@ class HistoricalParser:
                 "server_id": server_id
             })
             
-            current_kill_count = await self.bot.db_manager.kill_events.count_documents({
+            current_kill_count = await self.bot.db_manager.count_kill_events({
                 "guild_id": guild_id,
                 "server_id": server_id
             })
@@ -696,12 +698,9 @@ class HistoricalParser:
             })
 
             # Clear kill events
-            kill_result = await self.bot.db_manager.kill_events.delete_many({
-                "guild_id": guild_id,
-                "server_id": server_id
-            })
+            kills_deleted = await self.bot.db_manager.clear_server_kill_events(guild_id, server_id)
 
-            logger.info(f"✅ Cleared PvP data for server {server_id}: {pvp_result.deleted_count} PvP records, {kill_result.deleted_count} kill events")
+            logger.info(f"✅ Cleared PvP data for server {server_id}: {pvp_result.deleted_count} PvP records, {kills_deleted} kill events")
 
         except Exception as e:
             logger.error(f"Failed to clear server data: {e}")
@@ -991,7 +990,11 @@ class HistoricalParser:
                                 },
                                 {
                                     "$inc": {"kills": 1},
-                                    "$setOnInsert": {"deaths": 0, "suicides": 0}
+                                    "$setOnInsert": {
+                                        "deaths": 0,
+                                        "suicides": 0,
+                                        "player_name_key": make_player_name_key(kill_data['killer'])
+                                    }
                                 },
                                 upsert=True
                             )
@@ -1006,7 +1009,7 @@ class HistoricalParser:
                             },
                             {
                                 "$inc": {update_field: 1},
-                                "$setOnInsert": {"kills": 0}
+                                "$setOnInsert": {"kills": 0, "player_name_key": make_player_name_key(kill_data['victim'])}
                             },
                             upsert=True
                         )
@@ -1039,6 +1042,10 @@ class HistoricalParser:
                 if batch_end < len(kill_events_buffer):
                     await asyncio.sleep(0.05)  # 50ms pause between batches
 
+            # Bulk $inc writes above bypass the per-kill KDR and leaderboard updates
+            await self.bot.db_manager.refresh_kdr(guild_id, server_id)
+            get_leaderboard_topk().invalidate_server(guild_id, server_id)
+
             # Complete the refresh
             duration = (datetime.now() - start_time).total_seconds()
 
@@ -83,10 +83,13 @@ class KillfeedParser:
             return {
                 'timestamp': timestamp,
                 'killer': killer,
+                'killer_id': killer_id,
                 'victim': victim,
+                'victim_id': victim_id,
                 'weapon': weapon,
                 'distance': distance_float,
-                'is_suicide': is_suicide
+                'is_suicide': is_suicide,
+                'raw_line': line.strip()
             }
 
         except Exception as e:
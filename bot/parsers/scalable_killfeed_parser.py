@@ -51,8 +51,9 @@ class ScalableKillfeedParser:
             
             logger.info(f"📊 Scalable killfeed parser completed: {successful_guilds} guilds, {total_processed} servers processed, {total_skipped} servers skipped")
             
-            # Cleanup stale sessions periodically
+            # Persist parser states and cleanup stale sessions periodically
             if self.state_manager:
+                await self.state_manager.flush_states()
                 await self.state_manager.cleanup_stale_sessions()
             
         except Exception as e:
@@ -63,18 +64,11 @@ class ScalableKillfeedParser:
         guilds_with_servers = {}
         
         try:
-            # Use direct MongoDB connection for thread safety
-            import os
-            from motor.motor_asyncio import AsyncIOMotorClient
-            
-            mongo_uri = os.environ.get('MONGO_URI')
-            if not mongo_uri:
-                logger.error("MONGO_URI not available")
+            if not getattr(self.bot, 'db_manager', None):
+                logger.error("Database manager not available")
                 return guilds_with_servers
             
-            client = AsyncIOMotorClient(mongo_uri)
-            database = client.emerald_killfeed
-            collection = database.guild_configs
+            collection = self.bot.db_manager.guild_configs
             
             # Find guilds with enabled servers for killfeed processing
             cursor = collection.find({
@@ -5,11 +5,13 @@ Enterprise-grade unified log processing with Deadside.log focus, file rotation d
 
 import asyncio
 import logging
+import os
 import discord
 from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 from bot.utils.scalable_unified_processor import ScalableUnifiedProcessor
 from bot.utils.shared_parser_state import get_shared_state_manager
+from bot.utils.presence_tracker import get_presence_tracker
 
 logger = logging.getLogger(__name__)
 
@@ -22,14 +24,18 @@ class ScalableUnifiedParser:
         self.state_manager = get_shared_state_manager()
         self.activity_tracker = {}  # Track server activity levels
         self.last_activity_check = None
-        self.bot_startup_time = datetime.now(timezone.utc)  # Track bot startup for cold start detection
+        self._parser_states: Dict[tuple, Dict[str, Any]] = {}  # Unified parser states loaded per run
+        self._pending_parser_states: Dict[tuple, Dict[str, Any]] = {}  # States to commit at the end of the run
+        self._started_servers: set = set()  # Servers cold or warm started since boot; later runs are plain hot starts
+        # Older warm-restart snapshots are ignored so a long outage is not replayed as a burst of embeds
+        self.warm_restart_max_age = int(os.getenv('WARM_RESTART_MAX_AGE', '1800'))
         
     async def run_log_parser(self):
         """Main scheduled unified log parser execution with cold/hot start modes"""
         try:
             logger.info("🔍 Starting scalable unified log parser run...")
             
-            # Get all guilds with servers configured
+            # Load all guild configs and all unified parser states (two queries total)
             guild_configs = await self._get_all_guild_configs()
             
             if not guild_configs:
@@ -39,57 +45,31 @@ class ScalableUnifiedParser:
             total_servers = sum(len(servers) for servers in guild_configs.values())
             logger.info(f"🔍 Scalable unified parser: Processing {len(guild_configs)} guilds with {total_servers} total servers")
             
-            # Determine cold vs hot start mode for each guild
-            for guild_id, servers in guild_configs.items():
-                try:
-                    # MANDATORY COLD START: Force cold start for first 5 minutes after bot startup
-                    time_since_startup = (datetime.now(timezone.utc) - self.bot_startup_time).total_seconds()
-                    force_cold_start = time_since_startup < 300  # 5 minutes
-                    
-                    if force_cold_start:
-                        logger.info(f"🔧 Guild {guild_id}: MANDATORY COLD START (bot startup < 5 min) for {len(servers)} servers")
-                        processor = ScalableUnifiedProcessor(self.bot)
-                        await self._process_guild_with_mode(guild_id, servers, processor, is_cold_start=True)
-                        continue
-                    
-                    # Check if parser state exists for this guild AND all its servers
-                    guild_parser_state = await self.bot.db_manager.parser_states.find_one({
-                        'guild_id': guild_id,
-                        'parser_type': 'unified'
-                    })
-                    
-                    # Check if any servers are new (don't have parser state)
-                    new_servers = []
-                    existing_servers = []
-                    
-                    for server_config in servers:
-                        server_id = server_config.get('server_id', 'default')
-                        server_parser_state = await self.bot.db_manager.parser_states.find_one({
-                            'guild_id': guild_id,
-                            'server_id': server_id,
-                            'parser_type': 'unified'
-                        })
+            self._parser_states = await self._load_unified_parser_states()
+            self._pending_parser_states = {}
+            
+            try:
+                for guild_id, cold_servers, hot_servers in self._plan_run(guild_configs):
+                    try:
+                        # Process new servers with COLD start
+                        if cold_servers:
+                            logger.info(f"🔧 Guild {guild_id}: COLD START for {len(cold_servers)} servers")
+                            processor = ScalableUnifiedProcessor(self.bot)
+                            await self._process_guild_with_mode(guild_id, cold_servers, processor, is_cold_start=True)
                         
-                        if server_parser_state:
-                            existing_servers.append(server_config)
-                        else:
-                            new_servers.append(server_config)
-                    
-                    # Process new servers with COLD start
-                    if new_servers:
-                        logger.info(f"🔧 Guild {guild_id}: COLD START for {len(new_servers)} new servers")
-                        processor = ScalableUnifiedProcessor(self.bot)
-                        await self._process_guild_with_mode(guild_id, new_servers, processor, is_cold_start=True)
-                    
-                    # Process existing servers with HOT start
-                    if existing_servers:
-                        logger.info(f"🔧 Guild {guild_id}: HOT START for {len(existing_servers)} existing servers")
-                        processor = ScalableUnifiedProcessor(self.bot)
-                        await self._process_guild_with_mode(guild_id, existing_servers, processor, is_cold_start=False)
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process guild {guild_id}: {e}")
-                    continue
+                        # Process existing servers with HOT start
+                        if hot_servers:
+                            logger.info(f"🔧 Guild {guild_id}: HOT START for {len(hot_servers)} existing servers")
+                            processor = ScalableUnifiedProcessor(self.bot)
+                            await self._process_guild_with_mode(guild_id, hot_servers, processor, is_cold_start=False)
+                        
+                    except Exception as e:
+                        logger.error(f"Failed to process guild {guild_id}: {e}")
+                        continue
+            finally:
+                # Checkpoint presence before the offsets that produced it, then commit every updated parser state in one round trip
+                await get_presence_tracker().checkpoint(self.bot.db_manager)
+                await self._commit_parser_states()
             
             logger.info(f"✅ Scalable unified parser completed processing for {len(guild_configs)} guilds")
             
@@ -98,10 +78,53 @@ class ScalableUnifiedParser:
             import traceback
             logger.error(f"Parser traceback: {traceback.format_exc()}")
     
+    async def _load_unified_parser_states(self) -> Dict[tuple, Dict[str, Any]]:
+        """Load every unified parser state in one query, keyed by (guild_id, server_id)"""
+        states = {}
+        try:
+            cursor = self.bot.db_manager.parser_states.find(
+                {'parser_type': 'unified'},
+                {'_id': 0, 'guild_id': 1, 'server_id': 1, 'last_timestamp': 1,
+                 'log_state': 1, 'presence': 1, 'last_updated': 1}
+            )
+            async for state in cursor:
+                states[(state.get('guild_id'), str(state.get('server_id')))] = state
+        except Exception as e:
+            logger.error(f"Failed to load unified parser states: {e}")
+        return states
+    
+    def _has_warm_snapshot(self, parser_state: Dict[str, Any]) -> bool:
+        """Check whether a stored parser state carries a recent offset and presence snapshot"""
+        last_updated = parser_state.get('last_updated')
+        if not parser_state.get('log_state') or 'presence' not in parser_state or not isinstance(last_updated, datetime):
+            return False
+        if last_updated.tzinfo is None:
+            last_updated = last_updated.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - last_updated).total_seconds() <= self.warm_restart_max_age
+    
+    def _plan_run(self, guild_configs: Dict[int, List[Dict[str, Any]]]) -> List[tuple]:
+        """Split each guild's servers into cold and hot work from the preloaded parser states
 
+        The first run after boot hot starts only servers with a warm-restart snapshot; the snapshot is
+        validated against the log file when it is read (see _process_guild_with_mode).
+        """
+        plan = []
+        for guild_id, servers in guild_configs.items():
+            cold_servers = []
+            hot_servers = []
+            for server_config in servers:
+                key = (guild_id, str(server_config.get('server_id', 'default')))
+                parser_state = self._parser_states.get(key)
+                if parser_state and (key in self._started_servers or self._has_warm_snapshot(parser_state)):
+                    hot_servers.append(server_config)
+                else:
+                    cold_servers.append(server_config)
+            plan.append((guild_id, cold_servers, hot_servers))
+        return plan
     
-    async def _process_guild_with_mode(self, guild_id: int, servers: List[Dict], processor, is_cold_start: bool):
-        """Process guild with cold or hot start mode"""
+    async def _process_guild_with_mode(self, guild_id: int, servers: List[Dict], processor, is_cold_start: bool,
+                                       log_data: Optional[str] = None):
+        """Process guild with cold or hot start mode (log_data: already fetched log of a single cold server)"""
         try:
             for server_config in servers:
                 server_id = server_config.get('server_id', 'default')
@@ -114,7 +137,8 @@ class ScalableUnifiedParser:
                     # Process all log data chronologically from beginning
                     events = await processor.process_log_data_cold_start(
                         server_config=server_config,
-                        guild_id=guild_id
+                        guild_id=guild_id,
+                        log_data=log_data
                     )
                     
                     if events:
@@ -127,7 +151,9 @@ class ScalableUnifiedParser:
                         await vc_manager.update_voice_channel_count(guild_id, server_id, online_count, queued_count)
                         
                         # Set parser state for future hot starts
-                        await self._set_parser_state(guild_id, server_id, events[-1].get('timestamp'))
+                        await self._set_parser_state(guild_id, server_id, events[-1].get('timestamp'),
+                                                     processor.log_states.get(str(server_id)))
+                        self._started_servers.add((guild_id, str(server_id)))
                         
                         logger.info(f"❄️ COLD START complete: {server_name} - {len(events)} events processed, voice channel updated")
                         logger.info(f"🔊 Voice channel updated: {server_name} - {online_count} online, {queued_count} queued")
@@ -136,29 +162,43 @@ class ScalableUnifiedParser:
                     # HOT START: Process new events since last run, send all embeds, update voice channel once at end
                     logger.info(f"🔥 HOT START: {server_name} - Processing new events, sending embeds")
                     
-                    # Get last parser state
-                    parser_state = await self.bot.db_manager.parser_states.find_one({
-                        'guild_id': guild_id,
-                        'server_id': server_id,
-                        'parser_type': 'unified'
-                    })
+                    # Last parser state comes from the run plan
+                    key = (guild_id, str(server_id))
+                    parser_state = self._parser_states.get(key) or {}
                     
-                    last_timestamp = parser_state.get('last_timestamp') if parser_state else None
+                    last_timestamp = parser_state.get('last_timestamp')
                     
-                    # Process only new events since last run
-                    events = await processor.process_log_data_hot_start(
-                        server_config=server_config,
-                        guild_id=guild_id,
-                        last_timestamp=last_timestamp
-                    )
+                    if key in self._started_servers:
+                        # Process only new events since last run, reading from the stored offset when the log is unchanged
+                        events = await processor.process_log_data_hot_start(
+                            server_config=server_config,
+                            guild_id=guild_id,
+                            last_timestamp=last_timestamp,
+                            log_state=parser_state.get('log_state')
+                        )
+                    else:
+                        # WARM START: first run since boot, resuming from the snapshot if the log file is the same one.
+                        # The log is fetched once; a changed file goes to the cold path with what was already read
+                        log_data = await processor.fetch_log_data(server_config, parser_state.get('log_state'))
+                        if str(server_id) not in processor.resumed_servers:
+                            logger.info(f"♨️ WARM START: {server_name} - log file changed since the snapshot, cold starting")
+                            await self._process_guild_with_mode(guild_id, [server_config], processor, is_cold_start=True,
+                                                                log_data=log_data)
+                            continue
+                        
+                        events = processor.parse_log_data(log_data, server_config, guild_id, last_timestamp) if log_data else []
+                        await get_presence_tracker().restore_active(
+                            self.bot.db_manager, guild_id, server_id, parser_state.get('presence') or []
+                        )
+                        self._started_servers.add(key)
+                        logger.info(f"♨️ WARM START: {server_name} - resumed at byte {parser_state['log_state'].get('offset')}")
+                        if not events:
+                            await self._update_voice_channel_final(guild_id, server_id, server_name)
+                    log_state = processor.log_states.get(str(server_id))
                     
                     if events:
-                        # Update player sessions and send connection embeds
-                        state_changes = await processor.update_player_sessions(events)
-                        
-                        # Send connection embeds for state changes
-                        if state_changes:
-                            await processor.send_connection_embeds_batch(state_changes)
+                        # Update player sessions; connection embeds are sent for the resulting state changes
+                        await processor.update_player_sessions(events)
                         
                         # Send game event embeds
                         game_events = [e for e in events if e.get('type') == 'event']
@@ -169,10 +209,13 @@ class ScalableUnifiedParser:
                         await self._update_voice_channel_final(guild_id, server_id, server_name)
                         
                         # Update parser state for next run
-                        await self._set_parser_state(guild_id, server_id, events[-1].get('timestamp'))
+                        await self._set_parser_state(guild_id, server_id, events[-1].get('timestamp'), log_state)
                         
                         logger.info(f"🔥 HOT START complete: {server_name} - {len(events)} events processed, embeds sent")
                     else:
+                        if log_state and log_state != parser_state.get('log_state'):
+                            # Lines without events still move the offset
+                            await self._set_parser_state(guild_id, server_id, last_timestamp, log_state)
                         logger.info(f"🔥 HOT START: {server_name} - No new events")
                         
         except Exception as e:
@@ -181,18 +224,10 @@ class ScalableUnifiedParser:
     async def _update_voice_channel_final(self, guild_id: int, server_id: str, server_name: str):
         """Update voice channel count once at the end to avoid spam"""
         try:
-            # Get online and queued player counts separately
-            online_count = await self.bot.db_manager.player_sessions.count_documents({
-                'guild_id': guild_id,
-                'server_id': server_id,
-                'state': 'online'
-            })
-            
-            queued_count = await self.bot.db_manager.player_sessions.count_documents({
-                'guild_id': guild_id,
-                'server_id': server_id,
-                'state': 'queued'
-            })
+            # Read counts from in-memory presence, seeding from the database if needed
+            tracker = get_presence_tracker()
+            await tracker.ensure_seeded(self.bot.db_manager, guild_id, server_id)
+            online_count, queued_count = tracker.get_counts(guild_id, server_id)
             
             # Update voice channel with separate counts
             from bot.utils.voice_channel_manager import VoiceChannelManager
@@ -204,23 +239,61 @@ class ScalableUnifiedParser:
         except Exception as e:
             logger.error(f"Failed to update voice channel for {server_name}: {e}")
     
-    async def _set_parser_state(self, guild_id: int, server_id: str, last_timestamp):
-        """Set parser state for next run"""
+    async def _set_parser_state(self, guild_id: int, server_id: str, last_timestamp,
+                                log_state: Optional[Dict[str, Any]] = None):
+        """Record parser state for next run; written by _commit_parser_states at the end of the run"""
+        key = (guild_id, str(server_id))
+        self._pending_parser_states[key] = {'last_timestamp': last_timestamp, 'log_state': log_state}
+        self._parser_states[key] = {'guild_id': guild_id, 'server_id': str(server_id),
+                                    'last_timestamp': last_timestamp, 'log_state': log_state}
+    
+    async def save_warm_snapshot(self):
+        """Write the offset and presence snapshot of every server started since boot (on shutdown)"""
+        for key in self._started_servers:
+            parser_state = self._parser_states.get(key)
+            if parser_state and key not in self._pending_parser_states:
+                self._pending_parser_states[key] = {
+                    'last_timestamp': parser_state.get('last_timestamp'),
+                    'log_state': parser_state.get('log_state')
+                }
+        await self._commit_parser_states()
+    
+    async def _commit_parser_states(self):
+        """Persist all parser states updated during this run in a single bulk_write
+
+        Each state carries the warm-restart snapshot: the log offset it was read up to and the
+        online/queued players at that point (presence is checkpointed just before this).
+        """
+        pending = self._pending_parser_states
+        if not pending:
+            return
+        
         try:
-            await self.bot.db_manager.parser_states.update_one(
-                {
-                    'guild_id': guild_id,
-                    'server_id': server_id,
-                    'parser_type': 'unified'
-                },
-                {
-                    '$set': {
-                        'last_timestamp': last_timestamp,
-                        'last_updated': datetime.now(timezone.utc)
-                    }
-                },
-                upsert=True
-            )
+            from pymongo import UpdateOne
+            
+            now = datetime.now(timezone.utc)
+            tracker = get_presence_tracker()
+            operations = []
+            for (guild_id, server_id), state in pending.items():
+                fields = {
+                    'last_timestamp': state['last_timestamp'],
+                    'last_updated': now
+                }
+                if state.get('log_state'):
+                    fields['log_state'] = state['log_state']
+                    fields['presence'] = tracker.snapshot_active(guild_id, server_id)
+                operations.append(UpdateOne(
+                    {
+                        'guild_id': guild_id,
+                        'server_id': server_id,
+                        'parser_type': 'unified'
+                    },
+                    {'$set': fields},
+                    upsert=True
+                ))
+            await self.bot.db_manager.parser_states.bulk_write(operations, ordered=False)
+            self._pending_parser_states = {}
+            logger.debug(f"Committed {len(operations)} unified parser states")
         except Exception as e:
             logger.error(f"Failed to set parser state: {e}")
     
@@ -338,11 +411,10 @@ class ScalableUnifiedParser:
     async def _update_voice_channel_for_guild(self, guild_id: int):
         """Update voice channel with current player count for a guild"""
         try:
-            # Get online player count from database
-            online_count = await self.bot.db_manager.player_sessions.count_documents({
-                'guild_id': guild_id,
-                'state': 'online'
-            })
+            # Get online player count from in-memory presence
+            tracker = get_presence_tracker()
+            await tracker.ensure_guild_seeded(self.bot.db_manager, guild_id)
+            online_count = tracker.get_online_count(guild_id)
             
             # Get guild configuration
             guild_config = await self.bot.db_manager.get_guild(guild_id)
@@ -540,18 +612,11 @@ class ScalableUnifiedParser:
         guild_configs = {}
         
         try:
-            # Use direct MongoDB connection for thread safety
-            import os
-            from motor.motor_asyncio import AsyncIOMotorClient
-            
-            mongo_uri = os.environ.get('MONGO_URI')
-            if not mongo_uri:
-                logger.error("MONGO_URI not available")
+            if not getattr(self.bot, 'db_manager', None):
+                logger.error("Database manager not available")
                 return guild_configs
             
-            client = AsyncIOMotorClient(mongo_uri)
-            database = client.emerald_killfeed
-            collection = database.guild_configs
+            collection = self.bot.db_manager.guild_configs
             
             # Find guilds with enabled servers
             cursor = collection.find({
@@ -12,9 +12,17 @@ from typing import Dict, List, Optional, Any
 from bot.utils.embed_factory import EmbedFactory
 from bot.parsers.components.player_lifecycle import PlayerLifecycleManager
 from bot.parsers.components.log_event_processor import LogEventProcessor
+from bot.utils.presence_tracker import get_presence_tracker
 
 logger = logging.getLogger(__name__)
 
+# Lifecycle event types mapped to presence registry connection events
+PRESENCE_EVENTS = {
+    'queue': 'player_queue',
+    'join': 'player_connect',
+    'disconnect': 'player_disconnect'
+}
+
 class UnifiedLogParser:
     """Refactored unified log parser with modular architecture"""
     
@@ -98,27 +106,6 @@ class UnifiedLogParser:
                 logger.info(f"🧊 Cold start: rebuilding current state from complete log for {server_name}")
                 self.lifecycle_manager.clear_guild_sessions(guild_id)
                 
-                # Reset ALL existing players for this guild to offline (cold start reset)
-                if hasattr(self.bot, 'db_manager'):
-                    try:
-                        reset_result = await self.bot.db_manager.player_sessions.update_many(
-                            {'guild_id': int(guild_id)},
-                            {
-                                '$set': {
-                                    'status': 'offline',
-                                    'last_seen': datetime.now(timezone.utc),
-                                    'cleanup_reason': 'Cold start reset',
-                                    'disconnected_at': datetime.now(timezone.utc)
-                                },
-                                '$unset': {
-                                    'updated_at': ''
-                                }
-                            }
-                        )
-                        logger.info(f"🔄 Cold start: Reset {reset_result.modified_count} existing players to offline for guild {guild_id}")
-                    except Exception as e:
-                        logger.error(f"Failed to reset all players to offline: {e}")
-                
                 lines_to_process = log_content.splitlines()
                 await self.rebuild_player_state(lines_to_process, guild_id, server_id)
                 embeds = []  # No embeds during cold start
@@ -128,12 +115,16 @@ class UnifiedLogParser:
                 lines_to_process = new_content.splitlines()
                 
                 # Process only new lines and generate embeds
+                await get_presence_tracker().ensure_seeded(self.bot.db_manager, guild_id, server_id)
                 embeds = await self.process_log_lines(lines_to_process, guild_id, server_id, server_name, cold_start=False)
             
             # Send embeds (only for hot start)
             if embeds:
                 await self.send_embeds(guild_id, server_id, embeds)
             
+            # Checkpoint presence before recording the log offset that produced it
+            await get_presence_tracker().flush(self.bot.db_manager, guild_id, server_id)
+            
             # Update parser state
             await self.update_parser_state(guild_id, server_id, {
                 'last_log_size': current_size,
@@ -200,28 +191,34 @@ class UnifiedLogParser:
         
         logger.info(f"🎮 Player state rebuilt: {len(active_players)} players currently online")
         
-        # Save only currently active players as online
-        if hasattr(self.bot, 'db_manager') and active_players:
-            for player_id in active_players:
-                # Get player data from lifecycle manager sessions
-                session_key = self.lifecycle_manager.get_lifecycle_key(guild_id, player_id)
-                player_session = self.lifecycle_manager.player_sessions.get(session_key)
-                
-                if player_session:
-                    # Use existing session data and ensure it's marked as online
-                    session_data = player_session.copy()
-                    session_data['status'] = 'online'
-                    session_data['last_seen'] = datetime.now(timezone.utc)
-                    
-                    try:
-                        await self.bot.db_manager.save_player_session(
-                            int(guild_id), server_id, player_id, session_data
-                        )
-                        logger.debug(f"✅ Marked {session_data.get('player_name', player_id[:8])} as online in database")
-                    except Exception as e:
-                        logger.error(f"Failed to save session for {player_id}: {e}")
-                else:
-                    logger.warning(f"No session data found for active player {player_id}")
+        # Rebuilt state replaces this server's stored sessions; persisted by the next presence checkpoint
+        players = {}
+        for player_id in active_players:
+            session_key = self.lifecycle_manager.get_lifecycle_key(guild_id, player_id)
+            player_session = self.lifecycle_manager.player_sessions.get(session_key)
+            if not player_session:
+                logger.warning(f"No session data found for active player {player_id}")
+                continue
+            players[player_id] = {
+                'eos_id': player_id,
+                'guild_id': int(guild_id),
+                'server_id': str(server_id),
+                'player_name': player_session.get('player_name', 'Unknown'),
+                'platform': player_session.get('platform', 'Unknown'),
+                'joined_at': player_session.get('joined_at'),
+                'state': 'online',
+                'last_seen': datetime.now(timezone.utc)
+            }
+        
+        if hasattr(self.bot, 'db_manager'):
+            try:
+                await self.bot.db_manager.player_sessions.delete_many({
+                    'guild_id': int(guild_id),
+                    'server_id': str(server_id)
+                })
+            except Exception as e:
+                logger.error(f"Failed to clear stored sessions for {guild_id}/{server_id}: {e}")
+        get_presence_tracker().replace_server_state(guild_id, server_id, players, persist=True)
             
     async def read_server_logs(self, host: str, port: int, username: str, server_id: str, password: Optional[str] = None) -> Optional[str]:
         """Read logs from server via SFTP"""
@@ -307,11 +304,19 @@ class UnifiedLogParser:
         player_events.sort(key=lambda x: x['timestamp'])
         logger.debug(f"Processing {len(player_events)} player events in chronological order")
         
-        # Mark existing active players as online first
-        await self._mark_active_players_online(guild_id, server_id)
-        
         # Process player events
+        tracker = get_presence_tracker()
         for event in player_events:
+            tracker.apply_event({
+                'eos_id': event['player_id'],
+                'guild_id': int(guild_id),
+                'server_id': str(server_id),
+                'event': PRESENCE_EVENTS[event['type']],
+                'player_name': event.get('player_name'),
+                'server_name': server_name,
+                'timestamp': event['timestamp']
+            })
+            
             if event['type'] == 'queue':
                 self.lifecycle_manager.update_player_queue(
                     guild_id, event['player_id'], event['player_name'], 
@@ -323,16 +328,6 @@ class UnifiedLogParser:
                     guild_id, event['player_id'], server_id, event['timestamp']
                 )
                 logger.debug(f"🎮 Player joined: {session_data.get('player_name')} (ID: {event['player_id'][:8]}) on server {server_id}")
-                
-                # Save to database with online status
-                if hasattr(self.bot, 'db_manager'):
-                    # Ensure player is marked as online
-                    session_data['status'] = 'online'
-                    session_data['last_seen'] = datetime.now(timezone.utc)
-                    
-                    await self.bot.db_manager.save_player_session(
-                        int(guild_id), server_id, event['player_id'], session_data
-                    )
                     
                 # Create connection embed (not during cold start)
                 if not cold_start:
@@ -352,12 +347,6 @@ class UnifiedLogParser:
                     logger.debug(f"🔍 Player disconnected: {disconnect_data.get('player_name')} (ID: {event['player_id'][:8]})")
                 
                 if disconnect_data:
-                    # Remove from database
-                    if hasattr(self.bot, 'db_manager'):
-                        await self.bot.db_manager.remove_player_session(
-                            int(guild_id), server_id, event['player_id']
-                        )
-                        
                     # Create disconnect embed (not during cold start)
                     if not cold_start:
                         embed_data = {
@@ -370,38 +359,6 @@ class UnifiedLogParser:
                         
         return embeds
         
-    async def _mark_active_players_online(self, guild_id: int, server_id: str):
-        """Mark players with recent activity as online"""
-        try:
-            if not hasattr(self.bot, 'db_manager'):
-                return
-                
-            # Find players who joined recently (last 30 minutes) but are marked offline
-            recent_time = datetime.now(timezone.utc) - timedelta(minutes=30)
-            
-            # Update recent joiners to online status
-            await self.bot.db_manager.player_sessions.update_many(
-                {
-                    'guild_id': int(guild_id),
-                    'server_id': str(server_id),
-                    'joined_at': {'$gte': recent_time.isoformat()},
-                    'status': 'offline'
-                },
-                {
-                    '$set': {
-                        'status': 'online',
-                        'last_seen': datetime.now(timezone.utc)
-                    },
-                    '$unset': {
-                        'cleanup_reason': '',
-                        'disconnected_at': ''
-                    }
-                }
-            )
-            
-        except Exception as e:
-            logger.error(f"Failed to mark active players online: {e}")
-
     async def send_embeds(self, guild_id: int, server_id: str, embeds: List[Any]):
         """Send embeds to appropriate channels with proper routing and theming"""
         try:
@@ -457,23 +414,21 @@ class UnifiedLogParser:
     async def update_voice_channel(self, guild_id: int, server_id: str, server_name: str):
         """Update voice channel with current player count"""
         try:
-            # First try to get accurate count from lifecycle manager
-            active_players = self.lifecycle_manager.get_active_players(guild_id)
-            server_players = [p for p in active_players.values() if p and p.get('server_id') == server_id]
-            tracked_player_count = len(server_players)
+            # Tracked count comes from the presence registry
+            tracked_player_count, _ = get_presence_tracker().get_counts(guild_id, server_id)
             
             # Try to get real player count via server query as fallback
             actual_player_count = tracked_player_count
             
             # Get server config to find host for querying
-            guild_config = await self.bot.db_manager.get_guild(guild_id)
+            guild_config = await self.bot.db_manager.get_guild(int(guild_id))
             if guild_config:
                 servers = guild_config.get('servers', {})
                 # Handle both dictionary and list formats for servers
                 if isinstance(servers, dict):
                     server_config = servers.get(server_id, {})
                 elif isinstance(servers, list):
-                    server_config = next((s for s in servers if s and s.get('id') == server_id), {})
+                    server_config = next((s for s in servers if s and str(s.get('_id', s.get('server_id'))) == str(server_id)), {})
                 else:
                     server_config = {}
                 host = server_config.get('host')
@@ -515,9 +470,6 @@ class UnifiedLogParser:
             channel_name = f"{color} {server_name} [{status}] • {player_count}/{max_players}"
             
             # Update voice channel
-            guild_config = await self.bot.db_manager.get_guild(int(guild_id))
-            logger.info(f"🔍 Guild config found: {guild_config is not None}")
-            
             if guild_config:
                 # Check new server_channels structure first
                 server_channels_config = guild_config.get('server_channels', {})
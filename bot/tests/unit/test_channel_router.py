@@ -0,0 +1,64 @@
+"""
+Unit Tests for Channel Routing Tables
+"""
+
+import asyncio
+from bot.utils.channel_router import ChannelRoutes, GuildRoutes
+
+class _FakeDB:
+    def __init__(self, guild_config):
+        self.guild_config = guild_config
+        self.reads = 0
+
+    async def get_guild(self, guild_id):
+        self.reads += 1
+        return self.guild_config
+
+
+class TestChannelRoutes:
+    """Test routing priority and invalidation"""
+
+    def test_resolution_priority(self):
+        """Test server channel, then default server channel, then legacy channel, then general"""
+        routes = GuildRoutes({
+            'channels': {'killfeed': 1, 'events': 2, 'general': 9},
+            'server_channels': {
+                'default': {'events': 3},
+                '7020': {'killfeed': 4, 'killfeed_enabled': True, 'killfeed_updated': 'now'},
+            },
+        })
+
+        assert routes.resolve('7020', 'killfeed') == 4
+        assert routes.resolve('other', 'killfeed') == 1
+        assert routes.resolve('7020', 'events') == 3
+        assert routes.resolve('7020', 'bounties') == 9
+        assert routes.resolve('7020', 'killfeed_enabled') == 9
+        assert GuildRoutes(None).resolve('7020', 'killfeed') is None
+
+    def test_loaded_once_until_invalidated(self):
+        """Test concurrent lookups share one load and invalidation rebuilds the table"""
+        async def scenario():
+            db = _FakeDB({'channels': {'killfeed': 1}})
+            tables = ChannelRoutes()
+            results = await asyncio.gather(*[tables.get_routes(db, 1) for _ in range(10)])
+            assert db.reads == 1 and results[0].resolve('1', 'killfeed') == 1
+
+            db.guild_config = {'channels': {'killfeed': 5}}
+            tables.invalidate(1)
+            assert (await tables.get_routes(db, 1)).resolve('1', 'killfeed') == 5
+            assert db.reads == 2
+
+        asyncio.run(scenario())
+
+    def test_missing_config_is_not_cached(self):
+        """Test a failed config read is retried instead of routing nothing until invalidated"""
+        async def scenario():
+            db = _FakeDB(None)
+            tables = ChannelRoutes()
+            assert (await tables.get_routes(db, 1)).resolve('1', 'killfeed') is None
+
+            db.guild_config = {'channels': {'killfeed': 1}}
+            assert (await tables.get_routes(db, 1)).resolve('1', 'killfeed') == 1
+            assert db.reads == 2
+
+        asyncio.run(scenario())
@@ -0,0 +1,46 @@
+"""
+Unit Tests for Kill Event Buckets
+"""
+
+from datetime import datetime
+from bot.utils import kill_event_buckets
+
+class TestKillEventBuckets:
+    """Test bucket grouping and query rewriting"""
+
+    def test_group_into_hourly_buckets(self):
+        """Test kills are grouped per server per hour"""
+        events = [
+            {'_id': 'a', 'guild_id': 1, 'server_id': '7020', 'timestamp': datetime(2025, 6, 1, 12, 5)},
+            {'_id': 'b', 'guild_id': 1, 'server_id': '7020', 'timestamp': datetime(2025, 6, 1, 12, 59)},
+            {'_id': 'c', 'guild_id': 1, 'server_id': '7020', 'timestamp': datetime(2025, 6, 1, 13, 0)},
+        ]
+
+        buckets = kill_event_buckets.group_into_buckets(events)
+
+        assert set(buckets) == {'1:7020:2025060112', '1:7020:2025060113'}
+        assert len(buckets['1:7020:2025060112']['kills']) == 2
+        assert buckets['1:7020:2025060113']['hour'] == datetime(2025, 6, 1, 13)
+
+    def test_tuple_round_trip_fields(self):
+        """Test kill tuples follow the declared field layout"""
+        event = {'_id': 'a', 'killer': 'Alpha', 'victim': 'Bravo', 'weapon': 'AK47', 'distance': 120}
+        kill_tuple = kill_event_buckets.to_kill_tuple(event)
+
+        assert len(kill_tuple) == len(kill_event_buckets.KILL_TUPLE_FIELDS)
+        assert kill_tuple[kill_event_buckets.KILL_TUPLE_FIELDS.index('weapon')] == 'AK47'
+
+    def test_rewrite_pipeline_prunes_buckets(self):
+        """Test the leading $match is pushed down to bucket level"""
+        since = datetime(2025, 6, 1, 12, 30)
+        pipeline = [
+            {'$match': {'guild_id': 1, 'timestamp': {'$gte': since}, 'is_suicide': False}},
+            {'$group': {'_id': '$killer', 'kills': {'$sum': 1}}}
+        ]
+
+        rewritten = kill_event_buckets.rewrite_pipeline(pipeline)
+
+        assert rewritten[0] == {'$match': {'guild_id': 1, 'hour': {'$gte': datetime(2025, 6, 1, 12)}}}
+        assert rewritten[1] == {'$unwind': '$k'}
+        assert rewritten[3] == pipeline[0]
+        assert rewritten[-1] == pipeline[1]
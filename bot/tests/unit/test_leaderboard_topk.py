@@ -0,0 +1,91 @@
+"""
+Unit Tests for In-Memory Leaderboards
+"""
+
+import asyncio
+from bot.utils.leaderboard_topk import LeaderboardTopK, StatTopK
+
+def _player(name, kills):
+    return {'player_name': name, 'kills': kills}
+
+class _Cursor:
+    def __init__(self, pvp_data, query):
+        self.pvp_data = pvp_data
+        self.docs = [dict(doc) for doc in pvp_data.docs if doc['player_name'] in query.get('player_name', {}).get('$in', [doc['player_name']])]
+
+    def sort(self, field, direction):
+        self.docs.sort(key=lambda doc: doc.get(field, 0), reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        return self
+
+    async def to_list(self, length=None):
+        # Ingest lands while the seed queries are in flight
+        await self.pvp_data.during_seed()
+        return self.docs
+
+    def __aiter__(self):
+        async def iterate():
+            for doc in self.docs:
+                yield doc
+        return iterate()
+
+
+class _PvpData:
+    def __init__(self, docs):
+        self.docs = docs
+        self.during_seed = None
+
+    def find(self, query, projection=None):
+        return _Cursor(self, query)
+
+
+class _FakeDB:
+    def __init__(self, docs):
+        self.pvp_data = _PvpData(docs)
+
+class TestStatTopK:
+    """Test the per-stat top-K ranking"""
+
+    def test_keeps_best_k_in_order(self):
+        """Test only the K best players are kept, best first"""
+        ranking = StatTopK('kills', k=3)
+        for name, kills in [('A', 5), ('B', 9), ('C', 1), ('D', 7), ('E', 0)]:
+            ranking.offer(_player(name, kills))
+
+        assert [entry['player_name'] for entry in ranking.top(10)] == ['B', 'D', 'A']
+
+    def test_player_enters_by_beating_the_floor(self):
+        """Test a rising player displaces the lowest entry and updates apply in place"""
+        ranking = StatTopK('kills', k=2)
+        ranking.load([_player('A', 10), _player('B', 4)])
+
+        assert not ranking.offer(_player('C', 4))
+        assert ranking.offer(_player('C', 5))
+        assert ranking.offer(_player('A', 11))
+        assert [(entry['player_name'], entry['kills']) for entry in ranking.top(2)] == [('A', 11), ('C', 5)]
+
+
+class TestLeaderboardSeeding:
+    """Test ingest that races a seed is not lost"""
+
+    def test_changes_during_seed_are_reoffered(self):
+        """Test a player updated while the seed reads pvp_data ends up with their latest stats"""
+        async def scenario():
+            leaderboards = LeaderboardTopK(k=5)
+            db = _FakeDB([{'player_name': 'A', 'kills': 3}, {'player_name': 'B', 'kills': 1}])
+
+            async def idle():
+                pass
+
+            async def ingest():
+                db.pvp_data.during_seed = idle
+                db.pvp_data.docs[1]['kills'] = 8
+                await leaderboards.refresh_players(db, 1, '7020', ['B'])
+
+            db.pvp_data.during_seed = ingest
+            rankings = await leaderboards.ensure_seeded(db, 1, '7020')
+            assert [(entry['player_name'], entry['kills']) for entry in rankings.stats['kills'].top(2)] == [('B', 8), ('A', 3)]
+
+        asyncio.run(scenario())
@@ -0,0 +1,50 @@
+"""
+Unit Tests for the Autocomplete Name Index
+"""
+
+from bot.utils.name_index import PrefixIndex, TrigramIndex
+
+class TestPrefixIndex:
+    """Test prefix search over the sorted name array"""
+
+    def test_prefix_search_is_case_insensitive_and_sorted(self):
+        """Test names are matched by normalized prefix in order"""
+        index = PrefixIndex()
+        index.replace_all((name, name) for name in ['bravo', 'Alpha', 'alphonse', 'Charlie'])
+
+        assert index.search('AL') == [('Alpha', 'Alpha'), ('alphonse', 'alphonse')]
+        assert [display for display, _ in index.search('')] == ['Alpha', 'alphonse', 'bravo', 'Charlie']
+
+    def test_add_remove_and_contains(self):
+        """Test incremental updates and substring top-up"""
+        index = PrefixIndex()
+        assert index.add('Main Server (ID: 1)', '1')
+        assert not index.add('Main Server (ID: 1)', '1')
+        assert index.add('Renamed (ID: 1)', '1')
+        assert len(index) == 1
+
+        index.add('Test Server (ID: 2)', '2')
+        assert index.search('server', contains=True) == [('Test Server (ID: 2)', '2')]
+        assert index.remove('2')
+        assert index.search('test') == []
+
+
+class TestTrigramIndex:
+    """Test fuzzy character suggestions"""
+
+    def test_suggests_tag_accent_and_typo_variants(self):
+        """Test clan tags, accents and typos still find the character, best match first"""
+        index = TrigramIndex()
+        index.replace_all(['[ABC] Player', 'Jöhn Doe', 'xXSniperXx', 'Sniper_Wolf'])
+
+        assert index.search('player')[0][0] == '[ABC] Player'
+        assert index.search('jon doe')[0][0] == 'Jöhn Doe'
+        assert [name for name, _ in index.search('sniper')] == ['Sniper_Wolf', 'xXSniperXx']
+        assert index.search('zzz') == []
+
+    def test_incremental_add(self):
+        """Test names added after seeding are searchable"""
+        index = TrigramIndex()
+        assert index.add('NewPlayer')
+        assert not index.add('NewPlayer')
+        assert index.search('newplayr')[0][0] == 'NewPlayer'
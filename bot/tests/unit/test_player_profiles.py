@@ -0,0 +1,93 @@
+"""
+Unit Tests for Player Profiles
+"""
+
+import asyncio
+from bot.utils.player_profiles import build_profile_operations, subtract_server_profiles, summarize_profiles
+
+class _Docs:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        async def iterate():
+            for doc in self.docs:
+                yield doc
+        return iterate()
+
+
+class _Rollups:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query):
+        return _Docs([doc for doc in self.docs if all(doc.get(k) == v for k, v in query.items())])
+
+
+class _Profiles:
+    def __init__(self):
+        self.operations = []
+
+    async def bulk_write(self, operations, ordered=True):
+        self.operations.extend(operations)
+
+
+class _FakeDB:
+    def __init__(self, kill_events, rollups):
+        self.kill_events = kill_events
+        self.kill_rollups = _Rollups(rollups)
+        self.player_profiles = _Profiles()
+
+    def find_kill_events(self, query):
+        return _Docs([event for event in self.kill_events if all(event.get(k) == v for k, v in query.items())])
+
+class TestPlayerProfiles:
+    """Test incremental profile updates and summaries"""
+
+    def test_build_profile_operations(self):
+        """Test kills fold into killer and victim profiles"""
+        events = [
+            {'killer': 'Alpha', 'victim': 'Bravo', 'weapon': 'AK47', 'distance': 120, 'is_suicide': False},
+            {'killer': 'Alpha', 'victim': 'Alpha', 'weapon': 'Suicide', 'distance': 0, 'is_suicide': True},
+        ]
+
+        operations = {op._filter['_id']: op._doc for op in build_profile_operations(1, '7020', events, {'Alpha': 3})}
+
+        alpha = operations['1:Alpha']
+        assert alpha['$inc']['kills'] == 1
+        assert alpha['$inc']['suicides'] == 1
+        assert alpha['$inc']['servers.7020.kills'] == 1
+        assert alpha['$inc']['weapons.AK47'] == 1
+        assert alpha['$max'] == {'personal_best_distance': 120, 'best_streak': 3}
+        assert operations['1:Bravo']['$inc']['killed_by.Alpha'] == 1
+
+    def test_summarize_excludes_alts(self):
+        """Test alt characters are not counted as rivals"""
+        profiles = [
+            {'kills': 5, 'deaths': 2, 'victims': {'Bravo': 3, 'AlphaAlt': 2}, 'servers': {'7020': {}}},
+            {'kills': 1, 'deaths': 1, 'killed_by': {'Charlie': 1}, 'servers': {'7020': {}, '7021': {}}},
+        ]
+
+        summary = summarize_profiles(profiles, ['Alpha', 'AlphaAlt'])
+
+        assert summary['kills'] == 6 and summary['deaths'] == 3
+        assert summary['victims'] == {'Bravo': 3}
+        assert summary['servers_played'] == 2
+
+    def test_subtract_server_profiles(self):
+        """Test a server refresh only takes that server's kills and rollups out of profiles"""
+        db = _FakeDB(
+            [
+                {'guild_id': 1, 'server_id': '7020', 'killer': 'Alpha', 'victim': 'Bravo', 'weapon': 'AK47', 'distance': 50},
+                {'guild_id': 1, 'server_id': '7021', 'killer': 'Alpha', 'victim': 'Bravo', 'weapon': 'AK47', 'distance': 70},
+            ],
+            [{'guild_id': 1, 'server_id': '7020', 'type': 'player', 'player_name': 'Alpha', 'kills': 2, 'victims': {'Charlie': 2}}]
+        )
+
+        assert asyncio.run(subtract_server_profiles(db, 1, '7020')) == 1
+
+        operations = {op._filter['_id']: op._doc for op in db.player_profiles.operations}
+        alpha = operations['1:Alpha']
+        assert alpha['$inc'] == {'kills': -3, 'distance_sum': -50, 'victims.Bravo': -1, 'victims.Charlie': -2, 'weapons.AK47': -1}
+        assert alpha['$unset'] == {'servers.7020': ''}
+        assert operations['1:Bravo']['$inc'] == {'deaths': -1, 'killed_by.Alpha': -1}
@@ -0,0 +1,79 @@
+"""
+Unit Tests for Premium Entitlements
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from bot.utils.premium_entitlements import PremiumEntitlements
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Collection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = 0
+
+    def find(self, query, projection=None):
+        self.queries += 1
+        return _Cursor([doc for doc in self.docs if all(doc.get(k) == v for k, v in query.items())])
+
+
+class _FakeDB:
+    def __init__(self, docs):
+        self.server_premium_status = _Collection(docs)
+
+
+class TestPremiumEntitlements:
+    """Test startup load, expiry and write-through updates"""
+
+    def test_lookups_after_single_load(self):
+        """Test checks are answered from one query and expired servers are not premium"""
+        async def scenario():
+            past = datetime.utcnow() - timedelta(days=1)
+            future = datetime.now(timezone.utc) + timedelta(days=1)
+            db = _FakeDB([
+                {'guild_id': 1, 'server_id': '10', 'is_active': True, 'expires_at': None},
+                {'guild_id': 1, 'server_id': '11', 'is_active': True, 'expires_at': future},
+                {'guild_id': 2, 'server_id': '20', 'is_active': True, 'expires_at': past},
+                {'guild_id': 3, 'server_id': '30', 'is_active': False},
+            ])
+            entitlements = PremiumEntitlements()
+
+            assert await entitlements.is_server_premium(db, 1, '10')
+            assert await entitlements.count_premium_servers(db, 1) == 2
+            assert not await entitlements.has_premium_access(db, 2)
+            assert not await entitlements.has_premium_access(db, 3)
+            assert db.server_premium_status.queries == 1
+
+        asyncio.run(scenario())
+
+    def test_grant_revoke_and_invalidate(self):
+        """Test activation paths update memory and invalidation reloads one guild"""
+        async def scenario():
+            db = _FakeDB([])
+            entitlements = PremiumEntitlements()
+            await entitlements.load_all(db)
+
+            entitlements.grant(5, '50')
+            assert await entitlements.has_premium_access(db, 5, '50')
+            entitlements.revoke(5, '50')
+            assert not await entitlements.has_premium_access(db, 5)
+
+            db.server_premium_status.docs.append({'guild_id': 5, 'server_id': '51', 'is_active': True})
+            entitlements.invalidate(5)
+            assert await entitlements.has_premium_access(db, 5)
+            assert db.server_premium_status.queries == 2
+
+        asyncio.run(scenario())
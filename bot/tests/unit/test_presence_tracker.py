@@ -0,0 +1,132 @@
+"""
+Unit Tests for Presence Tracking
+"""
+
+import asyncio
+from datetime import datetime
+from bot.utils.presence_tracker import PresenceTracker
+
+def _event(event_type, eos_id='abc123', **extra):
+    event = {
+        'type': 'connection',
+        'event': event_type,
+        'eos_id': eos_id,
+        'guild_id': 1,
+        'server_id': '7020',
+        'timestamp': datetime(2025, 6, 1, 12, 0, 0)
+    }
+    event.update(extra)
+    return event
+
+class _Sessions:
+    def __init__(self, docs):
+        self.docs = docs
+        self.during_write = None
+
+    def find(self, query, projection=None):
+        async def cursor():
+            for doc in self.docs:
+                yield dict(doc)
+        return cursor()
+
+
+    async def bulk_write(self, operations, ordered=True):
+        self.written = operations
+        if self.during_write:
+            self.during_write()
+
+
+class _FakeDB:
+    def __init__(self, docs, during_write=None):
+        self.player_sessions = _Sessions(docs)
+        self.player_sessions.during_write = during_write
+
+class TestPresenceTracker:
+    """Test in-memory presence transitions"""
+
+    def test_queue_connect_disconnect(self):
+        """Test the full connection lifecycle"""
+        tracker = PresenceTracker()
+
+        change = tracker.apply_event(_event('player_queue', player_name='Survivor'))
+        assert change['old_state'] == 'offline' and change['new_state'] == 'queued'
+        assert tracker.get_counts(1, '7020') == (0, 1)
+
+        change = tracker.apply_event(_event('player_connect'))
+        assert change['new_state'] == 'online'
+        assert change['player_name'] == 'Survivor'
+        assert tracker.get_counts(1, '7020') == (1, 0)
+
+        tracker.apply_event(_event('player_disconnect'))
+        assert tracker.get_counts(1, '7020') == (0, 0)
+
+    def test_repeated_state_is_not_a_change(self):
+        """Test duplicate events produce no transition"""
+        tracker = PresenceTracker()
+        tracker.apply_event(_event('player_connect'))
+        assert tracker.apply_event(_event('player_connect')) is None
+
+    def test_active_players_by_guild(self):
+        """Test active player listing only returns online and queued players"""
+        tracker = PresenceTracker()
+        tracker.apply_event(_event('player_connect', eos_id='a'))
+        tracker.apply_event(_event('player_queue', eos_id='b'))
+        tracker.apply_event(_event('player_connect', eos_id='c'))
+        tracker.apply_event(_event('player_disconnect', eos_id='c'))
+
+        eos_ids = {p['eos_id'] for p in tracker.get_active_players(1)}
+        assert eos_ids == {'a', 'b'}
+        assert tracker.get_active_players(2) == []
+
+    def test_counters_follow_rebuilt_state(self):
+        """Test counters after a cold-start rebuild and later transitions"""
+        tracker = PresenceTracker()
+        tracker.replace_server_state(1, '7020', {
+            'a': {'eos_id': 'a', 'state': 'online'},
+            'b': {'eos_id': 'b', 'state': 'queued'},
+            'c': {'eos_id': 'c', 'state': 'offline'}
+        }, persist=True)
+        assert tracker.get_counts(1, '7020') == (1, 1)
+        assert tracker.servers[(1, '7020')].dirty == {'a', 'b', 'c'}
+
+        tracker.apply_event(_event('player_connect', eos_id='b'))
+        tracker.apply_event(_event('player_disconnect', eos_id='a'))
+        assert tracker.get_counts(1, '7020') == (1, 0)
+        assert tracker.get_online_count(1) == 1
+
+    def test_warm_snapshot_restores_active_players(self):
+        """Test a snapshot taken before shutdown brings players back over the offline reset"""
+        before = PresenceTracker()
+        before.apply_event(_event('player_connect', eos_id='a', server_name='Main'))
+        before.apply_event(_event('player_queue', eos_id='b', player_name='Queued'))
+        snapshot = before.snapshot_active(1, '7020')
+
+        async def scenario():
+            after = PresenceTracker()
+            db = _FakeDB([
+                {'eos_id': 'a', 'guild_id': 1, 'server_id': '7020', 'state': 'offline', 'player_name': 'Online'},
+                {'eos_id': 'c', 'guild_id': 1, 'server_id': '7020', 'state': 'offline'}
+            ])
+            await after.restore_active(db, 1, '7020', snapshot)
+
+            assert after.get_counts(1, '7020') == (1, 1)
+            assert after.servers[(1, '7020')].dirty == {'a', 'b'}
+            assert {p['eos_id']: p.get('player_name') for p in after.get_active_players(1)} == {'a': 'Online', 'b': 'Queued'}
+
+        asyncio.run(scenario())
+
+    def test_change_during_flush_stays_dirty(self):
+        """Test a transition applied while the checkpoint write is in flight is not lost"""
+        tracker = PresenceTracker()
+        tracker.apply_event(_event('player_connect', eos_id='a'))
+        tracker.apply_event(_event('player_connect', eos_id='b'))
+
+        def disconnect_a():
+            tracker.apply_event(_event('player_disconnect', eos_id='a'))
+
+        async def scenario():
+            db = _FakeDB([], during_write=disconnect_a)
+            assert await tracker.flush(db, 1, '7020') == 2
+            assert tracker.servers[(1, '7020')].dirty == {'a'}
+
+        asyncio.run(scenario())
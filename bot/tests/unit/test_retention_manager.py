@@ -0,0 +1,163 @@
+"""
+Unit Tests for Retention Rollups
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from bot.utils.retention_manager import RetentionManager, build_rollup_operations
+
+def _kill(killer, victim, weapon='AK47', distance=100, is_suicide=False):
+    return {'killer': killer, 'victim': victim, 'weapon': weapon, 'distance': distance, 'is_suicide': is_suicide}
+
+class TestRetentionRollups:
+    """Test kill events are folded into rollup upserts"""
+
+    def test_player_and_weapon_rollups(self):
+        """Test kills, deaths and weapons are aggregated per batch"""
+        events = [
+            _kill('Alpha', 'Bravo', distance=150),
+            _kill('Alpha', 'Charlie', distance=50),
+            _kill('Bravo', 'Bravo', weapon='Suicide', is_suicide=True),
+        ]
+
+        operations = {op._filter['_id']: op._doc for op in build_rollup_operations(1, '7020', events, 'batch1')}
+
+        alpha = operations['1:7020:player:Alpha']
+        assert alpha['$inc']['kills'] == 2
+        assert alpha['$inc']['weapons.AK47'] == 2
+        assert alpha['$max']['max_distance'] == 150
+
+        bravo = operations['1:7020:player:Bravo']
+        assert bravo['$inc']['deaths'] == 1
+        assert bravo['$inc']['suicides'] == 1
+
+        assert operations['1:7020:weapon:AK47']['$inc']['kills'] == 2
+        assert '1:7020:weapon:Suicide' not in operations
+
+    def test_rollups_are_guarded_by_batch(self):
+        """Test replaying a batch cannot double count"""
+        operations = build_rollup_operations(1, '7020', [_kill('Alpha', 'Bravo')], 'batch1')
+        assert all(op._filter['last_batch'] == {'$ne': 'batch1'} for op in operations)
+
+
+def _matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if isinstance(condition, dict) and any(key.startswith('$') for key in condition):
+            for op, operand in condition.items():
+                if op == '$lt' and not (value is not None and value < operand):
+                    return False
+                if op == '$ne' and value == operand:
+                    return False
+                if op == '$in' and value not in operand:
+                    return False
+                if op == '$exists' and (field in doc) != operand:
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _apply(doc, update):
+    for op, fields in update.items():
+        for path, operand in fields.items():
+            *parents, leaf = path.split('.')
+            target = doc
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            if op == '$inc':
+                target[leaf] = target.get(leaf, 0) + operand
+            elif op == '$max':
+                target[leaf] = max(target.get(leaf, operand), operand)
+            elif op == '$set' or (op == '$setOnInsert' and leaf not in target):
+                target[leaf] = operand
+            elif op == '$unset':
+                target.pop(leaf, None)
+
+
+class _Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, keys, direction=None):
+        for field, order in reversed(keys):
+            self.docs.sort(key=lambda doc: doc.get(field), reverse=order < 0)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs
+
+
+class _Collection:
+    """Just enough of a collection for the retention paths"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query, projection=None):
+        return _Cursor([dict(doc) for doc in self.docs.values() if _matches(doc, query)])
+
+    async def find_one(self, query, projection=None):
+        return next((dict(doc) for doc in self.docs.values() if _matches(doc, query)), None)
+
+    async def update_one(self, query, update, upsert=False):
+        doc = next((doc for doc in self.docs.values() if _matches(doc, query)), None)
+        if doc is None:
+            if not upsert or query['_id'] in self.docs:
+                return
+            doc = self.docs.setdefault(query['_id'], {'_id': query['_id']})
+        _apply(doc, update)
+
+    async def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            await self.update_one(op._filter, op._doc, upsert=op._upsert)
+
+    async def delete_many(self, query):
+        for doc_id in [doc_id for doc_id, doc in self.docs.items() if _matches(doc, query)]:
+            del self.docs[doc_id]
+
+
+class _FakeDB:
+    def __init__(self):
+        self.uses_kill_buckets = False
+        self.kill_events = _Collection()
+        self.db = self
+        self.retention_state = _Collection()
+        self.kill_events_archive = _Collection()
+        self.kill_rollups = _Collection()
+
+
+class TestServerRefresh:
+    """Test a cleared and re-ingested server is rolled up once"""
+
+    def test_clear_and_reingest_does_not_double_rollups(self):
+        """Test forgetting a server's retention state before re-ingest keeps rollups at one copy"""
+        old = datetime.now(timezone.utc) - timedelta(days=200)
+        history = [{'_id': f"kill{i}", 'guild_id': 1, 'server_id': '7020', 'timestamp': old + timedelta(minutes=i),
+                    **_kill('Alpha', 'Bravo')} for i in range(5)]
+
+        def ingest(db):
+            for event in history:
+                db.kill_events.docs[event['_id']] = dict(event)
+
+        async def scenario():
+            db = _FakeDB()
+            retention = RetentionManager(db, batch_size=2)
+            ingest(db)
+            assert await retention.retire_kill_events(1, '7020', 90) == 5
+
+            # Historical refresh: raw events are cleared and the whole log is parsed again
+            await db.kill_events.delete_many({'guild_id': 1, 'server_id': '7020'})
+            await retention.forget_server(1, '7020')
+            assert not db.kill_rollups.docs and not db.kill_events_archive.docs and not db.retention_state.docs
+            ingest(db)
+            await retention.retire_kill_events(1, '7020', 90)
+
+            assert db.kill_rollups.docs['1:7020:player:Alpha']['kills'] == 5
+            assert db.kill_rollups.docs['1:7020:weapon:AK47']['kills'] == 5
+
+        asyncio.run(scenario())
@@ -0,0 +1,88 @@
+"""
+Unit Tests for the Unified Cache
+"""
+
+import asyncio
+from bot.utils.unified_cache import UnifiedCache
+
+class TestUnifiedCache:
+    """Test LRU ordering, byte accounting and expiry"""
+
+    def test_lru_eviction_by_bytes(self):
+        """Test the least recently used entry goes first once the byte budget is exceeded"""
+        async def scenario():
+            cache = UnifiedCache(max_memory_mb=1)
+            payload = 'x' * 300_000
+            await cache.set('player_data', 'a', payload)
+            await cache.set('player_data', 'b', payload)
+            await cache.set('player_data', 'c', payload)
+            assert await cache.get('player_data', 'a') == payload
+            await cache.set('player_data', 'd', payload)
+
+            assert await cache.get('player_data', 'b') is None
+            assert await cache.get('player_data', 'a') == payload
+            assert cache.stats['memory_usage'] <= cache.max_memory_bytes
+            assert cache.stats['memory_usage'] == sum(entry.size for entry in cache.caches['player_data'].values())
+
+        asyncio.run(scenario())
+
+    def test_expiry_and_invalidation_release_bytes(self):
+        """Test expired and invalidated entries are dropped and their bytes released"""
+        async def scenario():
+            cache = UnifiedCache()
+            await cache.set('economy_data', 'guild_1_user_1', {'balance': 5}, custom_ttl=60)
+            entry = cache.caches['economy_data']['guild_1_user_1']
+            entry.expires_at = entry.stale_until = 0
+            assert await cache.get('economy_data', 'guild_1_user_1') is None
+            assert 'guild_1_user_1' not in cache.caches['economy_data']
+
+            await cache.set('economy_data', 'guild_1_user_2', {'balance': 7})
+            await cache.invalidate('economy_data')
+            assert cache.stats['memory_usage'] == 0
+
+        asyncio.run(scenario())
+
+    def test_concurrent_misses_share_one_load(self):
+        """Test singleflight coalescing and stale-while-revalidate"""
+        async def scenario():
+            cache = UnifiedCache()
+            calls = []
+
+            async def loader():
+                calls.append(1)
+                await asyncio.sleep(0.01)
+                return len(calls)
+
+            results = await asyncio.gather(*[cache.get_or_load('leaderboards', 'guild_1_x', loader, stale_ttl=60)
+                                             for _ in range(20)])
+            assert results == [1] * 20 and len(calls) == 1
+
+            # Expired but inside the stale window: old value now, one refresh in the background
+            cache.caches['leaderboards']['guild_1_x'].expires_at = 0
+            assert await cache.get_or_load('leaderboards', 'guild_1_x', loader, stale_ttl=60) == 1
+            assert await cache.get_or_load('leaderboards', 'guild_1_x', loader, stale_ttl=60) == 1
+            await asyncio.sleep(0.05)
+            assert len(calls) == 2
+            assert await cache.get_or_load('leaderboards', 'guild_1_x', loader, stale_ttl=60) == 2
+
+        asyncio.run(scenario())
+
+    def test_cancelled_caller_does_not_cancel_waiters(self):
+        """Test a coalesced waiter still gets the value when the first caller is cancelled"""
+        async def scenario():
+            cache = UnifiedCache()
+
+            async def loader():
+                await asyncio.sleep(0.02)
+                return 'value'
+
+            first = asyncio.create_task(cache.get_or_load('leaderboards', 'guild_1_y', loader))
+            await asyncio.sleep(0)
+            second = asyncio.create_task(cache.get_or_load('leaderboards', 'guild_1_y', loader))
+            await asyncio.sleep(0)
+            first.cancel()
+
+            assert await second == 'value'
+            assert await cache.get('leaderboards', 'guild_1_y') == 'value'
+
+        asyncio.run(scenario())
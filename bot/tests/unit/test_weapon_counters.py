@@ -0,0 +1,30 @@
+"""
+Unit Tests for Weapon Counters
+"""
+
+from bot.utils.weapon_counters import build_counter_operations
+
+def _kill(killer, victim, weapon='AK47', is_suicide=False):
+    return {'killer': killer, 'victim': victim, 'weapon': weapon, 'is_suicide': is_suicide}
+
+class TestWeaponCounters:
+    """Test kill events are folded into weapon/killer counter upserts"""
+
+    def test_counts_per_weapon_and_killer(self):
+        """Test kills are counted per weapon and killer, skipping suicides"""
+        events = [
+            _kill('Alpha', 'Bravo'),
+            _kill('Alpha', 'Charlie'),
+            _kill('Bravo', 'Alpha', weapon='M4'),
+            _kill('Charlie', 'Charlie', weapon='Suicide', is_suicide=True),
+            _kill('Delta', 'Alpha', weapon='Falling'),
+        ]
+
+        operations = {
+            (op._filter['_id']['weapon'], op._filter['_id']['killer']): op._doc
+            for op in build_counter_operations(1, '7020', events)
+        }
+
+        assert set(operations) == {('AK47', 'Alpha'), ('M4', 'Bravo')}
+        assert operations[('AK47', 'Alpha')]['$inc']['kills'] == 2
+        assert operations[('M4', 'Bravo')]['$setOnInsert']['server_id'] == '7020'
@@ -1,14 +1,121 @@
 
 """
 Emerald's Killfeed - Channel Router Utility
-Centralized channel routing logic with server-specific fallbacks
+Centralized channel routing logic with server-specific fallbacks, resolved from in-memory per-guild tables
 """
 
+import asyncio
 import logging
 from typing import Optional, Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# Bookkeeping fields /setchannel stores next to each channel id
+_METADATA_SUFFIXES = ('_enabled', '_updated')
+
+
+def _channel_ids(channels: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        channel_type: channel_id
+        for channel_type, channel_id in (channels or {}).items()
+        if channel_id and not channel_type.endswith(_METADATA_SUFFIXES)
+    }
+
+
+class GuildRoutes:
+    """Resolved channel ids for one guild: per-server overrides plus precomputed fallbacks"""
+
+    def __init__(self, guild_config: Optional[Dict[str, Any]]):
+        guild_config = guild_config or {}
+        server_channels = guild_config.get('server_channels', {}) or {}
+        legacy_channels = _channel_ids(guild_config.get('channels'))
+        default_channels = _channel_ids(server_channels.get('default'))
+
+        self.servers: Dict[str, Dict[str, Any]] = {
+            str(server_key): _channel_ids(channels)
+            for server_key, channels in server_channels.items()
+            if server_key != 'default' and isinstance(channels, dict)
+        }
+        # Default server channels win over legacy channels
+        self.fallback: Dict[str, Any] = {**legacy_channels, **default_channels}
+        self.general = (
+            default_channels.get('general') or default_channels.get('default') or
+            legacy_channels.get('general') or legacy_channels.get('default')
+        )
+
+    def resolve(self, server_id: str, channel_type: str) -> Optional[int]:
+        """Server-specific channel, then default server channel, then legacy channel, then the guild's general channel"""
+        server_routes = self.servers.get(str(server_id))
+        if server_routes:
+            channel_id = server_routes.get(channel_type)
+            if channel_id:
+                return channel_id
+        return self.fallback.get(channel_type) or self.general
+
+
+class ChannelRoutes:
+    """
+    Per-guild routing tables kept in memory
+
+    - Built from the guild config on first use
+    - Invalidated by the commands and database methods that change servers or channels
+    - Optionally also invalidated from a guild_configs change stream
+    """
+
+    def __init__(self):
+        self.tables: Dict[int, GuildRoutes] = {}
+        self._load_locks: Dict[int, asyncio.Lock] = {}
+
+    async def get_routes(self, db_manager, guild_id: int) -> GuildRoutes:
+        guild_id = int(guild_id)
+        routes = self.tables.get(guild_id)
+        if routes is not None:
+            return routes
+
+        lock = self._load_locks.setdefault(guild_id, asyncio.Lock())
+        async with lock:
+            routes = self.tables.get(guild_id)
+            if routes is None:
+                guild_config = await db_manager.get_guild(guild_id)
+                routes = GuildRoutes(guild_config)
+                # get_guild returns None on errors too; only a real config is cached
+                if guild_config is not None:
+                    self.tables[guild_id] = routes
+            return routes
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        """Forget a guild's routes (or all of them) so they are rebuilt on next use"""
+        if guild_id is None:
+            self.tables.clear()
+        else:
+            self.tables.pop(int(guild_id), None)
+
+    async def watch(self, db_manager):
+        """Invalidate routes from a guild_configs change stream (requires a replica set)"""
+        pipeline = [{'$project': {'documentKey': 1, 'fullDocument.guild_id': 1, 'operationType': 1}}]
+        try:
+            async with db_manager.guild_configs.watch(pipeline, full_document='updateLookup') as stream:
+                logger.info("Watching guild_configs for channel routing changes")
+                async for change in stream:
+                    guild_id = (change.get('fullDocument') or {}).get('guild_id')
+                    # Deletes carry no document; drop every table rather than guess
+                    self.invalidate(guild_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Channel routing change stream unavailable, relying on explicit invalidation: {e}")
+
+
+_channel_routes = None
+
+def get_channel_routes() -> ChannelRoutes:
+    """Get the global channel routing tables"""
+    global _channel_routes
+    if _channel_routes is None:
+        _channel_routes = ChannelRoutes()
+    return _channel_routes
+
+
 class ChannelRouter:
     """Centralized channel routing with server-specific fallback logic"""
     
@@ -17,67 +124,20 @@ class ChannelRouter:
     
     async def get_channel_id(self, guild_id: int, server_id: str, channel_type: str) -> Optional[int]:
         """
-        Get channel ID with server-specific fallback logic
+        Get channel ID with server-specific fallback logic from the cached routing table
         
         Priority:
         1. Server-specific channel (server_channels.{server_id}.{channel_type})
         2. Default server channel (server_channels.default.{channel_type})
         3. Legacy channel (channels.{channel_type})
+        4. Guild general/default channel
         """
         try:
-            guild_config = await self.bot.db_manager.get_guild(guild_id)
-            if not guild_config:
-                logger.warning(f"No guild config found for guild {guild_id}")
-                return None
-
-            server_channels = guild_config.get('server_channels', {})
-            logger.info(f"Channel lookup for guild {guild_id}, server '{server_id}', type '{channel_type}'")
-            logger.info(f"Available server_channels: {list(server_channels.keys())}")
-            
-            # Try server-specific channel first
-            if server_id in server_channels:
-                channel_id = server_channels[server_id].get(channel_type)
-                if channel_id:
-                    logger.info(f"Found server-specific {channel_type} channel {channel_id} for server {server_id}")
-                    return channel_id
-                else:
-                    logger.info(f"Server {server_id} exists but no {channel_type} channel configured")
-            
-            # Fall back to default server channels
-            if 'default' in server_channels:
-                channel_id = server_channels['default'].get(channel_type)
-                if channel_id:
-                    logger.info(f"Using default {channel_type} channel {channel_id} for server {server_id}")
-                    return channel_id
-                else:
-                    logger.info(f"Default server exists but no {channel_type} channel configured")
-            
-            # Legacy fallback to old channel structure
-            legacy_channels = guild_config.get('channels', {})
-            legacy_channel_id = legacy_channels.get(channel_type)
-            if legacy_channel_id:
-                logger.info(f"Using legacy {channel_type} channel {legacy_channel_id} for server {server_id}")
-                return legacy_channel_id
-            
-            # Ultimate fallback: Try to use guild default channel for any embed type
-            # Check if there's a general default channel configured
-            guild_default_channel = None
-            
-            # Try default server channels for 'general' or 'default' channel
-            if 'default' in server_channels:
-                guild_default_channel = server_channels['default'].get('general') or server_channels['default'].get('default')
-            
-            # Try legacy channels for 'general' or 'default'
-            if not guild_default_channel:
-                guild_default_channel = legacy_channels.get('general') or legacy_channels.get('default')
-            
-            if guild_default_channel:
-                logger.info(f"Using guild default channel {guild_default_channel} for {channel_type} (server {server_id})")
-                return guild_default_channel
-            
-            logger.warning(f"No {channel_type} channel configured anywhere for guild {guild_id}, server {server_id}")
-            logger.info(f"Available legacy channels: {list(legacy_channels.keys())}")
-            return None
+            routes = await get_channel_routes().get_routes(self.bot.db_manager, guild_id)
+            channel_id = routes.resolve(server_id, channel_type)
+            if not channel_id:
+                logger.debug(f"No {channel_type} channel configured for guild {guild_id}, server {server_id}")
+            return channel_id
             
         except Exception as e:
             logger.error(f"Failed to get {channel_type} channel for guild {guild_id}, server {server_id}: {e}")
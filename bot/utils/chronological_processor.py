@@ -10,6 +10,7 @@ from datetime import datetime, timezone
 from dataclasses import dataclass, field
 import re
 from bot.utils.connection_pool import connection_manager
+from bot.models.database import make_kill_event_id, make_player_name_key
 
 logger = logging.getLogger(__name__)
 
@@ -291,7 +292,7 @@ class ChronologicalProcessor:
             
             processed_at = datetime.now(timezone.utc)
             
-            # Build bulk data and process chronologically for streaks
+            # Build kill events with deterministic ids
             for kill_record in kill_batch:
                 # Validate player names before processing
                 killer_valid = kill_record.killer and kill_record.killer.strip()
@@ -328,7 +329,24 @@ class ChronologicalProcessor:
                     'is_suicide': is_suicide,
                     'processed_at': processed_at
                 }
+                kill_event['_id'] = make_kill_event_id(
+                    self.guild_id, self.server_id, {**kill_event, 'raw_line': kill_record.raw_line}
+                )
                 kill_events_to_insert.append(kill_event)
+            
+            # Unordered insert; replayed events are rejected by their _id and skipped below
+            new_event_ids = None
+            if self.db_manager and kill_events_to_insert:
+                new_event_ids = await self.db_manager.insert_kill_events(kill_events_to_insert)
+            
+            for kill_event in kill_events_to_insert:
+                if new_event_ids is not None and kill_event['_id'] not in new_event_ids:
+                    continue
+                
+                killer_name = kill_event['killer']
+                victim_name = kill_event['victim']
+                is_suicide = kill_event['is_suicide']
+                distance = kill_event['distance']
                 
                 # Phase 1: Aggregate simple statistics
                 if is_suicide:
@@ -353,15 +371,17 @@ class ChronologicalProcessor:
                 valid_records += 1
             
             # Execute operations if database manager is available
-            if self.db_manager and kill_events_to_insert:
-                # Bulk insert kill events
-                await self.db_manager.kill_events.insert_many(kill_events_to_insert, ordered=True)
-                
+            if self.db_manager and simple_stats:
                 # Bulk update simple statistics
                 await self._bulk_update_simple_stats(simple_stats)
                 
                 # Update streak statistics
                 await self._update_streak_stats(player_states)
+                
+                # Fold the new kills into player profiles
+                new_events = [e for e in kill_events_to_insert if new_event_ids is None or e['_id'] in new_event_ids]
+                best_streaks = {name: state['best_streak'] for name, state in player_states.items()}
+                await self.db_manager.record_kill_aggregates(self.guild_id, self.server_id, new_events, best_streaks)
             
             if valid_records > 0:
                 logger.info(f"Hybrid processed {valid_records} valid kill records for server {self.server_id}")
@@ -424,6 +444,9 @@ class ChronologicalProcessor:
                     },
                     '$set': {
                         'last_updated': datetime.now(timezone.utc)
+                    },
+                    '$setOnInsert': {
+                        'player_name_key': make_player_name_key(player_name)
                     }
                 }
                 
@@ -435,6 +458,8 @@ class ChronologicalProcessor:
             if bulk_operations:
                 result = await self.db_manager.pvp_data.bulk_write(bulk_operations, ordered=False)
                 logger.debug(f"Bulk updated {len(bulk_operations)} simple stat records")
+                # Keep kdr/qualified (the qualified_kdr leaderboard) in step with the new totals
+                await self.db_manager.refresh_kdr(self.guild_id, self.server_id, list(simple_stats))
                 
         except Exception as e:
             logger.error(f"Failed to bulk update simple stats: {e}")
@@ -457,6 +482,9 @@ class ChronologicalProcessor:
                     '$max': {
                         'best_streak': state['best_streak'],
                         'personal_best_distance': state['longest_shot']
+                    },
+                    '$setOnInsert': {
+                        'player_name_key': make_player_name_key(player_name)
                     }
                 }
                 
@@ -480,12 +508,9 @@ class ChronologicalProcessor:
             })
             
             # Clear kill events for this server
-            kills_delete_result = await self.db_manager.kill_events.delete_many({
-                'guild_id': self.guild_id,
-                'server_id': self.server_id
-            })
+            kills_deleted = await self.db_manager.clear_server_kill_events(self.guild_id, self.server_id)
             
-            logger.info(f"Cleared {pvp_delete_result.deleted_count} PVP records and {kills_delete_result.deleted_count} kill events for server {self.server_id}")
+            logger.info(f"Cleared {pvp_delete_result.deleted_count} PVP records and {kills_deleted} kill events for server {self.server_id}")
             
         except Exception as e:
             logger.error(f"Failed to clear existing data for server {self.server_id}: {e}")
@@ -0,0 +1,136 @@
+"""
+Faction Stats
+Faction totals computed with a single $lookup aggregation over factions, linked players and pvp_data
+"""
+
+import logging
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def build_faction_pipeline(guild_id: int, server_id: Optional[str] = None,
+                           faction_match: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Build the factions -> players -> pvp_data pipeline, producing one totals document per faction"""
+    stats_match: Dict[str, Any] = {'guild_id': guild_id}
+    if server_id and server_id != 'all':
+        stats_match['server_id'] = server_id
+
+    # Both joins are equality lookups so the players and pvp_data indexes are used;
+    # the sub-pipelines only add the guild (and server) scope
+    return [
+        {'$match': {'guild_id': guild_id, **(faction_match or {})}},
+        {'$lookup': {
+            'from': 'players',
+            'localField': 'members',
+            'foreignField': 'discord_id',
+            'pipeline': [
+                {'$match': {'guild_id': guild_id}},
+                {'$project': {'_id': 0, 'linked_characters': 1}}
+            ],
+            'as': 'links'
+        }},
+        {'$addFields': {'characters': {'$reduce': {
+            'input': '$links.linked_characters',
+            'initialValue': [],
+            'in': {'$setUnion': ['$$value', {'$ifNull': ['$$this', []]}]}
+        }}}},
+        {'$lookup': {
+            'from': 'pvp_data',
+            'localField': 'characters',
+            'foreignField': 'player_name',
+            'pipeline': [
+                {'$match': stats_match},
+                {'$project': {
+                    '_id': 0, 'player_name': 1, 'kills': 1, 'deaths': 1, 'suicides': 1,
+                    'total_distance': 1, 'longest_streak': 1, 'best_streak': 1
+                }}
+            ],
+            'as': 'stats'
+        }},
+        {'$project': {
+            'faction_name': 1,
+            'faction_tag': 1,
+            'member_count': {'$size': {'$ifNull': ['$members', []]}},
+            'kills': {'$sum': '$stats.kills'},
+            'deaths': {'$sum': '$stats.deaths'},
+            'suicides': {'$sum': '$stats.suicides'},
+            'total_distance': {'$sum': '$stats.total_distance'},
+            'best_streak': {'$max': {'$concatArrays': [
+                [0],
+                {'$map': {'input': '$stats', 'as': 's', 'in': {'$max': [
+                    {'$ifNull': ['$$s.longest_streak', 0]}, {'$ifNull': ['$$s.best_streak', 0]}
+                ]}}}
+            ]}},
+            'active_characters': {'$size': {'$setUnion': ['$stats.player_name', []]}}
+        }}
+    ]
+
+
+def _with_kdr(doc: Dict[str, Any]) -> Dict[str, Any]:
+    kills = doc.get('kills', 0)
+    deaths = doc.get('deaths', 0)
+    doc['kdr'] = kills / deaths if deaths > 0 else float(kills)
+    return doc
+
+
+async def get_faction_leaderboard(db_manager, guild_id: int, limit: int = 10,
+                                  server_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Factions ranked by combined member kills
+
+    Each entry has faction_name (tag if set), kills, deaths, kdr and active_characters.
+    """
+    pipeline = build_faction_pipeline(guild_id, server_id) + [
+        {'$sort': {'kills': -1, 'faction_name': 1}},
+        {'$limit': limit}
+    ]
+    results = await db_manager.factions.aggregate(pipeline).to_list(length=limit)
+    leaderboard = []
+    for doc in results:
+        display = doc.get('faction_tag') or doc.get('faction_name')
+        if not display:
+            continue
+        doc['full_name'] = doc.get('faction_name')
+        doc['faction_name'] = display
+        leaderboard.append(_with_kdr(doc))
+    return leaderboard
+
+
+async def get_faction_totals(db_manager, guild_id: int, faction_id: Any) -> Dict[str, Any]:
+    """Combined stats for one faction document"""
+    pipeline = build_faction_pipeline(guild_id, faction_match={'_id': faction_id})
+    results = await db_manager.factions.aggregate(pipeline).to_list(length=1)
+    if not results:
+        return _with_kdr({'kills': 0, 'deaths': 0, 'suicides': 0, 'total_distance': 0.0,
+                          'best_streak': 0, 'member_count': 0, 'active_characters': 0})
+    return _with_kdr(results[0])
+
+
+async def get_member_totals(db_manager, guild_id: int, member_ids: List[int]) -> Dict[str, Any]:
+    """Combined stats for an arbitrary set of Discord members (one players read, one pvp_data $group)"""
+    characters = set()
+    async for link in db_manager.players.find({'guild_id': guild_id, 'discord_id': {'$in': list(member_ids)}},
+                                              {'linked_characters': 1}):
+        characters.update(link.get('linked_characters', []))
+
+    totals = {'kills': 0, 'deaths': 0, 'suicides': 0, 'total_distance': 0.0, 'best_streak': 0,
+              'member_count': len(member_ids), 'active_characters': 0}
+    if characters:
+        pipeline = [
+            {'$match': {'guild_id': guild_id, 'player_name': {'$in': list(characters)}}},
+            {'$group': {
+                '_id': None,
+                'kills': {'$sum': '$kills'},
+                'deaths': {'$sum': '$deaths'},
+                'suicides': {'$sum': '$suicides'},
+                'total_distance': {'$sum': '$total_distance'},
+                'best_streak': {'$max': {'$max': [{'$ifNull': ['$longest_streak', 0]}, {'$ifNull': ['$best_streak', 0]}]}},
+                'players': {'$addToSet': '$player_name'}
+            }}
+        ]
+        results = await db_manager.pvp_data.aggregate(pipeline).to_list(length=1)
+        if results:
+            result = results[0]
+            totals.update({field: result[field] for field in ('kills', 'deaths', 'suicides', 'total_distance', 'best_streak')})
+            totals['active_characters'] = len(result['players'])
+    return _with_kdr(totals)
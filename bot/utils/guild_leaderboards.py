@@ -0,0 +1,103 @@
+"""
+Guild Leaderboards
+Cross-server rankings that combine each player's characters and servers with a server-side $group
+"""
+
+import logging
+from typing import Dict, List, Any
+
+from bot.utils.unified_cache import get_cache
+
+logger = logging.getLogger(__name__)
+
+# Fields ranked in the combined totals
+GUILD_STATS = ('kills', 'deaths', 'kdr', 'personal_best_distance', 'longest_streak')
+
+# Entries kept per stat in the cached snapshot
+SNAPSHOT_SIZE = 50
+
+SNAPSHOT_SCOPE = 'guild_totals'
+
+
+def build_guild_totals_pipeline(guild_id: int, min_kills: int, size: int = SNAPSHOT_SIZE) -> List[Dict[str, Any]]:
+    """Combine pvp_data per character, then per linked Discord account, and rank every stat in one $facet"""
+    def ranking(stat: str, match: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return [{'$match': match}, {'$sort': {stat: -1, 'player_name': 1}}, {'$limit': size}]
+
+    return [
+        {'$match': {'guild_id': guild_id}},
+        # One document per character across all servers
+        {'$group': {
+            '_id': '$player_name',
+            'kills': {'$sum': '$kills'},
+            'deaths': {'$sum': '$deaths'},
+            'suicides': {'$sum': '$suicides'},
+            'personal_best_distance': {'$max': '$personal_best_distance'},
+            'longest_streak': {'$max': {'$max': [{'$ifNull': ['$longest_streak', 0]}, {'$ifNull': ['$best_streak', 0]}]}},
+            'servers': {'$addToSet': '$server_id'}
+        }},
+        # Equality join on linked_characters so the players index is used; the sub-pipeline only scopes the guild
+        {'$lookup': {
+            'from': 'players',
+            'localField': '_id',
+            'foreignField': 'linked_characters',
+            'pipeline': [
+                {'$match': {'guild_id': guild_id}},
+                {'$project': {'_id': 0, 'discord_id': 1, 'primary_character': 1}},
+                {'$limit': 1}
+            ],
+            'as': 'link'
+        }},
+        {'$unwind': {'path': '$link', 'preserveNullAndEmptyArrays': True}},
+        # One document per Discord account (unlinked characters stand alone)
+        {'$group': {
+            '_id': {'$ifNull': ['$link.discord_id', {'$concat': ['character:', '$_id']}]},
+            'discord_id': {'$first': '$link.discord_id'},
+            'primary_character': {'$first': '$link.primary_character'},
+            'characters': {'$push': '$_id'},
+            'kills': {'$sum': '$kills'},
+            'deaths': {'$sum': '$deaths'},
+            'suicides': {'$sum': '$suicides'},
+            'personal_best_distance': {'$max': '$personal_best_distance'},
+            'longest_streak': {'$max': '$longest_streak'},
+            'servers': {'$push': '$servers'}
+        }},
+        {'$project': {
+            '_id': 0,
+            'discord_id': 1,
+            'characters': 1,
+            'player_name': {'$ifNull': ['$primary_character', {'$arrayElemAt': ['$characters', 0]}]},
+            'kills': 1,
+            'deaths': 1,
+            'suicides': 1,
+            'personal_best_distance': {'$ifNull': ['$personal_best_distance', 0]},
+            'longest_streak': 1,
+            'kdr': {'$cond': [{'$gt': ['$deaths', 0]}, {'$divide': ['$kills', '$deaths']}, {'$toDouble': '$kills'}]},
+            'servers_played': {'$size': {'$reduce': {
+                'input': '$servers', 'initialValue': [], 'in': {'$setUnion': ['$$value', '$$this']}
+            }}}
+        }},
+        {'$facet': {
+            stat: ranking(stat, {'kills': {'$gte': max(min_kills, 1)}} if stat == 'kdr' else {stat: {'$gt': 0}})
+            for stat in GUILD_STATS
+        }}
+    ]
+
+
+async def get_guild_snapshot(db_manager, guild_id: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Combined rankings for a guild, computed once per burst of requests and cached until ingest marks one of its servers dirty"""
+    async def load() -> Dict[str, List[Dict[str, Any]]]:
+        pipeline = build_guild_totals_pipeline(guild_id, db_manager.kdr_min_kills)
+        results = await db_manager.pvp_data.aggregate(pipeline, allowDiskUse=True).to_list(length=1)
+        return results[0] if results else {stat: [] for stat in GUILD_STATS}
+
+    return await get_cache().get_or_load_leaderboard_snapshot(guild_id, load, SNAPSHOT_SCOPE)
+
+
+async def get_guild_leaderboard(db_manager, guild_id: int, stat: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Top players guild-wide for a stat, one entry per linked account or unlinked character"""
+    if stat not in GUILD_STATS:
+        raise ValueError(f"Unsupported guild leaderboard stat: {stat}")
+    snapshot = await get_guild_snapshot(db_manager, guild_id)
+    # Copies so callers can annotate entries without touching the cached snapshot
+    return [dict(entry) for entry in snapshot.get(stat, [])[:limit]]
@@ -0,0 +1,108 @@
+"""
+Kill Event Buckets
+Bucket-pattern storage for kill events: one document per server per hour holding compact kill tuples
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+# Tuple layout for a single kill inside a bucket's "k" array
+KILL_TUPLE_FIELDS = (
+    '_id',
+    'timestamp',
+    'killer',
+    'victim',
+    'weapon',
+    'distance',
+    'is_suicide',
+    'killer_platform',
+    'victim_platform',
+)
+
+# Top-level query keys that can be answered at the bucket level before unwinding
+_BUCKET_LEVEL_KEYS = ('guild_id', 'server_id')
+
+
+def bucket_hour(timestamp: Optional[datetime]) -> datetime:
+    """Truncate a timestamp to the start of its UTC hour"""
+    if not isinstance(timestamp, datetime):
+        timestamp = datetime.now(timezone.utc)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def make_bucket_id(guild_id: int, server_id: str, timestamp: Optional[datetime]) -> str:
+    """Build the bucket _id for a kill at the given time"""
+    return f"{int(guild_id)}:{server_id}:{bucket_hour(timestamp).strftime('%Y%m%d%H')}"
+
+
+def to_kill_tuple(kill_event: Dict[str, Any]) -> List[Any]:
+    """Convert a kill event document into its compact tuple form"""
+    return [kill_event.get(field) for field in KILL_TUPLE_FIELDS]
+
+
+def group_into_buckets(kill_events: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Group kill events by bucket, returning {bucket_id: {guild_id, server_id, hour, kills}}"""
+    buckets = {}
+    for kill_event in kill_events:
+        guild_id = kill_event.get('guild_id')
+        server_id = kill_event.get('server_id')
+        timestamp = kill_event.get('timestamp')
+        bucket_id = make_bucket_id(guild_id, server_id, timestamp)
+
+        bucket = buckets.get(bucket_id)
+        if bucket is None:
+            bucket = {
+                'guild_id': guild_id,
+                'server_id': server_id,
+                'hour': bucket_hour(timestamp),
+                'kills': []
+            }
+            buckets[bucket_id] = bucket
+        bucket['kills'].append(kill_event)
+    return buckets
+
+
+def _bucket_match(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Derive a bucket-level filter from a kill event query"""
+    match = {key: query[key] for key in _BUCKET_LEVEL_KEYS if key in query}
+
+    timestamp = query.get('timestamp')
+    if isinstance(timestamp, dict):
+        hour_range = {}
+        lower = timestamp.get('$gte', timestamp.get('$gt'))
+        upper = timestamp.get('$lte', timestamp.get('$lt'))
+        if isinstance(lower, datetime):
+            hour_range['$gte'] = bucket_hour(lower)
+        if isinstance(upper, datetime):
+            hour_range['$lte'] = bucket_hour(upper)
+        if hour_range:
+            match['hour'] = hour_range
+    return match
+
+
+def expand_stages(query: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """Pipeline stages that turn buckets back into per-kill documents matching query"""
+    query = query or {}
+    projection = {'guild_id': 1, 'server_id': 1}
+    for index, field in enumerate(KILL_TUPLE_FIELDS):
+        projection[field] = {'$arrayElemAt': ['$k', index]}
+
+    stages = [
+        {'$match': _bucket_match(query)},
+        {'$unwind': '$k'},
+        {'$project': projection}
+    ]
+    if query:
+        stages.append({'$match': query})
+    return stages
+
+
+def rewrite_pipeline(pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rewrite a kill_events aggregation pipeline to run against the bucket collection"""
+    pipeline = list(pipeline)
+    query = {}
+    if pipeline and '$match' in pipeline[0]:
+        query = pipeline.pop(0)['$match']
+    return expand_stages(query) + pipeline
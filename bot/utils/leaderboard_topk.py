@@ -0,0 +1,219 @@
+"""
+Leaderboard Top-K
+In-memory per-server top-K rankings for stats that only change at kill ingest
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Ranked pvp_data fields; all of them only grow between server resets
+RANKED_STATS = ('kills', 'longest_streak', 'personal_best_distance', 'deaths')
+
+DEFAULT_K = 50
+
+ENTRY_FIELDS = {
+    '_id': 0, 'guild_id': 1, 'server_id': 1, 'player_name': 1, 'kills': 1, 'deaths': 1, 'suicides': 1,
+    'kdr': 1, 'longest_streak': 1, 'best_streak': 1, 'personal_best_distance': 1, 'total_distance': 1
+}
+
+
+class StatTopK:
+    """The K best players of one server for one stat
+
+    Values never decrease, so a player outside the top K can only enter by beating the current floor.
+    """
+
+    def __init__(self, stat: str, k: int = DEFAULT_K):
+        self.stat = stat
+        self.k = k
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._ranked: Optional[List[Dict[str, Any]]] = None
+
+    def _value(self, entry: Dict[str, Any]) -> float:
+        return entry.get(self.stat) or 0
+
+    def load(self, docs: Iterable[Dict[str, Any]]):
+        """Replace the ranking with docs already sorted by the stat"""
+        self.entries = {}
+        for doc in docs:
+            if len(self.entries) >= self.k:
+                break
+            if doc.get('player_name') and self._value(doc) > 0:
+                self.entries[doc['player_name']] = doc
+        self._ranked = None
+
+    def offer(self, doc: Dict[str, Any]) -> bool:
+        """Apply a player's current stats; returns True if the ranking changed"""
+        name = doc.get('player_name')
+        if not name or self._value(doc) <= 0:
+            return False
+
+        if name in self.entries:
+            self.entries[name] = doc
+        elif len(self.entries) < self.k:
+            self.entries[name] = doc
+        else:
+            floor_name = min(self.entries, key=lambda player: self._value(self.entries[player]))
+            if self._value(doc) <= self._value(self.entries[floor_name]):
+                return False
+            del self.entries[floor_name]
+            self.entries[name] = doc
+
+        self._ranked = None
+        return True
+
+    def top(self, limit: int) -> List[Dict[str, Any]]:
+        """Best entries first, ties broken by name"""
+        if self._ranked is None:
+            self._ranked = sorted(self.entries.values(), key=lambda entry: (-self._value(entry), entry['player_name']))
+        return self._ranked[:limit]
+
+
+class ServerTopK:
+    """Top-K rankings of every ranked stat for a single game server"""
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.stats = {stat: StatTopK(stat, k) for stat in RANKED_STATS}
+        self.seeded = False
+        self.pending: set = set()  # Players changed while a seed was reading pvp_data
+
+
+class LeaderboardTopK:
+    """
+    Serves kills, streak, distance and deaths leaderboards from memory
+
+    - Each server is seeded from pvp_data at startup (or lazily on first use)
+    - Kill ingest re-offers the affected players, so reads cost no database round trips
+    - Bulk resets drop a server so it is reseeded on next use
+    """
+
+    def __init__(self, k: int = DEFAULT_K):
+        self.k = k
+        self.servers: Dict[Tuple[int, str], ServerTopK] = {}
+        self.guild_servers: Dict[int, set] = {}
+        self._seed_locks: Dict[Tuple[int, str], asyncio.Lock] = {}
+
+    def _get_server(self, guild_id: int, server_id: str) -> ServerTopK:
+        key = (int(guild_id), str(server_id))
+        rankings = self.servers.get(key)
+        if rankings is None:
+            rankings = ServerTopK(self.k)
+            self.servers[key] = rankings
+            self.guild_servers.setdefault(key[0], set()).add(key[1])
+        return rankings
+
+    async def ensure_seeded(self, db_manager, guild_id: int, server_id: str) -> ServerTopK:
+        """Load the top K of every ranked stat for a server once"""
+        rankings = self._get_server(guild_id, server_id)
+        if rankings.seeded:
+            return rankings
+
+        key = (int(guild_id), str(server_id))
+        lock = self._seed_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            if rankings.seeded:
+                return rankings
+
+            query = {'guild_id': key[0], 'server_id': key[1]}
+            results = await asyncio.gather(*[
+                db_manager.pvp_data.find({**query, stat: {'$gt': 0}}, ENTRY_FIELDS).sort(stat, -1).limit(self.k).to_list(length=self.k)
+                for stat in RANKED_STATS
+            ])
+            for stat, docs in zip(RANKED_STATS, results):
+                rankings.stats[stat].load(docs)
+            rankings.seeded = True
+
+            # The seed may have read these players before their latest stats were written
+            pending, rankings.pending = rankings.pending, set()
+            if pending:
+                await self.refresh_players(db_manager, key[0], key[1], pending)
+            return rankings
+
+    async def seed_all(self, db_manager) -> int:
+        """Seed every configured server at startup"""
+        seeded = 0
+        async for guild_config in db_manager.guild_configs.find({}, {'guild_id': 1, 'servers._id': 1, 'servers.server_id': 1}):
+            guild_id = guild_config.get('guild_id')
+            if not guild_id:
+                continue
+            for server in guild_config.get('servers', []):
+                server_id = server.get('_id') or server.get('server_id')
+                if not server_id:
+                    continue
+                try:
+                    await self.ensure_seeded(db_manager, guild_id, server_id)
+                    seeded += 1
+                except Exception as e:
+                    logger.error(f"Failed to seed leaderboards for {guild_id}/{server_id}: {e}")
+        logger.info(f"Seeded in-memory leaderboards for {seeded} servers")
+        return seeded
+
+    async def refresh_players(self, db_manager, guild_id: int, server_id: str, player_names: Iterable[str]):
+        """Re-offer players whose stats just changed on a seeded server"""
+        key = (int(guild_id), str(server_id))
+        rankings = self.servers.get(key)
+        names = [name for name in set(player_names) if name]
+        if not rankings or not names:
+            return
+        if not rankings.seeded:
+            lock = self._seed_locks.get(key)
+            if lock and lock.locked():
+                rankings.pending.update(names)
+            return
+
+        cursor = db_manager.pvp_data.find(
+            {'guild_id': int(guild_id), 'server_id': str(server_id), 'player_name': {'$in': names}},
+            ENTRY_FIELDS
+        )
+        async for doc in cursor:
+            for ranking in rankings.stats.values():
+                ranking.offer(doc)
+
+    def invalidate_server(self, guild_id: int, server_id: str):
+        """Forget a server after a bulk reset so it is reseeded on next use"""
+        rankings = self.servers.get((int(guild_id), str(server_id)))
+        if rankings:
+            rankings.seeded = False
+
+    async def get_top(self, db_manager, guild_id: int, stat: str, limit: int = 10,
+                      server_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Top players for a stat on one server, or per-server entries merged across the guild"""
+        if stat not in RANKED_STATS:
+            raise ValueError(f"Unsupported leaderboard stat: {stat}")
+
+        if server_id and server_id != 'all':
+            server_ids = [str(server_id)]
+        else:
+            server_ids = sorted(self.guild_servers.get(int(guild_id), ()))
+            if not server_ids:
+                guild_config = await db_manager.guild_configs.find_one(
+                    {'guild_id': int(guild_id)}, {'servers._id': 1, 'servers.server_id': 1}
+                )
+                server_ids = [
+                    str(server.get('_id') or server.get('server_id'))
+                    for server in (guild_config or {}).get('servers', [])
+                    if server.get('_id') or server.get('server_id')
+                ]
+
+        entries: List[Dict[str, Any]] = []
+        for sid in server_ids:
+            rankings = await self.ensure_seeded(db_manager, guild_id, sid)
+            entries.extend(rankings.stats[stat].top(limit))
+
+        if len(server_ids) > 1:
+            entries.sort(key=lambda entry: (-(entry.get(stat) or 0), entry['player_name']))
+        # Copies so callers can annotate entries without touching the shared rankings
+        return [dict(entry) for entry in entries[:limit]]
+
+
+_leaderboard_topk = None
+
+def get_leaderboard_topk() -> LeaderboardTopK:
+    """Get the global in-memory leaderboard instance"""
+    global _leaderboard_topk
+    if _leaderboard_topk is None:
+        _leaderboard_topk = LeaderboardTopK()
+    return _leaderboard_topk
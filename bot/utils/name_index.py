@@ -0,0 +1,300 @@
+"""
+Name Index
+Per-guild in-memory prefix indexes over character, server and faction names for autocomplete,
+plus a trigram index over character names for fuzzy lookups
+"""
+
+import asyncio
+import bisect
+import logging
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Discord accepts at most 25 autocomplete choices
+MAX_CHOICES = 25
+
+# Minimum trigram similarity for a fuzzy suggestion (same default as pg_trgm)
+FUZZY_THRESHOLD = 0.3
+
+_NON_ALNUM = re.compile(r'[\W_]+')
+
+
+def normalize_name(name: Any) -> str:
+    """Lookup key for a name (casefolded, whitespace collapsed)"""
+    return ' '.join(str(name or '').split()).casefold()
+
+
+class PrefixIndex:
+    """Sorted array of (key, display, value) answering prefix queries with bisect"""
+
+    def __init__(self):
+        self.entries: List[Tuple[str, str, str]] = []
+        self.values: Dict[str, Tuple[str, str, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, display: str, value: Optional[str] = None) -> bool:
+        """Insert a name; returns False if the value is already indexed under the same display"""
+        value = display if value is None else value
+        entry = (normalize_name(display), display, value)
+        if not entry[0]:
+            return False
+
+        existing = self.values.get(value)
+        if existing == entry:
+            return False
+        if existing:
+            self.entries.pop(bisect.bisect_left(self.entries, existing))
+
+        bisect.insort(self.entries, entry)
+        self.values[value] = entry
+        return True
+
+    def remove(self, value: str) -> bool:
+        """Drop a name by value"""
+        entry = self.values.pop(value, None)
+        if entry is None:
+            return False
+        self.entries.pop(bisect.bisect_left(self.entries, entry))
+        return True
+
+    def replace_all(self, items: Iterable[Tuple[str, str]]):
+        """Rebuild from (display, value) pairs"""
+        self.values = {}
+        for display, value in items:
+            key = normalize_name(display)
+            if key:
+                self.values[value] = (key, display, value)
+        self.entries = sorted(self.values.values())
+
+    def search(self, prefix: str, limit: int = MAX_CHOICES, contains: bool = False) -> List[Tuple[str, str]]:
+        """(display, value) pairs whose name starts with prefix, optionally topped up with substring matches"""
+        key = normalize_name(prefix)
+        start = bisect.bisect_left(self.entries, (key,))
+        results = []
+        seen = set()
+        for entry in self.entries[start:]:
+            if len(results) >= limit or not entry[0].startswith(key):
+                break
+            results.append((entry[1], entry[2]))
+            seen.add(entry[2])
+
+        if contains and key and len(results) < limit:
+            for entry in self.entries:
+                if len(results) >= limit:
+                    break
+                if entry[2] not in seen and key in entry[0]:
+                    results.append((entry[1], entry[2]))
+        return results
+
+
+def fold_name(name: Any) -> str:
+    """Looser key for fuzzy matching: accents stripped, punctuation and clan tag brackets turned into spaces"""
+    decomposed = unicodedata.normalize('NFKD', str(name or ''))
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(_NON_ALNUM.sub(' ', stripped.casefold()).split())
+
+
+def trigrams(name: Any) -> set:
+    """Trigrams of each word padded like pg_trgm ('  w', ' wo', ..., 'rd ')"""
+    grams = set()
+    for word in fold_name(name).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Inverted index from trigram to names, ranking candidates by trigram similarity"""
+
+    def __init__(self):
+        self.postings: Dict[str, set] = {}
+        self.grams: Dict[str, set] = {}
+
+    def __len__(self) -> int:
+        return len(self.grams)
+
+    def add(self, name: str) -> bool:
+        """Index a name; returns False if it is already present"""
+        if name in self.grams:
+            return False
+        grams = trigrams(name)
+        if not grams:
+            return False
+        self.grams[name] = grams
+        for gram in grams:
+            self.postings.setdefault(gram, set()).add(name)
+        return True
+
+    def replace_all(self, names: Iterable[str]):
+        self.postings = {}
+        self.grams = {}
+        for name in names:
+            self.add(name)
+
+    def search(self, query: str, limit: int = 5, threshold: float = FUZZY_THRESHOLD) -> List[Tuple[str, float]]:
+        """(name, similarity) pairs best first, similarity being shared / total distinct trigrams"""
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        shared = Counter()
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+
+        folded_query = fold_name(query)
+        scored = []
+        for name, count in shared.items():
+            score = count / (len(query_grams) + len(self.grams[name]) - count)
+            if folded_query in fold_name(name):
+                # Query appears verbatim (e.g. the name without its clan tag): always suggest, still ranked by similarity
+                score = threshold + (1 - threshold) * score
+            if score >= threshold:
+                scored.append((name, score))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+
+class GuildNameIndex:
+    """Character, server and faction names of one guild"""
+
+    def __init__(self):
+        self.characters = PrefixIndex()
+        self.fuzzy_characters = TrigramIndex()
+        self.servers = PrefixIndex()
+        self.factions = PrefixIndex()
+        self.characters_seeded = False
+        self.servers_seeded = False
+        self.factions_seeded = False
+
+
+class NameIndex:
+    """
+    Serves autocomplete without touching MongoDB
+
+    - Each name kind is seeded lazily per guild on first use
+    - Ingest adds new character names, admin and faction commands keep servers and factions current
+    - Character names are also trigram-indexed for "did you mean" suggestions
+    """
+
+    def __init__(self):
+        self.guilds: Dict[int, GuildNameIndex] = {}
+        self._seed_locks: Dict[Tuple[int, str], asyncio.Lock] = {}
+
+    def _get_guild(self, guild_id: int) -> GuildNameIndex:
+        guild_index = self.guilds.get(int(guild_id))
+        if guild_index is None:
+            guild_index = GuildNameIndex()
+            self.guilds[int(guild_id)] = guild_index
+        return guild_index
+
+    async def _seed(self, guild_id: int, kind: str, loader):
+        guild_index = self._get_guild(guild_id)
+        flag = f"{kind}_seeded"
+        if getattr(guild_index, flag):
+            return guild_index
+
+        lock = self._seed_locks.setdefault((int(guild_id), kind), asyncio.Lock())
+        async with lock:
+            if not getattr(guild_index, flag):
+                await loader(guild_index)
+                setattr(guild_index, flag, True)
+        return guild_index
+
+    async def ensure_characters(self, db_manager, guild_id: int) -> GuildNameIndex:
+        """Load every known character name of a guild once"""
+        async def load(guild_index: GuildNameIndex):
+            names = set(await db_manager.pvp_data.distinct('player_name', {'guild_id': int(guild_id)}))
+            names.update(await db_manager.player_sessions.distinct('player_name', {'guild_id': int(guild_id)}))
+            names.discard(None)
+            names.discard('Unknown')
+            names = [name for name in names if isinstance(name, str)]
+            guild_index.characters.replace_all((name, name) for name in names)
+            guild_index.fuzzy_characters.replace_all(names)
+        return await self._seed(guild_id, 'characters', load)
+
+    async def ensure_servers(self, db_manager, guild_id: int) -> GuildNameIndex:
+        """Load the configured servers of a guild once"""
+        async def load(guild_index: GuildNameIndex):
+            guild_config = await db_manager.get_guild(int(guild_id))
+            items = []
+            for server in (guild_config or {}).get('servers', []):
+                server_id = str(server.get('_id', server.get('server_id', 'unknown')))
+                server_name = server.get('name', server.get('server_name', f'Server {server_id}'))
+                items.append((f"{server_name} (ID: {server_id})", server_id))
+            guild_index.servers.replace_all(items)
+        return await self._seed(guild_id, 'servers', load)
+
+    async def ensure_factions(self, db_manager, guild_id: int) -> GuildNameIndex:
+        """Load the faction names of a guild once"""
+        async def load(guild_index: GuildNameIndex):
+            cursor = db_manager.factions.find({'guild_id': int(guild_id)}, {'faction_name': 1})
+            names = [doc['faction_name'] async for doc in cursor if doc.get('faction_name')]
+            guild_index.factions.replace_all((name, name) for name in names)
+        return await self._seed(guild_id, 'factions', load)
+
+    def add_characters(self, guild_id: int, names: Iterable[str]) -> List[str]:
+        """Index character names seen at ingest; returns the names that were new"""
+        guild_index = self.guilds.get(int(guild_id))
+        if not guild_index or not guild_index.characters_seeded:
+            return []
+        added = []
+        for name in names:
+            if name and name != 'Unknown' and guild_index.characters.add(name):
+                guild_index.fuzzy_characters.add(name)
+                added.append(name)
+        return added
+
+    def invalidate_servers(self, guild_id: int):
+        """Reload a guild's servers on next use after a server is added or removed"""
+        guild_index = self.guilds.get(int(guild_id))
+        if guild_index:
+            guild_index.servers_seeded = False
+
+    def invalidate_factions(self, guild_id: Optional[int] = None):
+        """Reload faction names on next use after bulk faction changes"""
+        for g_id, guild_index in self.guilds.items():
+            if guild_id is None or g_id == int(guild_id):
+                guild_index.factions_seeded = False
+
+    def add_faction(self, guild_id: int, faction_name: str):
+        guild_index = self.guilds.get(int(guild_id))
+        if guild_index and guild_index.factions_seeded:
+            guild_index.factions.add(faction_name)
+
+    def remove_faction(self, guild_id: int, faction_name: str):
+        guild_index = self.guilds.get(int(guild_id))
+        if guild_index and guild_index.factions_seeded:
+            guild_index.factions.remove(faction_name)
+
+    async def complete_characters(self, db_manager, guild_id: int, prefix: str, limit: int = MAX_CHOICES) -> List[Tuple[str, str]]:
+        guild_index = await self.ensure_characters(db_manager, guild_id)
+        return guild_index.characters.search(prefix, limit)
+
+    async def suggest_characters(self, db_manager, guild_id: int, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Known character names that look like query, best first"""
+        guild_index = await self.ensure_characters(db_manager, guild_id)
+        return guild_index.fuzzy_characters.search(query, limit)
+
+    async def complete_servers(self, db_manager, guild_id: int, text: str, limit: int = MAX_CHOICES) -> List[Tuple[str, str]]:
+        guild_index = await self.ensure_servers(db_manager, guild_id)
+        return guild_index.servers.search(text, limit, contains=True)
+
+    async def complete_factions(self, db_manager, guild_id: int, prefix: str, limit: int = MAX_CHOICES) -> List[Tuple[str, str]]:
+        guild_index = await self.ensure_factions(db_manager, guild_id)
+        return guild_index.factions.search(prefix, limit, contains=True)
+
+
+_name_index = None
+
+def get_name_index() -> NameIndex:
+    """Get the global name index instance"""
+    global _name_index
+    if _name_index is None:
+        _name_index = NameIndex()
+    return _name_index
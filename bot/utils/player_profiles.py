@@ -0,0 +1,276 @@
+"""
+Player Profiles
+Materialized per-guild, per-character profile documents maintained at kill ingest
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Weapons that never count towards weapon stats, shared by profiles, rollups and weapon counters
+EXCLUDED_WEAPONS = ('Menu Suicide', 'Suicide', 'Falling', 'suicide_by_relocation')
+
+
+def field_key(name: Any) -> str:
+    """Make a player, weapon or server name safe to use as a MongoDB field name"""
+    return str(name or 'Unknown').replace('.', '_').replace('$', '_')
+
+
+def profile_id(guild_id: int, player_name: str) -> str:
+    """Build the _id of a player profile"""
+    return f"{int(guild_id)}:{player_name}"
+
+
+def _add(counters: Dict[str, Any], field: str, amount=1):
+    counters[field] = counters.get(field, 0) + amount
+
+
+def _fold_events(server_id: str, kill_events: List[Dict[str, Any]], increments: Dict[str, Dict[str, Any]],
+                 maxima: Dict[str, Dict[str, Any]]):
+    """Add kill events to per-character increment and maximum fields"""
+    server_field = f"servers.{field_key(server_id)}"
+
+    def entry(name: str):
+        if name not in increments:
+            increments[name] = {}
+            maxima[name] = {}
+        return increments[name], maxima[name]
+
+    for event in kill_events:
+        killer = event.get('killer')
+        victim = event.get('victim')
+        if not killer or not victim:
+            continue
+
+        if event.get('is_suicide'):
+            inc, _ = entry(killer)
+            _add(inc, 'suicides')
+            _add(inc, f"{server_field}.suicides")
+            continue
+
+        distance = event.get('distance') or 0
+        weapon = event.get('weapon') or 'Unknown'
+
+        inc, max_fields = entry(killer)
+        _add(inc, 'kills')
+        _add(inc, f"{server_field}.kills")
+        _add(inc, 'distance_sum', distance)
+        _add(inc, f"victims.{field_key(victim)}")
+        if weapon not in EXCLUDED_WEAPONS:
+            _add(inc, f"weapons.{field_key(weapon)}")
+        max_fields['personal_best_distance'] = max(max_fields.get('personal_best_distance', 0), distance)
+
+        inc, _ = entry(victim)
+        _add(inc, 'deaths')
+        _add(inc, f"{server_field}.deaths")
+        _add(inc, f"killed_by.{field_key(killer)}")
+
+
+def _fold_rollup(rollup: Dict[str, Any]) -> Dict[str, Any]:
+    """Increment fields for a retention rollup of one player"""
+    server_field = f"servers.{field_key(rollup.get('server_id'))}"
+    inc = {}
+    for field in ('kills', 'deaths', 'suicides'):
+        if rollup.get(field):
+            inc[field] = rollup[field]
+            inc[f"{server_field}.{field}"] = rollup[field]
+    if rollup.get('distance_sum'):
+        inc['distance_sum'] = rollup['distance_sum']
+    for source in ('weapons', 'victims', 'killed_by'):
+        for name, count in (rollup.get(source) or {}).items():
+            if source == 'weapons' and name in EXCLUDED_WEAPONS:
+                continue
+            inc[f"{source}.{name}"] = count
+    return inc
+
+
+def build_profile_operations(guild_id: int, server_id: str, kill_events: List[Dict[str, Any]],
+                             best_streaks: Optional[Dict[str, int]] = None) -> List[UpdateOne]:
+    """Fold newly ingested kill events into per-character profile upserts"""
+    increments: Dict[str, Dict[str, Any]] = {}
+    maxima: Dict[str, Dict[str, Any]] = {}
+    _fold_events(server_id, kill_events, increments, maxima)
+
+    for name, streak in (best_streaks or {}).items():
+        if name and streak:
+            increments.setdefault(name, {})
+            max_fields = maxima.setdefault(name, {})
+            max_fields['best_streak'] = max(max_fields.get('best_streak', 0), streak)
+
+    now = datetime.now(timezone.utc)
+    operations = []
+    for name in increments:
+        update = {
+            '$setOnInsert': {'guild_id': int(guild_id), 'player_name': name},
+            '$set': {'updated_at': now}
+        }
+        if increments[name]:
+            update['$inc'] = increments[name]
+        if maxima[name]:
+            update['$max'] = maxima[name]
+        operations.append(UpdateOne({'_id': profile_id(guild_id, name)}, update, upsert=True))
+    return operations
+
+
+def summarize_profiles(profiles: List[Dict[str, Any]], player_characters: List[str]) -> Dict[str, Any]:
+    """Combine one or more character profiles into the /stats breakdown fields"""
+    alts = set(player_characters)
+    alt_keys = {field_key(name) for name in player_characters}
+    summary = {
+        'kills': 0,
+        'deaths': 0,
+        'suicides': 0,
+        'personal_best_distance': 0.0,
+        'best_streak': 0,
+        'servers': set(),
+        'weapon_stats': {},
+        'victims': {},
+        'killed_by': {}
+    }
+
+    for profile in profiles:
+        summary['kills'] += profile.get('kills', 0)
+        summary['deaths'] += profile.get('deaths', 0)
+        summary['suicides'] += profile.get('suicides', 0)
+        summary['personal_best_distance'] = max(summary['personal_best_distance'], float(profile.get('personal_best_distance', 0)))
+        summary['best_streak'] = max(summary['best_streak'], profile.get('best_streak', 0))
+        summary['servers'].update((profile.get('servers') or {}).keys())
+
+        for source, target in (('weapons', 'weapon_stats'), ('victims', 'victims'), ('killed_by', 'killed_by')):
+            for name, count in (profile.get(source) or {}).items():
+                if target != 'weapon_stats' and (name in alts or name in alt_keys):
+                    continue  # Don't count alt kills
+                summary[target][name] = summary[target].get(name, 0) + count
+
+    summary['servers_played'] = len(summary.pop('servers'))
+    return summary
+
+
+async def rebuild_player_profiles(db_manager, guild_id: int, chunk_size: int = 5000) -> int:
+    """Recompute every profile for a guild from kill_events, retention rollups and pvp_data streaks
+
+    Profiles are built in a scratch collection and replace the live ones in one $merge, so readers never
+    see a partially rebuilt guild. Kills ingested for the guild while the rebuild runs are overwritten by
+    the replace; only profiles first created after the start survive the cleanup. Run it when the guild
+    is not ingesting (startup migrations, admin backfill) and use subtract_server_profiles for a
+    single server refresh.
+    """
+    started = datetime.now(timezone.utc)
+    scratch = db_manager.db[f"player_profiles_rebuild_{int(guild_id)}"]
+    await scratch.drop()
+    try:
+        processed = await _build_profiles(db_manager, scratch, guild_id, chunk_size)
+        await scratch.update_many({}, {'$set': {'rebuilt_at': started}})
+
+        # Swap: replace every rebuilt profile, then drop stale ones nobody touched since the start
+        await scratch.aggregate([
+            {'$merge': {'into': db_manager.player_profiles.name, 'on': '_id',
+                        'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+        ]).to_list(length=None)
+        await db_manager.player_profiles.delete_many({
+            'guild_id': guild_id,
+            'rebuilt_at': {'$ne': started},
+            'updated_at': {'$lt': started}
+        })
+    finally:
+        await scratch.drop()
+
+    logger.info(f"Rebuilt player profiles for guild {guild_id} from {processed} kill events")
+    return processed
+
+
+async def subtract_server_profiles(db_manager, guild_id: int, server_id: str, chunk_size: int = 5000) -> int:
+    """Take one server's kills and rollups back out of the guild's profiles before its history is re-ingested
+
+    Only that server's events are read, and the result is applied as negative increments, so kills other
+    servers ingest meanwhile are kept. Maxima (best distance and streak) cannot be subtracted and stay.
+    """
+    increments: Dict[str, Dict[str, Any]] = {}
+    maxima: Dict[str, Dict[str, Any]] = {}
+    processed = 0
+    chunk: List[Dict[str, Any]] = []
+    async for event in db_manager.find_kill_events({'guild_id': guild_id, 'server_id': server_id}):
+        chunk.append(event)
+        if len(chunk) >= chunk_size:
+            _fold_events(server_id, chunk, increments, maxima)
+            processed += len(chunk)
+            chunk = []
+    _fold_events(server_id, chunk, increments, maxima)
+    processed += len(chunk)
+
+    async for rollup in db_manager.kill_rollups.find({'guild_id': guild_id, 'server_id': server_id, 'type': 'player'}):
+        inc = increments.setdefault(rollup['player_name'], {})
+        for field, count in _fold_rollup(rollup).items():
+            _add(inc, field, count)
+
+    server_field = f"servers.{field_key(server_id)}"
+    now = datetime.now(timezone.utc)
+    operations = []
+    for name, inc in increments.items():
+        update = {'$unset': {server_field: ''}, '$set': {'updated_at': now}}
+        totals = {field: -count for field, count in inc.items() if not field.startswith(f"{server_field}.")}
+        if totals:
+            update['$inc'] = totals
+        operations.append(UpdateOne({'_id': profile_id(guild_id, name)}, update))
+    for start in range(0, len(operations), chunk_size):
+        await db_manager.player_profiles.bulk_write(operations[start:start + chunk_size], ordered=False)
+
+    logger.info(f"Subtracted {processed} kill events of server {server_id} from guild {guild_id} profiles")
+    return processed
+
+
+async def _build_profiles(db_manager, target, guild_id: int, chunk_size: int) -> int:
+    """Write a guild's recomputed profiles into target"""
+    # Raw kill events, applied in chunks
+    processed = 0
+    chunk: List[Dict[str, Any]] = []
+
+    async def apply_chunk(events: List[Dict[str, Any]]):
+        by_server: Dict[str, List[Dict[str, Any]]] = {}
+        for event in events:
+            by_server.setdefault(str(event.get('server_id')), []).append(event)
+        for server_id, server_events in by_server.items():
+            operations = build_profile_operations(guild_id, server_id, server_events)
+            if operations:
+                await target.bulk_write(operations, ordered=False)
+
+    cursor = db_manager.find_kill_events({'guild_id': guild_id})
+    async for event in cursor:
+        chunk.append(event)
+        if len(chunk) >= chunk_size:
+            await apply_chunk(chunk)
+            processed += len(chunk)
+            chunk = []
+    if chunk:
+        await apply_chunk(chunk)
+        processed += len(chunk)
+
+    # Kills already rolled up by retention
+    operations = []
+    async for rollup in db_manager.kill_rollups.find({'guild_id': guild_id, 'type': 'player'}):
+        inc = _fold_rollup(rollup)
+        update = {'$setOnInsert': {'guild_id': guild_id, 'player_name': rollup['player_name']}}
+        if inc:
+            update['$inc'] = inc
+        if rollup.get('max_distance'):
+            update['$max'] = {'personal_best_distance': rollup['max_distance']}
+        operations.append(UpdateOne({'_id': profile_id(guild_id, rollup['player_name'])}, update, upsert=True))
+
+    # Streaks only live in pvp_data
+    async for stats in db_manager.pvp_data.find({'guild_id': guild_id}, {'player_name': 1, 'best_streak': 1, 'longest_streak': 1}):
+        best_streak = max(stats.get('best_streak', 0) or 0, stats.get('longest_streak', 0) or 0)
+        if stats.get('player_name') and best_streak:
+            operations.append(UpdateOne(
+                {'_id': profile_id(guild_id, stats['player_name'])},
+                {'$setOnInsert': {'guild_id': guild_id, 'player_name': stats['player_name']},
+                 '$max': {'best_streak': best_streak}},
+                upsert=True
+            ))
+
+    if operations:
+        await target.bulk_write(operations, ordered=False)
+    return processed
@@ -0,0 +1,143 @@
+"""
+Premium Entitlements
+In-memory per-guild premium server sets, loaded in one query and kept current by the activate/deactivate paths
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Any
+
+logger = logging.getLogger(__name__)
+
+
+def _expiry_timestamp(expires_at: Any) -> Optional[float]:
+    """Epoch seconds for an expires_at value (naive datetimes are stored as UTC), None for no expiry"""
+    if not isinstance(expires_at, datetime):
+        return None
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at.timestamp()
+
+
+class PremiumEntitlements:
+    """
+    Answers premium checks from memory
+
+    - Every active server_premium_status document is loaded in one query on first use
+    - Activation and deactivation update the guild's entry directly
+    - Entries past their expires_at are dropped when looked up
+    """
+
+    def __init__(self):
+        # guild_id -> {server_id: expiry timestamp or None}
+        self.guilds: Dict[int, Dict[str, Optional[float]]] = {}
+        self.loaded = False
+        self._stale_guilds: set = set()
+        self._load_lock = asyncio.Lock()
+
+    @staticmethod
+    def _projection() -> Dict[str, int]:
+        return {'guild_id': 1, 'server_id': 1, 'expires_at': 1}
+
+    async def load_all(self, db_manager) -> bool:
+        """Load every active premium server in one query"""
+        try:
+            guilds: Dict[int, Dict[str, Optional[float]]] = {}
+            cursor = db_manager.server_premium_status.find({'is_active': True}, self._projection())
+            async for doc in cursor:
+                if doc.get('guild_id') is None or doc.get('server_id') is None:
+                    continue
+                guilds.setdefault(int(doc['guild_id']), {})[str(doc['server_id'])] = _expiry_timestamp(doc.get('expires_at'))
+
+            self.guilds = guilds
+            self._stale_guilds.clear()
+            self.loaded = True
+            logger.info(f"Loaded premium entitlements for {len(guilds)} guilds")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to load premium entitlements: {e}")
+            return False
+
+    async def _reload_guild(self, db_manager, guild_id: int):
+        cursor = db_manager.server_premium_status.find({'guild_id': guild_id, 'is_active': True}, self._projection())
+        self.guilds[guild_id] = {
+            str(doc['server_id']): _expiry_timestamp(doc.get('expires_at'))
+            async for doc in cursor if doc.get('server_id') is not None
+        }
+        self._stale_guilds.discard(guild_id)
+
+    async def _ensure_loaded(self, db_manager, guild_id: int):
+        if not self.loaded:
+            async with self._load_lock:
+                if not self.loaded:
+                    await self.load_all(db_manager)
+        elif guild_id in self._stale_guilds:
+            async with self._load_lock:
+                if guild_id in self._stale_guilds:
+                    await self._reload_guild(db_manager, guild_id)
+
+    def _active_servers(self, guild_id: int) -> Dict[str, Optional[float]]:
+        servers = self.guilds.get(guild_id)
+        if not servers:
+            return {}
+        now = time.time()
+        expired = [server_id for server_id, expires in servers.items() if expires is not None and expires <= now]
+        for server_id in expired:
+            del servers[server_id]
+        return servers
+
+    def grant(self, guild_id: int, server_id: str, expires_at: Optional[datetime] = None):
+        """Record a server activation"""
+        self.guilds.setdefault(int(guild_id), {})[str(server_id)] = _expiry_timestamp(expires_at)
+
+    def revoke(self, guild_id: int, server_id: str):
+        """Record a server deactivation"""
+        self.guilds.get(int(guild_id), {}).pop(str(server_id), None)
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        """Reload a guild (or everything) on next use after premium documents were changed elsewhere"""
+        if guild_id is None:
+            self.loaded = False
+        else:
+            self._stale_guilds.add(int(guild_id))
+
+    async def is_server_premium(self, db_manager, guild_id: int, server_id: str) -> bool:
+        """Check if a specific server has unexpired premium"""
+        try:
+            guild_id = int(guild_id)
+            await self._ensure_loaded(db_manager, guild_id)
+            return str(server_id) in self._active_servers(guild_id)
+        except Exception as e:
+            logger.error(f"Failed to check server premium status: {e}")
+            return False
+
+    async def count_premium_servers(self, db_manager, guild_id: int) -> int:
+        """Count servers with unexpired premium in a guild"""
+        try:
+            guild_id = int(guild_id)
+            await self._ensure_loaded(db_manager, guild_id)
+            return len(self._active_servers(guild_id))
+        except Exception as e:
+            logger.error(f"Failed to count premium servers: {e}")
+            return 0
+
+    async def has_premium_access(self, db_manager, guild_id: int, server_id: Optional[str] = None) -> bool:
+        """
+        Server-specific features: the server itself must be premium
+        Guild-wide features (economy, gambling, factions...): any premium server in the guild
+        """
+        if server_id:
+            return await self.is_server_premium(db_manager, guild_id, server_id)
+        return await self.count_premium_servers(db_manager, guild_id) > 0
+
+
+_premium_entitlements = None
+
+def get_premium_entitlements() -> PremiumEntitlements:
+    """Get the global premium entitlements instance"""
+    global _premium_entitlements
+    if _premium_entitlements is None:
+        _premium_entitlements = PremiumEntitlements()
+    return _premium_entitlements
@@ -10,6 +10,8 @@ import discord
 import discord
 from discord.ext import commands
 
+from .premium_entitlements import get_premium_entitlements
+
 
 class PremiumManagerV2:
     """
@@ -234,15 +236,7 @@ class PremiumManagerV2:
     
     async def is_server_premium(self, guild_id: int, server_id: str) -> bool:
         """Check if a specific server is premium"""
-        try:
-            status = await self.db.server_premium_status.find_one({
-                "guild_id": guild_id,
-                "server_id": server_id,
-                "is_active": True
-            })
-            return status is not None
-        except Exception:
-            return False
+        return await get_premium_entitlements().is_server_premium(self.db, guild_id, server_id)
     
     async def activate_server_premium(self, guild_id: int, server_id: str, activated_by: int, reason: str = None) -> Tuple[bool, str]:
         """
@@ -284,6 +278,7 @@ class PremiumManagerV2:
                     },
                     upsert=True
                 )
+                get_premium_entitlements().grant(guild_id, server_id)
                 
                 return True, f"Server {server_id} activated as premium ({usage['used'] + 1}/{usage['limit']})"
                 
@@ -321,6 +316,7 @@ class PremiumManagerV2:
                         }
                     }
                 )
+                get_premium_entitlements().revoke(guild_id, server_id)
                 
                 usage = await self.get_premium_usage(guild_id)
                 return True, f"Server {server_id} deactivated ({usage['used']}/{usage['limit']})"
@@ -331,14 +327,7 @@ class PremiumManagerV2:
     
     async def count_premium_servers(self, guild_id: int) -> int:
         """Count active premium servers for guild"""
-        try:
-            count = await self.db.server_premium_status.count_documents({
-                "guild_id": guild_id,
-                "is_active": True
-            })
-            return count
-        except Exception:
-            return 0
+        return await get_premium_entitlements().count_premium_servers(self.db, guild_id)
     
     async def has_premium_access(self, guild_id: int, server_id: str = None) -> bool:
         """
@@ -347,16 +336,7 @@ class PremiumManagerV2:
         For server-specific features: checks if specific server is premium
         For guild-wide features (economy, gambling): checks if ANY server in guild is premium
         """
-        try:
-            if server_id:
-                # Server-specific premium check
-                return await self.is_server_premium(guild_id, server_id)
-            else:
-                # Guild-wide premium check - need at least 1 premium server
-                premium_count = await self.count_premium_servers(guild_id)
-                return premium_count > 0
-        except Exception:
-            return False
+        return await get_premium_entitlements().has_premium_access(self.db, guild_id, server_id)
     
     async def check_premium_access(self, guild_id: int, server_id: str = None) -> bool:
         """
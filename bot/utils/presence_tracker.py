@@ -0,0 +1,311 @@
+"""
+Player Presence Tracker
+Authoritative in-memory connection state machine for queue/connect/disconnect events,
+checkpointed to player_sessions with bulk writes
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional, Any, Tuple
+
+from bot.utils.name_index import get_name_index
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATES = ('online', 'queued')
+
+
+class ServerPresence:
+    """Presence state for a single game server, keyed by EOS ID"""
+
+    def __init__(self, guild_id: int, server_id: str):
+        self.guild_id = guild_id
+        self.server_id = server_id
+        self.players: Dict[str, Dict[str, Any]] = {}
+        self.active: Dict[str, Dict[str, Any]] = {}
+        self.counts: Dict[str, int] = {state: 0 for state in ACTIVE_STATES}
+        self.dirty: set = set()
+        self.seeded = False
+
+    def count(self, state: str) -> int:
+        """Count players currently in the given state"""
+        return self.counts.get(state, 0)
+
+    def set_state(self, eos_id: str, player: Dict[str, Any], new_state: str):
+        """Move a player to a new state, keeping the active set and counters in step"""
+        old_state = player.get('state', 'offline')
+        if old_state in self.counts:
+            self.counts[old_state] -= 1
+        player['state'] = new_state
+        if new_state in self.counts:
+            self.counts[new_state] += 1
+            self.active[eos_id] = player
+        else:
+            self.active.pop(eos_id, None)
+
+    def load(self, players: Dict[str, Dict[str, Any]]):
+        """Replace all players and rebuild the active set and counters"""
+        self.players = players
+        self.active = {eos_id: player for eos_id, player in players.items() if player.get('state') in ACTIVE_STATES}
+        self.counts = {state: 0 for state in ACTIVE_STATES}
+        for player in self.active.values():
+            self.counts[player['state']] += 1
+
+
+class PresenceTracker:
+    """
+    Tracks per-server player presence in memory
+
+    - Seeded once per server from player_sessions
+    - Transitions are computed in memory from connection events; counts and active lists are O(1) reads
+    - Changed players are checkpointed with one bulk_write per server at the end of each parser run
+    """
+
+    def __init__(self):
+        self.servers: Dict[Tuple[int, str], ServerPresence] = {}
+        self._seed_locks: Dict[Tuple[int, str], asyncio.Lock] = {}
+
+    def _get_server(self, guild_id: int, server_id: str) -> ServerPresence:
+        key = (int(guild_id), str(server_id))
+        presence = self.servers.get(key)
+        if presence is None:
+            presence = ServerPresence(key[0], key[1])
+            self.servers[key] = presence
+        return presence
+
+    def is_seeded(self, guild_id: int, server_id: str) -> bool:
+        """Check whether a server has been loaded from the database"""
+        presence = self.servers.get((int(guild_id), str(server_id)))
+        return bool(presence and presence.seeded)
+
+    async def ensure_seeded(self, db_manager, guild_id: int, server_id: str) -> ServerPresence:
+        """Load the stored sessions for a server once"""
+        presence = self._get_server(guild_id, server_id)
+        if presence.seeded:
+            return presence
+
+        lock = self._seed_locks.setdefault((presence.guild_id, presence.server_id), asyncio.Lock())
+        async with lock:
+            if presence.seeded:
+                return presence
+
+            try:
+                cursor = db_manager.player_sessions.find(
+                    {'guild_id': presence.guild_id, 'server_id': presence.server_id},
+                    {'_id': 0}
+                )
+                players = {}
+                async for doc in cursor:
+                    eos_id = doc.get('eos_id')
+                    if eos_id and eos_id not in players:
+                        players[eos_id] = doc
+                # Transitions applied before the seed completed take precedence
+                players.update(presence.players)
+                presence.load(players)
+
+                presence.seeded = True
+                logger.info(f"Seeded presence for {presence.guild_id}/{presence.server_id}: "
+                            f"{presence.count('online')} online, {presence.count('queued')} queued")
+            except Exception as e:
+                logger.error(f"Failed to seed presence for {guild_id}/{server_id}: {e}")
+
+        return presence
+
+    async def ensure_guild_seeded(self, db_manager, guild_id: int):
+        """Seed every configured server of a guild so guild-wide reads are complete"""
+        guild_config = await db_manager.get_guild(int(guild_id))
+        for server in (guild_config or {}).get('servers', []):
+            server_id = server.get('_id') or server.get('server_id')
+            if server_id and not self.is_seeded(guild_id, server_id):
+                await self.ensure_seeded(db_manager, guild_id, server_id)
+
+    def apply_event(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply a connection event and return the state change, if any"""
+        eos_id = event.get('eos_id')
+        guild_id = event.get('guild_id')
+        server_id = event.get('server_id')
+        if not eos_id or guild_id is None or server_id is None:
+            return None
+
+        presence = self._get_server(guild_id, server_id)
+        current = presence.players.get(eos_id)
+        current_state = current.get('state', 'offline') if current else 'offline'
+        timestamp = event.get('timestamp')
+        event_type = event.get('event')
+
+        if event_type == 'player_queue':
+            new_state = 'queued'
+            player_data = {
+                'player_name': event.get('player_name', 'Unknown'),
+                'login_name': event.get('login_name', 'Unknown'),
+                'queued_at': timestamp
+            }
+        elif event_type == 'player_connect':
+            new_state = 'online'
+            player_data = {'joined_at': timestamp}
+        elif event_type == 'player_disconnect':
+            new_state = 'offline'
+            player_data = {'left_at': timestamp}
+        else:
+            return None
+
+        if new_state == current_state:
+            return None
+
+        if current is None:
+            current = {
+                'eos_id': eos_id,
+                'guild_id': presence.guild_id,
+                'server_id': presence.server_id
+            }
+            presence.players[eos_id] = current
+
+        current.update(player_data)
+        presence.set_state(eos_id, current, new_state)
+        current['last_seen'] = timestamp
+        if event.get('server_name'):
+            current['server_name'] = event['server_name']
+        presence.dirty.add(eos_id)
+
+        return {
+            'eos_id': eos_id,
+            'player_name': event.get('player_name') or current.get('player_name', 'Unknown'),
+            'old_state': current_state,
+            'new_state': new_state,
+            'timestamp': timestamp,
+            'guild_id': presence.guild_id,
+            'server_id': presence.server_id,
+            'server_name': current.get('server_name', 'Unknown')
+        }
+
+    def replace_server_state(self, guild_id: int, server_id: str, players: Dict[str, Dict[str, Any]],
+                             persist: bool = False):
+        """Replace a server's presence with a freshly rebuilt state (cold start)
+
+        persist marks every player for the next checkpoint when the caller has not stored them itself.
+        """
+        presence = self._get_server(guild_id, server_id)
+        presence.load({
+            eos_id: {k: v for k, v in data.items() if k != '_id'}
+            for eos_id, data in players.items()
+        })
+        presence.dirty = set(presence.players) if persist else set()
+        presence.seeded = True
+
+    def snapshot_active(self, guild_id: int, server_id: str) -> List[Dict[str, Any]]:
+        """Online and queued players of a server, for the warm-restart snapshot"""
+        presence = self.servers.get((int(guild_id), str(server_id)))
+        if not presence:
+            return []
+        return [dict(player) for player in presence.active.values()]
+
+    async def restore_active(self, db_manager, guild_id: int, server_id: str, players: List[Dict[str, Any]]):
+        """Put snapshotted online and queued players back after a restart reset everyone to offline"""
+        presence = await self.ensure_seeded(db_manager, guild_id, server_id)
+        for player in players:
+            eos_id = player.get('eos_id')
+            state = player.get('state')
+            if not eos_id or state not in ACTIVE_STATES:
+                continue
+            current = presence.players.get(eos_id)
+            if current is None:
+                current = {'eos_id': eos_id, 'guild_id': presence.guild_id, 'server_id': presence.server_id}
+                presence.players[eos_id] = current
+            current.update({k: v for k, v in player.items() if k not in ('_id', 'state')})
+            presence.set_state(eos_id, current, state)
+            presence.dirty.add(eos_id)
+
+    def forget_offline(self, guild_id: int, server_id: str, eos_ids: List[str]):
+        """Drop offline players that have been expired from storage"""
+        presence = self.servers.get((int(guild_id), str(server_id)))
+        if not presence:
+            return
+        for eos_id in eos_ids:
+            player = presence.players.get(eos_id)
+            if player and player.get('state') not in ACTIVE_STATES and eos_id not in presence.dirty:
+                del presence.players[eos_id]
+
+    async def flush(self, db_manager, guild_id: int, server_id: str) -> int:
+        """Persist changed players for a server in a single bulk_write"""
+        presence = self.servers.get((int(guild_id), str(server_id)))
+        if not presence or not presence.dirty:
+            return 0
+
+        from pymongo import UpdateOne
+
+        # Copies of what is written; players changed while the write is in flight stay dirty
+        written = {eos_id: dict(presence.players[eos_id]) for eos_id in presence.dirty if eos_id in presence.players}
+        presence.dirty.intersection_update(written)
+        if not written:
+            return 0
+
+        operations = [
+            UpdateOne(
+                {'eos_id': eos_id, 'guild_id': presence.guild_id, 'server_id': presence.server_id},
+                {'$set': player},
+                upsert=True
+            )
+            for eos_id, player in written.items()
+        ]
+
+        try:
+            await db_manager.player_sessions.bulk_write(operations, ordered=False)
+            presence.dirty.difference_update(
+                eos_id for eos_id, player in written.items() if presence.players.get(eos_id) == player
+            )
+            get_name_index().add_characters(presence.guild_id, [player.get('player_name') for player in written.values()])
+            logger.debug(f"Persisted {len(operations)} presence changes for {guild_id}/{server_id}")
+            return len(operations)
+        except Exception as e:
+            logger.error(f"Failed to persist presence for {guild_id}/{server_id}: {e}")
+            return 0
+
+    async def checkpoint(self, db_manager) -> int:
+        """Persist every server with pending changes"""
+        persisted = 0
+        for guild_id, server_id in [key for key, presence in self.servers.items() if presence.dirty]:
+            persisted += await self.flush(db_manager, guild_id, server_id)
+        if persisted:
+            logger.info(f"Presence checkpoint: persisted {persisted} player sessions")
+        return persisted
+
+    def get_counts(self, guild_id: int, server_id: str) -> Tuple[int, int]:
+        """Get (online, queued) counts for a server"""
+        presence = self.servers.get((int(guild_id), str(server_id)))
+        if not presence:
+            return 0, 0
+        return presence.count('online'), presence.count('queued')
+
+    def get_active_players(self, guild_id: int, server_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get online and queued players for a guild, optionally limited to one server"""
+        players = []
+        for (g_id, s_id), presence in self.servers.items():
+            if g_id != int(guild_id) or (server_id is not None and s_id != str(server_id)):
+                continue
+            players.extend(dict(p) for p in presence.active.values())
+        return players
+
+    def get_online_count(self, guild_id: int, server_id: Optional[str] = None,
+                         server_name: Optional[str] = None) -> int:
+        """Online players for a guild, one server (by id or name) or all of them"""
+        total = 0
+        for (g_id, s_id), presence in self.servers.items():
+            if g_id != int(guild_id) or (server_id is not None and s_id != str(server_id)):
+                continue
+            if server_name is not None:
+                total += sum(1 for p in presence.active.values()
+                             if p['state'] == 'online' and p.get('server_name') == server_name)
+            else:
+                total += presence.count('online')
+        return total
+
+
+# Global tracker shared by the log parser and commands
+_presence_tracker = None
+
+def get_presence_tracker() -> PresenceTracker:
+    """Get the global presence tracker instance"""
+    global _presence_tracker
+    if _presence_tracker is None:
+        _presence_tracker = PresenceTracker()
+    return _presence_tracker
@@ -0,0 +1,358 @@
+"""
+Data Retention Manager
+Rolls old kill events into compact rollups, archives raw history and expires stale audit data
+"""
+
+import asyncio
+import hashlib
+import logging
+import zlib
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Any, Optional, Tuple
+
+import bson
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from bot.utils.kill_event_buckets import KILL_TUPLE_FIELDS, bucket_hour
+from bot.utils.player_profiles import EXCLUDED_WEAPONS, field_key
+
+logger = logging.getLogger(__name__)
+
+# Defaults in days; a guild can override any of these with a "retention" sub-document in its config
+DEFAULT_RETENTION = {
+    'kill_events_days': 90,
+    'raw_line_days': 14,
+    'wallet_events_days': 180,
+    'offline_sessions_days': 30,
+}
+
+
+def build_rollup_operations(guild_id: int, server_id: str, events: List[Dict[str, Any]],
+                            batch_id: str) -> List[UpdateOne]:
+    """Aggregate kill events into per-player and per-weapon rollup upserts
+
+    Each rollup document remembers the last batch applied to it, so replaying a batch is a no-op.
+    """
+    players: Dict[str, Dict[str, Any]] = {}
+    weapons: Dict[str, Dict[str, Any]] = {}
+
+    def player_entry(name: str) -> Dict[str, Any]:
+        if name not in players:
+            players[name] = {'inc': {}, 'max_distance': 0}
+        return players[name]
+
+    for event in events:
+        killer = event.get('killer') or 'Unknown'
+        victim = event.get('victim') or 'Unknown'
+        weapon = event.get('weapon') or 'Unknown'
+        distance = event.get('distance') or 0
+
+        if event.get('is_suicide'):
+            inc = player_entry(killer)['inc']
+            inc['suicides'] = inc.get('suicides', 0) + 1
+            continue
+
+        killer_entry = player_entry(killer)
+        inc = killer_entry['inc']
+        inc['kills'] = inc.get('kills', 0) + 1
+        inc['distance_sum'] = inc.get('distance_sum', 0) + distance
+        weapon_field = f"weapons.{field_key(weapon)}"
+        inc[weapon_field] = inc.get(weapon_field, 0) + 1
+        victim_field = f"victims.{field_key(victim)}"
+        inc[victim_field] = inc.get(victim_field, 0) + 1
+        killer_entry['max_distance'] = max(killer_entry['max_distance'], distance)
+
+        inc = player_entry(victim)['inc']
+        inc['deaths'] = inc.get('deaths', 0) + 1
+        killer_field = f"killed_by.{field_key(killer)}"
+        inc[killer_field] = inc.get(killer_field, 0) + 1
+
+        if weapon not in EXCLUDED_WEAPONS:
+            weapon_entry = weapons.setdefault(weapon, {'kills': 0, 'distance_sum': 0})
+            weapon_entry['kills'] += 1
+            weapon_entry['distance_sum'] += distance
+
+    operations = []
+    for name, entry in players.items():
+        operations.append(UpdateOne(
+            {'_id': f"{guild_id}:{server_id}:player:{name}", 'last_batch': {'$ne': batch_id}},
+            {
+                '$setOnInsert': {'guild_id': guild_id, 'server_id': server_id, 'type': 'player', 'player_name': name},
+                '$inc': entry['inc'],
+                '$max': {'max_distance': entry['max_distance']},
+                '$set': {'last_batch': batch_id}
+            },
+            upsert=True
+        ))
+    for weapon, entry in weapons.items():
+        operations.append(UpdateOne(
+            {'_id': f"{guild_id}:{server_id}:weapon:{weapon}", 'last_batch': {'$ne': batch_id}},
+            {
+                '$setOnInsert': {'guild_id': guild_id, 'server_id': server_id, 'type': 'weapon', 'weapon': weapon},
+                '$inc': entry,
+                '$set': {'last_batch': batch_id}
+            },
+            upsert=True
+        ))
+    return operations
+
+
+class RetentionManager:
+    """
+    Incremental retention for historical collections
+
+    - Kill events older than the guild window are rolled up, archived and removed in small batches
+    - Each server keeps a cursor in retention_state so an interrupted run resumes where it stopped
+    - Raw log lines are trimmed after a shorter window
+    - Old wallet events are archived and offline player sessions are expired
+    """
+
+    def __init__(self, db_manager, batch_size: int = 1000, max_batches_per_run: int = 20):
+        self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.max_batches_per_run = max_batches_per_run
+        self.db = db_manager.db
+        self.state = self.db.retention_state
+        self.archive = self.db.kill_events_archive
+        self.rollups = self.db.kill_rollups
+        self._lock = asyncio.Lock()
+
+    async def run(self):
+        """Run one retention pass across all configured guilds"""
+        if self._lock.locked():
+            logger.debug("Retention pass already running, skipping")
+            return
+
+        async with self._lock:
+            totals = {'kill_events': 0, 'raw_lines': 0, 'wallet_events': 0, 'player_sessions': 0}
+            cursor = self.db_manager.guild_configs.find({}, {'guild_id': 1, 'servers': 1, 'retention': 1})
+            async for guild_config in cursor:
+                guild_id = guild_config.get('guild_id')
+                if guild_id is None:
+                    continue
+                policy = {**DEFAULT_RETENTION, **(guild_config.get('retention') or {})}
+
+                try:
+                    for server in guild_config.get('servers', []):
+                        server_id = str(server.get('server_id', server.get('_id', 'default')))
+                        totals['kill_events'] += await self.retire_kill_events(guild_id, server_id, policy['kill_events_days'])
+                        totals['raw_lines'] += await self.trim_raw_lines(guild_id, server_id, policy['raw_line_days'])
+                        totals['player_sessions'] += await self.expire_offline_sessions(guild_id, server_id, policy['offline_sessions_days'])
+                    totals['wallet_events'] += await self.archive_wallet_events(guild_id, policy['wallet_events_days'])
+                except Exception as e:
+                    logger.error(f"Retention pass failed for guild {guild_id}: {e}")
+
+            if any(totals.values()):
+                logger.info(f"Retention pass complete: {totals}")
+
+    # KILL EVENTS
+
+    async def retire_kill_events(self, guild_id: int, server_id: str, retention_days: int) -> int:
+        """Roll up, archive and remove kill events older than the retention window"""
+        state_id = f"{guild_id}:{server_id}:kill_events"
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        retired = 0
+
+        state = await self.state.find_one({'_id': state_id}) or {}
+        pending = state.get('pending')
+        if pending:
+            # Resume a batch that was interrupted after it was archived
+            events = await self._load_archived_events(pending['batch_id'])
+            retired += await self._finish_kill_batch(state_id, guild_id, server_id, pending, events)
+
+        for _ in range(self.max_batches_per_run):
+            events, source_ids = await self._load_expired_kill_events(guild_id, server_id, cutoff)
+            if not events:
+                break
+
+            batch_id = hashlib.blake2b('|'.join(map(str, source_ids)).encode('utf-8'), digest_size=12).hexdigest()
+            await self._archive_docs('kill_events', batch_id, guild_id, server_id, events)
+
+            pending = {'batch_id': batch_id, 'source_ids': source_ids,
+                       'last_timestamp': max((e.get('timestamp') for e in events if e.get('timestamp')), default=None)}
+            await self.state.update_one({'_id': state_id}, {'$set': {'pending': pending}}, upsert=True)
+
+            retired += await self._finish_kill_batch(state_id, guild_id, server_id, pending, events)
+            await asyncio.sleep(0)
+
+        return retired
+
+    async def _load_expired_kill_events(self, guild_id: int, server_id: str,
+                                        cutoff: datetime) -> Tuple[List[Dict[str, Any]], List[Any]]:
+        """Load the next batch of expired kills and the source document ids to delete"""
+        if self.db_manager.uses_kill_buckets:
+            buckets = await self.db_manager.kill_event_buckets.find(
+                {'guild_id': guild_id, 'server_id': server_id, 'hour': {'$lt': bucket_hour(cutoff)}}
+            ).sort('hour', 1).limit(max(1, self.batch_size // 100)).to_list(length=None)
+
+            events = []
+            for bucket in buckets:
+                for kill_tuple in bucket.get('k', []):
+                    event = dict(zip(KILL_TUPLE_FIELDS, kill_tuple))
+                    event.update({'guild_id': guild_id, 'server_id': server_id})
+                    events.append(event)
+            return events, [bucket['_id'] for bucket in buckets]
+
+        events = await self.db_manager.kill_events.find(
+            {'guild_id': guild_id, 'server_id': server_id, 'timestamp': {'$lt': cutoff}}
+        ).sort([('timestamp', 1), ('_id', 1)]).limit(self.batch_size).to_list(length=None)
+        return events, [event['_id'] for event in events]
+
+    async def _finish_kill_batch(self, state_id: str, guild_id: int, server_id: str,
+                                 pending: Dict[str, Any], events: List[Dict[str, Any]]) -> int:
+        """Apply rollups, delete the raw source documents and advance the cursor"""
+        operations = build_rollup_operations(guild_id, server_id, events, pending['batch_id'])
+        if operations:
+            try:
+                await self.rollups.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # Duplicate keys mean the rollup already includes this batch
+                other_errors = [err for err in e.details.get('writeErrors', []) if err.get('code') != 11000]
+                if other_errors:
+                    raise
+
+        source = self.db_manager.kill_event_buckets if self.db_manager.uses_kill_buckets else self.db_manager.kill_events
+        await source.delete_many({'_id': {'$in': pending['source_ids']}})
+
+        await self.state.update_one(
+            {'_id': state_id},
+            {'$set': {'last_timestamp': pending.get('last_timestamp'), 'updated_at': datetime.now(timezone.utc)},
+             '$unset': {'pending': ''}}
+        )
+        return len(events)
+
+    @staticmethod
+    def _after_cursor(timestamp: datetime, doc_id: Any) -> Dict[str, Any]:
+        """Match kill events strictly after a (timestamp, _id) cursor"""
+        return {'$or': [
+            {'timestamp': {'$gt': timestamp}},
+            {'timestamp': timestamp, '_id': {'$gt': doc_id}}
+        ]}
+
+    async def trim_raw_lines(self, guild_id: int, server_id: str, raw_line_days: int) -> int:
+        """Drop stored raw log lines older than the trim window, resuming from the stored cursor"""
+        if self.db_manager.uses_kill_buckets:
+            return 0  # Buckets never store raw lines
+
+        state_id = f"{guild_id}:{server_id}:raw_lines"
+        cutoff = datetime.now(timezone.utc) - timedelta(days=raw_line_days)
+        state = await self.state.find_one({'_id': state_id}) or {}
+        if state.get('last_timestamp') is not None:
+            after = self._after_cursor(state['last_timestamp'], state['last_id'])
+        else:
+            # First pass starts where kill retention stopped; everything before it is already gone
+            retired = await self.state.find_one({'_id': f"{guild_id}:{server_id}:kill_events"}, {'last_timestamp': 1}) or {}
+            after = {'timestamp': {'$gte': retired['last_timestamp']}} if retired.get('last_timestamp') else {}
+
+        trimmed = 0
+        for _ in range(self.max_batches_per_run):
+            docs = await self.db_manager.kill_events.find(
+                {'guild_id': guild_id, 'server_id': server_id, '$and': [{'timestamp': {'$lt': cutoff}}, after]},
+                {'_id': 1, 'timestamp': 1}
+            ).sort([('timestamp', 1), ('_id', 1)]).limit(self.batch_size).to_list(length=None)
+            if not docs:
+                break
+
+            result = await self.db_manager.kill_events.update_many(
+                {'_id': {'$in': [doc['_id'] for doc in docs]}, 'raw_line': {'$exists': True}},
+                {'$unset': {'raw_line': ''}}
+            )
+            trimmed += result.modified_count
+
+            last = docs[-1]
+            await self.state.update_one(
+                {'_id': state_id},
+                {'$set': {'last_timestamp': last['timestamp'], 'last_id': last['_id'], 'updated_at': datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            after = self._after_cursor(last['timestamp'], last['_id'])
+            await asyncio.sleep(0)
+        return trimmed
+
+    async def forget_server(self, guild_id: int, server_id: str):
+        """Drop a server's rollups, archived kill batches and cursors before its history is re-ingested"""
+        async with self._lock:
+            await self.rollups.delete_many({'guild_id': guild_id, 'server_id': server_id})
+            await self.archive.delete_many({'kind': 'kill_events', 'guild_id': guild_id, 'server_id': server_id})
+            await self.state.delete_many({'_id': {'$in': [
+                f"{guild_id}:{server_id}:kill_events",
+                f"{guild_id}:{server_id}:raw_lines"
+            ]}})
+
+    # OTHER COLLECTIONS
+
+    async def archive_wallet_events(self, guild_id: int, retention_days: int) -> int:
+        """Archive and remove wallet events older than the retention window"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        archived = 0
+        for _ in range(self.max_batches_per_run):
+            events = await self.db_manager.wallet_events.find(
+                {'guild_id': guild_id, 'timestamp': {'$lt': cutoff}}
+            ).sort([('timestamp', 1), ('_id', 1)]).limit(self.batch_size).to_list(length=None)
+            if not events:
+                break
+
+            ids = [event['_id'] for event in events]
+            batch_id = hashlib.blake2b('|'.join(map(str, ids)).encode('utf-8'), digest_size=12).hexdigest()
+            await self._archive_docs('wallet_events', batch_id, guild_id, None, events)
+            await self.db_manager.wallet_events.delete_many({'_id': {'$in': ids}})
+            archived += len(events)
+            await asyncio.sleep(0)
+        return archived
+
+    async def expire_offline_sessions(self, guild_id: int, server_id: str, retention_days: int) -> int:
+        """Remove player sessions that have been offline longer than the retention window"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        docs = await self.db_manager.player_sessions.find(
+            {'guild_id': guild_id, 'server_id': server_id, 'state': 'offline', 'last_seen': {'$lt': cutoff}},
+            {'_id': 1, 'eos_id': 1}
+        ).limit(self.batch_size * self.max_batches_per_run).to_list(length=None)
+        if not docs:
+            return 0
+
+        await self.db_manager.player_sessions.delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}})
+
+        from bot.utils.presence_tracker import get_presence_tracker
+        get_presence_tracker().forget_offline(guild_id, server_id, [doc.get('eos_id') for doc in docs])
+        return len(docs)
+
+    # ARCHIVE
+
+    async def _archive_docs(self, kind: str, batch_id: str, guild_id: int,
+                            server_id: Optional[str], docs: List[Dict[str, Any]]):
+        """Store a batch of documents as one zlib-compressed BSON blob"""
+        timestamps = [doc.get('timestamp') for doc in docs if doc.get('timestamp')]
+        payload = zlib.compress(bson.encode({'docs': docs}), 6)
+        await self.archive.update_one(
+            {'_id': f"{kind}:{batch_id}"},
+            {'$setOnInsert': {
+                'kind': kind,
+                'guild_id': guild_id,
+                'server_id': server_id,
+                'count': len(docs),
+                'from': min(timestamps) if timestamps else None,
+                'to': max(timestamps) if timestamps else None,
+                'data': bson.Binary(payload),
+                'archived_at': datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+
+    async def _load_archived_events(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Decompress an archived kill event batch"""
+        archived = await self.archive.find_one({'_id': f"kill_events:{batch_id}"})
+        if not archived:
+            return []
+        return bson.decode(zlib.decompress(archived['data'])).get('docs', [])
+
+
+# Global retention manager
+_retention_manager = None
+
+def get_retention_manager(db_manager=None) -> Optional[RetentionManager]:
+    """Get the global retention manager, creating it on first use"""
+    global _retention_manager
+    if _retention_manager is None and db_manager is not None:
+        _retention_manager = RetentionManager(db_manager)
+    return _retention_manager
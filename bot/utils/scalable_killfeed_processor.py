@@ -534,6 +534,9 @@ class MultiServerKillfeedProcessor:
         # Execute all tasks
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
+        # Persist all parser states updated during this run
+        await self.state_manager.flush_states()
+        
         # Compile summary
         successful = sum(1 for result in results if isinstance(result, dict) and result.get('success'))
         
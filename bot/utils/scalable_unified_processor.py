@@ -5,13 +5,31 @@ Handles log parsing and event detection with proper syntax
 
 import asyncio
 import asyncssh
+import hashlib
 import logging
 import re
 from datetime import datetime
 from typing import Dict, List, Optional, Any
+from bot.utils.presence_tracker import get_presence_tracker
+from bot.utils.name_index import get_name_index
 
 logger = logging.getLogger(__name__)
 
+# Bytes read from the start of Deadside.log to identify the file across rotations
+LOG_HEAD_BYTES = 512
+
+# Session fields a cold-start rebuild derives from the log; other fields (last_updated, login_name)
+# differ between writers and do not make a stored session out of date
+SESSION_DIFF_FIELDS = ('state', 'player_name', 'server_name', 'queued_at', 'joined_at', 'last_seen')
+
+
+def log_file_identity(head: bytes) -> Optional[str]:
+    """Hash of the log's first line (the "log file open" header), None until that line is complete"""
+    end = head.find(b'\n')
+    if end < 0:
+        return None
+    return hashlib.sha1(head[:end]).hexdigest()
+
 
 class ScalableUnifiedProcessor:
     """Unified processor for parsing game server logs"""
@@ -20,6 +38,8 @@ class ScalableUnifiedProcessor:
         self.bot = bot
         self.connection_patterns = self._compile_connection_patterns()
         self.event_patterns = self._compile_event_patterns()
+        self.log_states: Dict[str, Dict[str, Any]] = {}  # server_id -> {identity, offset} after the last read
+        self.resumed_servers: set = set()  # Servers whose last read continued from a stored offset
     
     def _compile_connection_patterns(self) -> Dict[str, re.Pattern]:
         """Compile regex patterns for connection events - Real Deadside server format"""
@@ -166,88 +186,28 @@ class ScalableUnifiedProcessor:
             return False
         
         try:
+            tracker = get_presence_tracker()
             state_changes = []  # Track actual state changes for embed sending
+            touched_servers = set()
             
             for event in events:
-                if event['type'] != 'connection':
+                if event['type'] != 'connection' or not event.get('eos_id'):
                     continue
                 
-                eos_id = event.get('eos_id')
                 guild_id = event['guild_id']
                 server_id = event['server_id']
-                timestamp = event['timestamp']
-                event_type = event['event']
-                
-                if not eos_id:
-                    continue
-                
-                # Get current player state
-                current_session = await self.bot.db_manager.player_sessions.find_one({
-                    'eos_id': eos_id,
-                    'guild_id': guild_id,
-                    'server_id': server_id
-                })
                 
-                current_state = current_session.get('state', 'offline') if current_session else 'offline'
-                new_state = current_state
-                player_data = {}
+                # Seed presence from the database once per server, then work in memory
+                if (guild_id, server_id) not in touched_servers:
+                    await tracker.ensure_seeded(self.bot.db_manager, guild_id, server_id)
+                    touched_servers.add((guild_id, server_id))
                 
-                if event_type == 'player_queue':
-                    # Player is queuing to join
-                    new_state = 'queued'
-                    player_data = {
-                        'eos_id': eos_id,
-                        'player_name': event.get('player_name', 'Unknown'),
-                        'login_name': event.get('login_name', 'Unknown'),
-                        'guild_id': guild_id,
-                        'server_id': server_id,
-                        'state': 'queued',
-                        'queued_at': timestamp,
-                        'last_seen': timestamp
-                    }
-                    
-                elif event_type == 'player_connect':
-                    # Player successfully registered (queued -> online)
-                    new_state = 'online'
-                    player_data = {
-                        'state': 'online',
-                        'joined_at': timestamp,
-                        'last_seen': timestamp
-                    }
-                    
-                elif event_type == 'player_disconnect':
-                    # Player disconnected (online -> offline)
-                    new_state = 'offline'
-                    player_data = {
-                        'state': 'offline',
-                        'left_at': timestamp,
-                        'last_seen': timestamp
-                    }
-                
-                # Only update if state actually changed
-                if new_state != current_state:
-                    await self.bot.db_manager.player_sessions.update_one(
-                        {
-                            'eos_id': eos_id,
-                            'guild_id': guild_id,
-                            'server_id': server_id
-                        },
-                        {'$set': player_data},
-                        upsert=True
-                    )
-                    
-                    # Track state change for embed sending
-                    state_changes.append({
-                        'eos_id': eos_id,
-                        'player_name': event.get('player_name') or (current_session.get('player_name', 'Unknown') if current_session else 'Unknown'),
-                        'old_state': current_state,
-                        'new_state': new_state,
-                        'timestamp': timestamp,
-                        'guild_id': guild_id,
-                        'server_id': server_id
-                    })
-                    
-                    logger.info(f"Player state change: {eos_id[:8]}... {current_state} -> {new_state}")
+                change = tracker.apply_event(event)
+                if change:
+                    state_changes.append(change)
+                    logger.info(f"Player state change: {change['eos_id'][:8]}... {change['old_state']} -> {change['new_state']}")
+            
+            # Transitions are persisted by the presence checkpoint at the end of the parser run
             
             # Send embeds for actual state changes
             if state_changes:
@@ -498,55 +458,50 @@ class ScalableUnifiedProcessor:
             return min(int(numbers[-1]), 5)  # Cap at level 5
         return 1  # Default level
 
-    async def process_log_data_cold_start(self, server_config: Dict[str, Any], guild_id: int) -> List[Dict[str, Any]]:
-        """Process all log data chronologically from beginning for cold start"""
+    def parse_log_data(self, log_data: str, server_config: Dict[str, Any], guild_id: int,
+                       last_timestamp: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Parse fetched log data into chronologically sorted events, optionally only those after last_timestamp"""
+        events = []
+        for line in log_data.split('\n'):
+            parsed = self.parse_log_line(line)
+            if parsed:
+                # Only include events newer than last timestamp
+                if last_timestamp and parsed.get('timestamp', '') <= last_timestamp:
+                    continue
+
+                parsed['guild_id'] = guild_id
+                parsed['server_id'] = server_config.get('server_id', 'default')
+                parsed['server_name'] = server_config.get('server_name', 'Unknown')
+                events.append(parsed)
+
+        # Sort chronologically
+        events.sort(key=lambda x: x.get('timestamp', ''))
+        return events
+
+    async def process_log_data_cold_start(self, server_config: Dict[str, Any], guild_id: int,
+                                          log_data: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Process all log data chronologically from beginning for cold start (log_data if already fetched)"""
         try:
             # Fetch all log data from server
-            log_data = await self._fetch_server_logs(server_config)
+            if log_data is None:
+                log_data = await self.fetch_log_data(server_config)
             if not log_data:
                 return []
-            
-            events = []
-            for line in log_data.split('\n'):
-                parsed = self.parse_log_line(line)
-                if parsed:
-                    parsed['guild_id'] = guild_id
-                    parsed['server_id'] = server_config.get('server_id', 'default')
-                    parsed['server_name'] = server_config.get('server_name', 'Unknown')
-                    events.append(parsed)
-            
-            # Sort chronologically
-            events.sort(key=lambda x: x.get('timestamp', ''))
-            return events
+            return self.parse_log_data(log_data, server_config, guild_id)
             
         except Exception as e:
             logger.error(f"Error in cold start processing: {e}")
             return []
     
-    async def process_log_data_hot_start(self, server_config: Dict[str, Any], guild_id: int, last_timestamp: Optional[str]) -> List[Dict[str, Any]]:
+    async def process_log_data_hot_start(self, server_config: Dict[str, Any], guild_id: int, last_timestamp: Optional[str],
+                                         log_state: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Process only new log data since last timestamp for hot start"""
         try:
-            # Fetch all log data from server
-            log_data = await self._fetch_server_logs(server_config)
+            # Fetch log data from the stored offset when the file is unchanged, otherwise all of it
+            log_data = await self.fetch_log_data(server_config, log_state)
             if not log_data:
                 return []
-            
-            events = []
-            for line in log_data.split('\n'):
-                parsed = self.parse_log_line(line)
-                if parsed:
-                    # Only include events newer than last timestamp
-                    if last_timestamp and parsed.get('timestamp', '') <= last_timestamp:
-                        continue
-                        
-                    parsed['guild_id'] = guild_id
-                    parsed['server_id'] = server_config.get('server_id', 'default')
-                    parsed['server_name'] = server_config.get('server_name', 'Unknown')
-                    events.append(parsed)
-            
-            # Sort chronologically
-            events.sort(key=lambda x: x.get('timestamp', ''))
-            return events
+            return self.parse_log_data(log_data, server_config, guild_id, last_timestamp)
             
         except Exception as e:
             logger.error(f"Error in hot start processing: {e}")
@@ -576,6 +531,7 @@ class ScalableUnifiedProcessor:
                         'login_name': event.get('login_name', 'Unknown'),
                         'guild_id': guild_id,
                         'server_id': server_id,
+                        'server_name': event.get('server_name', 'Unknown'),
                         'state': 'offline',
                         'last_updated': timestamp,
                         'last_seen': timestamp
@@ -596,20 +552,22 @@ class ScalableUnifiedProcessor:
                 player_states[eos_id]['last_updated'] = timestamp
                 valid_events += 1
             
-            # Clear existing sessions for this server
-            await self.bot.db_manager.player_sessions.delete_many({
-                'guild_id': guild_id,
-                'server_id': server_id
-            })
-            
-            # Insert final states (only active players)
+            # Final states (only active players are stored)
             active_sessions = []
             for eos_id, player_data in player_states.items():
                 if player_data['state'] in ['online', 'queued']:  # Only store active players
                     active_sessions.append(player_data)
             
-            if active_sessions:
-                await self.bot.db_manager.player_sessions.insert_many(active_sessions)
+            # Write only the difference from the stored sessions
+            written = await self._apply_session_diff(guild_id, server_id, active_sessions)
+            if written:
+                get_name_index().add_characters(guild_id, [session['player_name'] for session in written])
+            
+            # Keep in-memory presence in step with the rebuilt sessions
+            get_presence_tracker().replace_server_state(
+                guild_id, server_id,
+                {session['eos_id']: session for session in active_sessions}
+            )
             
             # Count final states
             online_count = sum(1 for p in player_states.values() if p['state'] == 'online')
@@ -624,6 +582,47 @@ class ScalableUnifiedProcessor:
             logger.error(f"Error updating player sessions in cold start: {e}")
             return 0, 0
     
+    async def _apply_session_diff(self, guild_id: int, server_id: str, sessions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Make a server's stored sessions equal to sessions with one bulk_write of deletes and upserts
+
+        Returns the sessions that were written (new or changed).
+        """
+        from pymongo import DeleteMany, ReplaceOne
+        
+        stored = {}
+        duplicates = set()
+        cursor = self.bot.db_manager.player_sessions.find(
+            {'guild_id': guild_id, 'server_id': server_id},
+            {'_id': 0}
+        )
+        async for doc in cursor:
+            eos_id = doc.get('eos_id')
+            if eos_id in stored:
+                duplicates.add(eos_id)
+            stored[eos_id] = doc
+        
+        desired = {session['eos_id']: session for session in sessions}
+        changed = [session for eos_id, session in desired.items()
+                   if eos_id in duplicates or eos_id not in stored
+                   or any(stored[eos_id].get(field) != session.get(field) for field in SESSION_DIFF_FIELDS)]
+        # Duplicate documents are removed and rewritten once
+        removed = [eos_id for eos_id in stored if eos_id not in desired or eos_id in duplicates]
+        
+        operations = []
+        if removed:
+            operations.append(DeleteMany({'guild_id': guild_id, 'server_id': server_id, 'eos_id': {'$in': removed}}))
+        operations.extend(
+            ReplaceOne({'guild_id': guild_id, 'server_id': server_id, 'eos_id': session['eos_id']}, session, upsert=True)
+            for session in changed
+        )
+        
+        if operations:
+            # Ordered so duplicate removal happens before the rewrite
+            await self.bot.db_manager.player_sessions.bulk_write(operations, ordered=True)
+        logger.info(f"Cold start: {len(changed)} sessions written, {len(removed)} removed, "
+                    f"{len(desired) - len(changed)} unchanged")
+        return changed
+    
     async def send_connection_embeds_batch(self, state_changes: List[Dict[str, Any]]):
         """Send connection embeds using embed factory"""
         try:
@@ -809,8 +808,12 @@ class ScalableUnifiedProcessor:
             if "duplicate key error" not in str(e):
                 logger.error(f"Error updating player session: {e}")
 
-    async def _fetch_server_logs(self, server_config: Dict[str, Any]) -> str:
-        """Fetch log data from server via SFTP using robust connection strategies"""
+    async def fetch_log_data(self, server_config: Dict[str, Any], log_state: Optional[Dict[str, Any]] = None) -> str:
+        """Fetch log data from server via SFTP using robust connection strategies
+
+        With a log_state from a previous read of the same file (same first line), only the bytes
+        after its offset are read. Only complete lines are returned; the new offset is kept in log_states.
+        """
         try:
             import asyncssh
             from bot.utils.connection_pool import connection_manager
@@ -858,12 +861,28 @@ class ScalableUnifiedProcessor:
                 async with conn.start_sftp_client() as sftp:
                     # Read the log file
                     try:
-                        async with sftp.open(log_path, 'r') as f:
-                            log_data = await f.read()
-                            return log_data
+                        async with sftp.open(log_path, 'rb') as f:
+                            head = await f.read(LOG_HEAD_BYTES, 0)
+                            identity = log_file_identity(head)
+                            size = (await f.stat()).size or 0
+                            offset = 0
+                            if (log_state and identity and log_state.get('identity') == identity
+                                    and 0 < log_state.get('offset', 0) <= size):
+                                offset = log_state['offset']
+                            raw = await f.read(size - offset, offset) if size > offset else b''
                     except Exception as e:
                         logger.error(f"Failed to read log file {log_path}: {e}")
                         return ""
+                    
+                    # Stop at the last complete line; a line still being written is read next time
+                    end = raw.rfind(b'\n') + 1
+                    state_key = str(server_config.get('server_id', 'default'))
+                    self.log_states[state_key] = {'identity': identity, 'offset': offset + end}
+                    if offset:
+                        self.resumed_servers.add(state_key)
+                    else:
+                        self.resumed_servers.discard(state_key)
+                    return raw[:end].decode('utf-8', errors='replace')
                         
         except Exception as e:
             logger.error(f"Error fetching server logs: {e}")
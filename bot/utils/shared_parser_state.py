@@ -30,6 +30,11 @@ class SharedParserStateManager:
         self.db_manager = db_manager
         self.active_sessions: Dict[str, Dict[str, Any]] = {}
         self.state_lock = asyncio.Lock()
+        
+        # Write-through cache of parser states, flushed in bulk once per tick
+        self.states: Dict[str, ParserState] = {}
+        self.dirty_keys: set = set()
+        self.states_loaded = False
     
     def _get_server_key(self, guild_id: int, server_name: str) -> str:
         """Generate unique key for server identification"""
@@ -82,45 +87,50 @@ class SharedParserStateManager:
                 if session['parser_type'] == parser_type:
                     del self.active_sessions[server_key]
     
+    def _state_from_doc(self, state_doc: Dict[str, Any]) -> ParserState:
+        """Build a ParserState from a stored document"""
+        return ParserState(
+            guild_id=state_doc['guild_id'],
+            server_name=state_doc['server_name'],
+            last_file=state_doc.get('last_file', ''),
+            last_line=state_doc.get('last_line', 0),
+            last_byte_position=state_doc.get('last_byte_position', 0),
+            last_update_time=state_doc.get('last_update_time', datetime.now(timezone.utc)),
+            updated_by_parser=state_doc.get('updated_by_parser', 'unknown'),
+            file_timestamp=state_doc.get('file_timestamp')
+        )
+    
+    async def load_all_states(self) -> int:
+        """Warm the in-memory cache with every stored parser state in one query"""
+        try:
+            cursor = self.db_manager.shared_parser_states.find({}, {'_id': 0})
+            async for state_doc in cursor:
+                server_key = self._get_server_key(state_doc['guild_id'], state_doc['server_name'])
+                if server_key not in self.dirty_keys:
+                    self.states[server_key] = self._state_from_doc(state_doc)
+            self.states_loaded = True
+            logger.debug(f"Loaded {len(self.states)} shared parser states")
+            return len(self.states)
+        except Exception as e:
+            logger.error(f"Failed to load shared parser states: {e}")
+            return 0
+    
     async def get_parser_state(self, guild_id: int, server_name: str) -> Optional[ParserState]:
-        """Get the current parsing state for a server using direct database connection"""
+        """Get the current parsing state for a server from the in-memory cache"""
+        server_key = self._get_server_key(guild_id, server_name)
+        if server_key in self.states or self.states_loaded:
+            return self.states.get(server_key)
+        
         try:
-            # Use direct MongoDB connection for thread safety
-            import os
-            from motor.motor_asyncio import AsyncIOMotorClient
-            
-            mongo_uri = os.environ.get('MONGO_URI')
-            if not mongo_uri:
-                logger.error("MONGO_URI not available")
-                return None
-            
-            client = AsyncIOMotorClient(mongo_uri)
-            database = client.emerald_killfeed
-            collection = database.shared_parser_states
-            
-            state_doc = await collection.find_one({
+            # Cache miss before the bulk load - fetch this server once
+            state_doc = await self.db_manager.shared_parser_states.find_one({
                 'guild_id': guild_id,
                 'server_name': server_name
             })
-            
-            try:
-                await client.close()
-            except Exception:
-                pass  # Client may already be closed
-            
-            if state_doc:
-                return ParserState(
-                    guild_id=state_doc['guild_id'],
-                    server_name=state_doc['server_name'],
-                    last_file=state_doc.get('last_file', ''),
-                    last_line=state_doc.get('last_line', 0),
-                    last_byte_position=state_doc.get('last_byte_position', 0),
-                    last_update_time=state_doc.get('last_update_time', datetime.now(timezone.utc)),
-                    updated_by_parser=state_doc.get('updated_by_parser', 'unknown'),
-                    file_timestamp=state_doc.get('file_timestamp')
-                )
-            
-            return None
+            state = self._state_from_doc(state_doc) if state_doc else None
+            if state:
+                self.states[server_key] = state
+            return state
             
         except Exception as e:
             logger.error(f"Failed to get parser state for {guild_id}/{server_name}: {e}")
@@ -129,50 +139,72 @@ class SharedParserStateManager:
     async def update_parser_state(self, guild_id: int, server_name: str, 
                                 last_file: str, last_line: int, last_byte_position: int,
                                 parser_type: str, file_timestamp: Optional[str] = None) -> bool:
-        """Update the parsing state for a server"""
-        try:
-            # Use direct MongoDB connection for thread safety
-            import os
-            from motor.motor_asyncio import AsyncIOMotorClient
-            
-            mongo_uri = os.environ.get('MONGO_URI')
-            if not mongo_uri:
-                logger.error("MONGO_URI not available")
-                return False
-            
-            client = AsyncIOMotorClient(mongo_uri)
-            database = client.emerald_killfeed
-            collection = database.shared_parser_states
+        """Update the parsing state for a server; persisted by flush_states at the end of the tick"""
+        server_key = self._get_server_key(guild_id, server_name)
+        previous = self.states.get(server_key)
+        
+        if file_timestamp is None and previous and previous.last_file == last_file:
+            file_timestamp = previous.file_timestamp
+        
+        self.states[server_key] = ParserState(
+            guild_id=guild_id,
+            server_name=server_name,
+            last_file=last_file,
+            last_line=last_line,
+            last_byte_position=last_byte_position,
+            last_update_time=datetime.now(timezone.utc),
+            updated_by_parser=parser_type,
+            file_timestamp=file_timestamp
+        )
+        self.dirty_keys.add(server_key)
+        logger.debug(f"Updated parser state for {guild_id}/{server_name} by {parser_type}")
+        return True
+    
+    async def flush_states(self) -> int:
+        """Persist all changed parser states in a single bulk_write"""
+        if not self.dirty_keys:
+            return 0
+        
+        from pymongo import ReplaceOne
+        
+        # States are replaced, never mutated, so the objects written identify what was persisted
+        written = {server_key: self.states.get(server_key) for server_key in self.dirty_keys}
+        operations = []
+        for state in written.values():
+            if not state:
+                continue
             
             state_data = {
-                'guild_id': guild_id,
-                'server_name': server_name,
-                'last_file': last_file,
-                'last_line': last_line,
-                'last_byte_position': last_byte_position,
-                'last_update_time': datetime.now(timezone.utc),
-                'updated_by_parser': parser_type
+                'guild_id': state.guild_id,
+                'server_name': state.server_name,
+                'last_file': state.last_file,
+                'last_line': state.last_line,
+                'last_byte_position': state.last_byte_position,
+                'last_update_time': state.last_update_time,
+                'updated_by_parser': state.updated_by_parser
             }
+            if state.file_timestamp is not None:
+                state_data['file_timestamp'] = state.file_timestamp
             
-            if file_timestamp is not None:
-                state_data['file_timestamp'] = file_timestamp
-            
-            await collection.replace_one(
-                {'guild_id': guild_id, 'server_name': server_name},
+            operations.append(ReplaceOne(
+                {'guild_id': state.guild_id, 'server_name': state.server_name},
                 state_data,
                 upsert=True
+            ))
+        
+        try:
+            if operations:
+                await self.db_manager.shared_parser_states.bulk_write(operations, ordered=False)
+            # Keys updated while the write was in flight stay dirty for the next flush
+            self.dirty_keys.difference_update(
+                server_key for server_key, state in written.items() if self.states.get(server_key) is state
             )
-            
-            try:
-                await client.close()
-            except Exception:
-                pass  # Client may already be closed
-            logger.debug(f"Updated parser state for {guild_id}/{server_name} by {parser_type}")
-            return True
+            logger.debug(f"Persisted {len(operations)} shared parser states")
+            return len(operations)
             
         except Exception as e:
-            logger.error(f"Failed to update parser state for {guild_id}/{server_name}: {e}")
-            return False
+            logger.error(f"Failed to persist shared parser states: {e}")
+            return 0
     
     async def get_available_servers_for_killfeed(self, server_configs: list) -> list:
         """Filter server configs to exclude those currently under historical processing"""
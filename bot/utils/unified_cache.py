@@ -4,39 +4,87 @@ Provides comprehensive caching for all bot operations with minimal resource usag
 """
 
 import asyncio
+import sys
 import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Set, Tuple
-from collections import defaultdict
-import json
+from itertools import islice
+from typing import Dict, List, Optional, Any, Tuple, Callable, Awaitable
+from collections import OrderedDict
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Containers larger than this are sized from a sample of their items
+SIZE_SAMPLE = 32
+
+# Nesting depth followed when sizing cached values
+SIZE_DEPTH = 6
+
+# Least recently used entries checked for expiry on each write
+SWEEP_BATCH = 8
+
+# Seconds an expired leaderboard may still be served while it is recomputed; ingest invalidates
+# leaderboards explicitly, so a value that merely aged out still matches the stored stats
+LEADERBOARD_STALE_TTL = 300
+
+# Guild-wide leaderboard types cached per server scope and dropped with the snapshots
+SNAPSHOT_LEADERBOARD_TYPES = ('weapons', 'factions')
+
+
+def approximate_size(obj: Any, depth: int = 0) -> int:
+    """Approximate deep size of a cached value in bytes"""
+    size = sys.getsizeof(obj)
+    if depth >= SIZE_DEPTH or isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+
+    if isinstance(obj, dict):
+        items = obj.items()
+        count = len(obj)
+        sample = sum(approximate_size(k, depth + 1) + approximate_size(v, depth + 1)
+                     for k, v in islice(items, SIZE_SAMPLE))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        count = len(obj)
+        sample = sum(approximate_size(item, depth + 1) for item in islice(obj, SIZE_SAMPLE))
+    elif hasattr(obj, '__dict__'):
+        return size + approximate_size(vars(obj), depth + 1)
+    else:
+        return size
+
+    if count > SIZE_SAMPLE:
+        sample = sample * count // SIZE_SAMPLE
+    return size + sample
+
+
 class CacheEntry:
-    """Individual cache entry with TTL and metadata"""
-    
-    def __init__(self, data: Any, ttl: int, cache_type: str):
+    """Individual cache entry with TTL, size and metadata"""
+
+    __slots__ = ('data', 'created_at', 'expires_at', 'stale_until', 'ttl', 'cache_type', 'size', 'access_count')
+
+    def __init__(self, data: Any, ttl: int, cache_type: str, size: int = 0, stale_ttl: int = 0):
         self.data = data
-        self.created_at = time.time()
+        self.created_at = time.monotonic()
+        self.expires_at = self.created_at + ttl
+        self.stale_until = self.expires_at + stale_ttl
         self.ttl = ttl
         self.cache_type = cache_type
+        self.size = size
         self.access_count = 0
-        self.last_accessed = time.time()
-    
-    def is_expired(self) -> bool:
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
         """Check if cache entry has expired"""
-        return time.time() - self.created_at > self.ttl
-    
+        return (now or time.monotonic()) > self.expires_at
+
+    def is_dead(self, now: Optional[float] = None) -> bool:
+        """Check if the entry is past its stale-while-revalidate window and can be dropped"""
+        return (now or time.monotonic()) > self.stale_until
+
     def access(self) -> Any:
         """Access cached data and update statistics"""
         self.access_count += 1
-        self.last_accessed = time.time()
         return self.data
-    
+
     def get_age(self) -> int:
         """Get age of cache entry in seconds"""
-        return int(time.time() - self.created_at)
+        return int(time.monotonic() - self.created_at)
 
 class UnifiedCache:
     """
@@ -45,22 +93,24 @@ class UnifiedCache:
     Features:
     - Multi-tier caching with different TTLs
     - Event-driven invalidation
-    - Memory-efficient storage
-    - LRU eviction for resource management
+    - O(1) LRU per category (OrderedDict), no locks: every operation completes without awaiting
+    - Byte budget from approximate value sizes, evicting from the largest category first
+    - Lazy expiry on read plus an amortized sweep on write
+    - Singleflight loading with an optional stale-while-revalidate window
     - Comprehensive cache statistics
     """
     
     def __init__(self, max_memory_mb: int = 50):
-        # Cache storage by category
-        self.caches = {
-            'premium': {},      # Premium status (1 hour TTL)
-            'guild_config': {}, # Guild configurations (2 hour TTL)
-            'player_stats': {}, # Player statistics (30 min TTL)
-            'leaderboards': {}, # Computed leaderboards (15 min TTL)
-            'player_data': {},  # Active player data (10 min TTL)
-            'server_info': {},  # Server information (1 hour TTL)
-            'faction_data': {}, # Faction statistics (20 min TTL)
-            'economy_data': {}, # Economy balances (5 min TTL)
+        # Cache storage by category, least recently used first
+        self.caches: Dict[str, OrderedDict] = {
+            'premium': OrderedDict(),      # Premium status (1 hour TTL)
+            'guild_config': OrderedDict(), # Guild configurations (2 hour TTL)
+            'player_stats': OrderedDict(), # Player statistics (30 min TTL)
+            'leaderboards': OrderedDict(), # Computed leaderboards (15 min TTL)
+            'player_data': OrderedDict(),  # Active player data (10 min TTL)
+            'server_info': OrderedDict(),  # Server information (1 hour TTL)
+            'faction_data': OrderedDict(), # Faction statistics (20 min TTL)
+            'economy_data': OrderedDict(), # Economy balances (5 min TTL)
         }
         
         # Cache configuration
@@ -78,12 +128,16 @@ class UnifiedCache:
         # Memory management
         self.max_memory_bytes = max_memory_mb * 1024 * 1024
         self.max_entries_per_cache = 10000
+        self.cache_bytes = {cache_type: 0 for cache_type in self.caches}
         
         # Statistics
         self.stats = {
             'hits': 0,
             'misses': 0,
             'evictions': 0,
+            'expirations': 0,
+            'coalesced': 0,
+            'stale_hits': 0,
             'invalidations': 0,
             'memory_usage': 0
         }
@@ -96,71 +150,154 @@ class UnifiedCache:
             'faction_data': ['leaderboards'],
         }
         
-        # Locks for thread safety
-        self._locks = defaultdict(asyncio.Lock)
+        # In-flight loads by (cache_type, key), shared by concurrent callers
+        self._inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+        self._load_tasks: set = set()
         
         logger.info("🚀 Unified cache system initialized")
     
+    def _remove(self, cache_type: str, key: str) -> Optional[CacheEntry]:
+        """Drop an entry and release its bytes"""
+        entry = self.caches[cache_type].pop(key, None)
+        if entry is not None:
+            self.cache_bytes[cache_type] -= entry.size
+            self.stats['memory_usage'] -= entry.size
+        return entry
+    
     async def get(self, cache_type: str, key: str, default: Any = None) -> Any:
-        """Get data from cache with automatic cleanup"""
-        async with self._locks[cache_type]:
-            cache = self.caches.get(cache_type, {})
-            
-            if key not in cache:
-                self.stats['misses'] += 1
-                return default
-            
-            entry = cache[key]
-            
-            # Check expiration
-            if entry.is_expired():
-                del cache[key]
-                self.stats['misses'] += 1
-                return default
-            
-            # Return cached data
-            self.stats['hits'] += 1
-            return entry.access()
+        """Get data from cache, expiring it lazily"""
+        cache = self.caches.get(cache_type)
+        entry = cache.get(key) if cache is not None else None
+        
+        if entry is None:
+            self.stats['misses'] += 1
+            return default
+        
+        # Check expiration; entries inside a stale window stay for get_or_load
+        if entry.is_expired():
+            if entry.is_dead():
+                self._remove(cache_type, key)
+                self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            return default
+        
+        # Mark as most recently used
+        cache.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry.access()
     
-    async def set(self, cache_type: str, key: str, data: Any, custom_ttl: Optional[int] = None) -> None:
+    async def set(self, cache_type: str, key: str, data: Any, custom_ttl: Optional[int] = None,
+                  stale_ttl: int = 0) -> None:
         """Set data in cache with automatic memory management"""
-        async with self._locks[cache_type]:
-            if cache_type not in self.caches:
-                logger.warning(f"Unknown cache type: {cache_type}")
-                return
-            
-            cache = self.caches[cache_type]
-            ttl = custom_ttl or self.ttl_config.get(cache_type, 1800)
-            
-            # Memory management - evict old entries if needed
-            await self._evict_if_needed(cache_type)
-            
-            # Create cache entry
-            entry = CacheEntry(data, ttl, cache_type)
-            cache[key] = entry
-            
-            logger.debug(f"Cached {cache_type}:{key} (TTL: {ttl}s)")
+        if cache_type not in self.caches:
+            logger.warning(f"Unknown cache type: {cache_type}")
+            return
+        
+        ttl = custom_ttl or self.ttl_config.get(cache_type, 1800)
+        size = approximate_size(key) + approximate_size(data)
+        
+        # Replace any previous value, then insert as most recently used
+        self._remove(cache_type, key)
+        self.caches[cache_type][key] = CacheEntry(data, ttl, cache_type, size, stale_ttl)
+        self.cache_bytes[cache_type] += size
+        self.stats['memory_usage'] += size
+        
+        self._sweep(cache_type)
+        self._evict_if_needed(cache_type)
+        
+        logger.debug(f"Cached {cache_type}:{key} (TTL: {ttl}s, ~{size} bytes)")
+    
+    async def get_or_load(self, cache_type: str, key: str, loader: Callable[[], Awaitable[Any]],
+                          custom_ttl: Optional[int] = None, stale_ttl: int = 0) -> Any:
+        """
+        Get a cached value, loading it at most once however many callers miss together
+        
+        - Concurrent misses for the same key await the first caller's load
+        - With stale_ttl, an expired value is served for that many extra seconds while one background load refreshes it
+        - None results are returned but not cached
+        """
+        cache = self.caches.get(cache_type)
+        entry = cache.get(key) if cache is not None else None
+        if entry is not None:
+            now = time.monotonic()
+            if not entry.is_expired(now):
+                cache.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry.access()
+            if not entry.is_dead(now):
+                self.stats['stale_hits'] += 1
+                if (cache_type, key) not in self._inflight:
+                    self._start_flight(cache_type, key, loader, custom_ttl, stale_ttl, background=True)
+                return entry.access()
+        
+        self.stats['misses'] += 1
+        inflight = self._inflight.get((cache_type, key))
+        if inflight is not None:
+            self.stats['coalesced'] += 1
+        else:
+            inflight = self._start_flight(cache_type, key, loader, custom_ttl, stale_ttl)
+        # Shielded: a caller that is cancelled (e.g. a timed-out interaction) leaves the load running for the others
+        return await asyncio.shield(inflight)
+    
+    def _start_flight(self, cache_type: str, key: str, loader: Callable[[], Awaitable[Any]],
+                      custom_ttl: Optional[int], stale_ttl: int, background: bool = False) -> asyncio.Task:
+        """Start the single load for a key in its own task, registered before it first runs"""
+        task = asyncio.create_task(self._load(cache_type, key, loader, custom_ttl, stale_ttl))
+        self._inflight[(cache_type, key)] = task
+        self._load_tasks.add(task)
+        task.add_done_callback(self._refresh_done if background else self._load_done)
+        return task
+    
+    async def _load(self, cache_type: str, key: str, loader: Callable[[], Awaitable[Any]],
+                    custom_ttl: Optional[int], stale_ttl: int) -> Any:
+        """Run a loader as the single flight for its key"""
+        task = asyncio.current_task()
+        try:
+            data = await loader()
+            if data is not None and self._inflight.get((cache_type, key)) is task:
+                await self.set(cache_type, key, data, custom_ttl, stale_ttl)
+            return data
+        finally:
+            if self._inflight.get((cache_type, key)) is task:
+                del self._inflight[(cache_type, key)]
+    
+    def _load_done(self, task: asyncio.Task) -> None:
+        self._load_tasks.discard(task)
+        # Waiters receive any error; retrieve it so a load nobody awaits any more is not reported
+        if not task.cancelled():
+            task.exception()
+    
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        self._load_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Background cache refresh failed: {task.exception()}")
     
     async def invalidate(self, cache_type: str, key: Optional[str] = None) -> None:
         """Invalidate cache entries with dependency cascade"""
-        async with self._locks[cache_type]:
-            cache = self.caches.get(cache_type, {})
-            
-            if key is None:
-                # Clear entire cache type
-                cleared_count = len(cache)
-                cache.clear()
-                logger.info(f"Invalidated entire {cache_type} cache ({cleared_count} entries)")
-            else:
-                # Clear specific key
-                if key in cache:
-                    del cache[key]
-                    logger.debug(f"Invalidated {cache_type}:{key}")
-            
-            self.stats['invalidations'] += 1
-            
-            # Cascade invalidation to dependent caches
-            await self._cascade_invalidation(cache_type, key)
+        cache = self.caches.get(cache_type)
+        if cache is None:
+            return
+        
+        # Loads already in flight may have read pre-invalidation data; let them finish without caching
+        for inflight_key in [k for k in self._inflight if k[0] == cache_type and (key is None or k[1] == key)]:
+            del self._inflight[inflight_key]
+        
+        if key is None:
+            # Clear entire cache type
+            cleared_count = len(cache)
+            cache.clear()
+            self.stats['memory_usage'] -= self.cache_bytes[cache_type]
+            self.cache_bytes[cache_type] = 0
+            logger.info(f"Invalidated entire {cache_type} cache ({cleared_count} entries)")
+        else:
+            # Clear specific key
+            if self._remove(cache_type, key) is not None:
+                logger.debug(f"Invalidated {cache_type}:{key}")
+        
+        self.stats['invalidations'] += 1
+        
+        # Cascade invalidation to dependent caches
+        await self._cascade_invalidation(cache_type, key)
     
     async def _cascade_invalidation(self, cache_type: str, key: Optional[str] = None) -> None:
         """Cascade invalidation to dependent cache types"""
@@ -182,41 +319,42 @@ class UnifiedCache:
             return key.split('_')[1]
         return None
     
-    async def _evict_if_needed(self, cache_type: str) -> None:
-        """Evict oldest entries if cache is too large"""
+    def _sweep(self, cache_type: str) -> None:
+        """Drop expired entries among the least recently used few of a category"""
+        cache = self.caches[cache_type]
+        now = time.monotonic()
+        expired = [key for key, entry in islice(cache.items(), SWEEP_BATCH) if entry.is_dead(now)]
+        for key in expired:
+            self._remove(cache_type, key)
+        self.stats['expirations'] += len(expired)
+    
+    def _evict_if_needed(self, cache_type: str) -> None:
+        """Evict least recently used entries until the category and the byte budget fit"""
         cache = self.caches[cache_type]
-        max_entries = self.max_entries_per_cache
+        while len(cache) > self.max_entries_per_cache:
+            self._remove(cache_type, next(iter(cache)))
+            self.stats['evictions'] += 1
         
-        if len(cache) >= max_entries:
-            # Sort by last accessed time (LRU)
-            sorted_entries = sorted(
-                cache.items(),
-                key=lambda x: x[1].last_accessed
-            )
-            
-            # Remove oldest 20% of entries
-            evict_count = max_entries // 5
-            for key, _ in sorted_entries[:evict_count]:
-                del cache[key]
-                self.stats['evictions'] += 1
-            
-            logger.info(f"Evicted {evict_count} entries from {cache_type} cache")
+        while self.stats['memory_usage'] > self.max_memory_bytes:
+            victim_type = max(self.cache_bytes, key=self.cache_bytes.get)
+            victim_cache = self.caches[victim_type]
+            if not victim_cache:
+                break
+            self._remove(victim_type, next(iter(victim_cache)))
+            self.stats['evictions'] += 1
     
     async def cleanup_expired(self) -> int:
         """Clean up all expired entries across all caches"""
         total_cleaned = 0
+        now = time.monotonic()
         
         for cache_type, cache in self.caches.items():
-            async with self._locks[cache_type]:
-                expired_keys = [
-                    key for key, entry in cache.items()
-                    if entry.is_expired()
-                ]
-                
-                for key in expired_keys:
-                    del cache[key]
-                    total_cleaned += 1
+            expired_keys = [key for key, entry in cache.items() if entry.is_dead(now)]
+            for key in expired_keys:
+                self._remove(cache_type, key)
+            total_cleaned += len(expired_keys)
         
+        self.stats['expirations'] += total_cleaned
         if total_cleaned > 0:
             logger.info(f"Cleaned up {total_cleaned} expired cache entries")
         
@@ -235,6 +373,7 @@ class UnifiedCache:
         for cache_type, cache in self.caches.items():
             cache_details[cache_type] = {
                 'entries': len(cache),
+                'bytes': self.cache_bytes[cache_type],
                 'avg_age': self._get_average_age(cache),
                 'hit_count': sum(entry.access_count for entry in cache.values())
             }
@@ -245,7 +384,12 @@ class UnifiedCache:
             'hits': self.stats['hits'],
             'misses': self.stats['misses'],
             'evictions': self.stats['evictions'],
+            'expirations': self.stats['expirations'],
+            'coalesced': self.stats['coalesced'],
+            'stale_hits': self.stats['stale_hits'],
             'invalidations': self.stats['invalidations'],
+            'memory_usage_mb': round(self.stats['memory_usage'] / (1024 * 1024), 2),
+            'max_memory_mb': round(self.max_memory_bytes / (1024 * 1024), 2),
             'cache_details': cache_details
         }
     
@@ -297,6 +441,28 @@ class UnifiedCache:
             key += f"_server_{server_id}"
         await self.set('leaderboards', key, leaderboard_data)
     
+    async def get_or_load_leaderboard(self, guild_id: int, leaderboard_type: str, loader: Callable[[], Awaitable[Any]],
+                                      server_id: Optional[str] = None) -> Any:
+        """Cached leaderboard data, computed once for all concurrent callers"""
+        key = f"guild_{guild_id}_type_{leaderboard_type}"
+        if server_id:
+            key += f"_server_{server_id}"
+        return await self.get_or_load('leaderboards', key, loader, stale_ttl=LEADERBOARD_STALE_TTL)
+    
+    async def get_or_load_leaderboard_snapshot(self, guild_id: int, loader: Callable[[], Awaitable[Any]],
+                                               server_id: Optional[str] = None) -> Any:
+        """Cached assembled leaderboard data, computed once for all concurrent callers"""
+        return await self.get_or_load('leaderboards', f"guild_{guild_id}_snapshot_{server_id or 'all'}", loader,
+                                      stale_ttl=LEADERBOARD_STALE_TTL)
+    
+    async def invalidate_leaderboard_snapshots(self, guild_id: int, server_id: str) -> None:
+        """Drop the server's snapshot, the guild-wide snapshots and the ingest-derived rankings that include it"""
+        for scope in (server_id, 'all', 'guild_totals'):
+            await self.invalidate('leaderboards', f"guild_{guild_id}_snapshot_{scope}")
+        for leaderboard_type in SNAPSHOT_LEADERBOARD_TYPES:
+            await self.invalidate('leaderboards', f"guild_{guild_id}_type_{leaderboard_type}")
+            await self.invalidate('leaderboards', f"guild_{guild_id}_type_{leaderboard_type}_server_{server_id}")
+    
     async def get_guild_config(self, guild_id: int) -> Optional[Dict[str, Any]]:
         """Get cached guild configuration"""
         return await self.get('guild_config', f"guild_{guild_id}")
@@ -323,7 +489,7 @@ class UnifiedCache:
         for cache_type in self.caches.keys():
             # Find all keys containing the guild ID
             cache = self.caches[cache_type]
-            guild_keys = [key for key in cache.keys() if guild_key in key]
+            guild_keys = [key for key in list(cache.keys()) if guild_key in key]
             
             for key in guild_keys:
                 await self.invalidate(cache_type, key)
@@ -0,0 +1,121 @@
+"""
+Weapon Counters
+Per-server weapon/killer kill counters maintained at ingest, queried for weapon leaderboards
+"""
+
+import logging
+from typing import Dict, List, Any, Optional
+
+from pymongo import UpdateOne
+
+from bot.utils.player_profiles import EXCLUDED_WEAPONS
+
+logger = logging.getLogger(__name__)
+
+
+def counter_id(guild_id: int, server_id: str, weapon: str, killer: str) -> Dict[str, Any]:
+    """Build the compound _id of a weapon/killer counter (field order matters for matching)"""
+    return {'guild_id': guild_id, 'server_id': server_id, 'weapon': weapon, 'killer': killer}
+
+
+def _counter_upserts(guild_id: int, server_id: str, counts: Dict[tuple, int]) -> List[UpdateOne]:
+    return [
+        UpdateOne(
+            {'_id': counter_id(guild_id, server_id, weapon, killer)},
+            {
+                '$setOnInsert': {'guild_id': guild_id, 'server_id': server_id, 'weapon': weapon, 'killer': killer},
+                '$inc': {'kills': kills}
+            },
+            upsert=True
+        )
+        for (weapon, killer), kills in counts.items()
+    ]
+
+
+def build_counter_operations(guild_id: int, server_id: str, kill_events: List[Dict[str, Any]]) -> List[UpdateOne]:
+    """Fold newly ingested kill events into weapon/killer counter upserts"""
+    counts: Dict[tuple, int] = {}
+    for event in kill_events:
+        weapon = event.get('weapon') or 'Unknown'
+        killer = event.get('killer')
+        if event.get('is_suicide') or not killer or weapon in EXCLUDED_WEAPONS:
+            continue
+        counts[(weapon, killer)] = counts.get((weapon, killer), 0) + 1
+    return _counter_upserts(guild_id, server_id, counts)
+
+
+async def get_top_weapons(db_manager, guild_id: int, limit: int = 10,
+                          server_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Top weapons by kills with the player holding the most kills for each weapon"""
+    match = {'guild_id': guild_id}
+    if server_id and server_id != 'all':
+        match['server_id'] = server_id
+
+    pipeline = [
+        {'$match': match},
+        # Combine servers for guild-wide boards
+        {'$group': {'_id': {'weapon': '$weapon', 'killer': '$killer'}, 'kills': {'$sum': '$kills'}}},
+        {'$sort': {'kills': -1}},
+        {'$group': {
+            '_id': '$_id.weapon',
+            'kills': {'$sum': '$kills'},
+            'top_user': {'$first': '$_id.killer'},
+            'top_user_kills': {'$first': '$kills'}
+        }},
+        {'$sort': {'kills': -1, '_id': 1}},
+        {'$limit': limit}
+    ]
+
+    results = await db_manager.weapon_counters.aggregate(pipeline).to_list(length=limit)
+    return [
+        {
+            'weapon_name': doc['_id'],
+            'kills': doc['kills'],
+            'top_user': doc.get('top_user'),
+            'top_user_kills': doc.get('top_user_kills', 0)
+        }
+        for doc in results
+    ]
+
+
+async def rebuild_weapon_counters(db_manager, guild_id: Optional[int] = None):
+    """Recompute counters server-side from kill_events, for all guilds or one guild"""
+    match: Dict[str, Any] = {'is_suicide': False, 'weapon': {'$nin': list(EXCLUDED_WEAPONS)}}
+    if guild_id is not None:
+        match['guild_id'] = guild_id
+        await db_manager.weapon_counters.delete_many({'guild_id': guild_id})
+    else:
+        await db_manager.weapon_counters.delete_many({})
+
+    pipeline = [
+        {'$match': match},
+        {'$group': {
+            '_id': {'guild_id': '$guild_id', 'server_id': '$server_id', 'weapon': '$weapon', 'killer': '$killer'},
+            'kills': {'$sum': 1}
+        }},
+        {'$addFields': {
+            'guild_id': '$_id.guild_id',
+            'server_id': '$_id.server_id',
+            'weapon': '$_id.weapon',
+            'killer': '$_id.killer'
+        }},
+        {'$merge': {'into': 'weapon_counters', 'on': '_id', 'whenMatched': 'replace', 'whenNotMatched': 'insert'}}
+    ]
+    async for _ in db_manager.aggregate_kill_events(pipeline):
+        pass
+
+    # Kills already rolled up by retention (weapon names are stored field-safe)
+    rollup_query: Dict[str, Any] = {'type': 'player'}
+    if guild_id is not None:
+        rollup_query['guild_id'] = guild_id
+    async for rollup in db_manager.kill_rollups.find(rollup_query, {'guild_id': 1, 'server_id': 1, 'player_name': 1, 'weapons': 1}):
+        counts = {
+            (weapon, rollup['player_name']): count
+            for weapon, count in (rollup.get('weapons') or {}).items()
+            if weapon not in EXCLUDED_WEAPONS and count
+        }
+        operations = _counter_upserts(rollup['guild_id'], rollup['server_id'], counts)
+        if operations:
+            await db_manager.weapon_counters.bulk_write(operations, ordered=False)
+
+    logger.info(f"Rebuilt weapon counters for {'all guilds' if guild_id is None else f'guild {guild_id}'}")
@@ -1,168 +0,0 @@
-#!/usr/bin/env python3
-"""
-Fix Player State Accuracy - Clean up stale player states and implement proper state management
-"""
-import asyncio
-import os
-import motor.motor_asyncio
-from datetime import datetime, timezone
-
-async def fix_player_state_accuracy():
-    """Fix critical player state accuracy issues"""
-    mongo_uri = os.environ.get('MONGO_URI')
-    client = motor.motor_asyncio.AsyncIOMotorClient(mongo_uri)
-    db = client.EmeraldDB
-    
-    guild_id = 1219706687980568769
-    
-    print("=== PLAYER STATE ACCURACY FIX ===")
-    
-    # 1. Check current database state
-    print("\n1. Current Database State Analysis:")
-    total_sessions = await db.player_sessions.count_documents({'guild_id': guild_id})
-    online_sessions = await db.player_sessions.count_documents({'guild_id': guild_id, 'state': 'online'})
-    print(f"  Total sessions: {total_sessions}")
-    print(f"  Online sessions: {online_sessions}")
-    
-    # 2. Create test player session to verify database functionality
-    print("\n2. Testing Database Persistence:")
-    test_session = {
-        "guild_id": guild_id,
-        "player_id": "test_persistence_001", 
-        "player_name": "TestPlayer",
-        "state": "online",
-        "server_name": "Emerald EU",
-        "last_updated": datetime.now(timezone.utc),
-        "joined_at": datetime.now(timezone.utc).isoformat()
-    }
-    
-    try:
-        insert_result = await db.player_sessions.insert_one(test_session)
-        print(f"  Test insertion: SUCCESS ({insert_result.inserted_id})")
-        
-        # Verify we can query it
-        found_session = await db.player_sessions.find_one({"player_id": "test_persistence_001"})
-        if found_session:
-            print(f"  Test query: SUCCESS (found {found_session['player_name']})")
-        else:
-            print(f"  Test query: FAILED")
-            
-        # Clean up test session
-        await db.player_sessions.delete_one({"player_id": "test_persistence_001"})
-        print(f"  Test cleanup: SUCCESS")
-        
-    except Exception as e:
-        print(f"  Database test FAILED: {e}")
-        return
-    
-    # 3. Check for any database integrity issues
-    print("\n3. Database Integrity Check:")
-    
-    # Check for orphaned sessions
-    orphaned_sessions = await db.player_sessions.count_documents({
-        'guild_id': {'$ne': guild_id}
-    })
-    print(f"  Sessions for other guilds: {orphaned_sessions}")
-    
-    # Check for sessions missing required fields
-    sessions_missing_state = await db.player_sessions.count_documents({
-        'guild_id': guild_id,
-        'state': {'$exists': False}
-    })
-    sessions_missing_server = await db.player_sessions.count_documents({
-        'guild_id': guild_id,
-        'server_name': {'$exists': False}
-    })
-    print(f"  Sessions missing 'state' field: {sessions_missing_state}")
-    print(f"  Sessions missing 'server_name' field: {sessions_missing_server}")
-    
-    # 4. Fix any structural issues
-    print("\n4. Structural Fixes:")
-    
-    if sessions_missing_state > 0:
-        fix_result = await db.player_sessions.update_many(
-            {'guild_id': guild_id, 'state': {'$exists': False}},
-            {'$set': {'state': 'offline'}}
-        )
-        print(f"  Fixed {fix_result.modified_count} sessions missing state field")
-    
-    if sessions_missing_server > 0:
-        fix_result = await db.player_sessions.update_many(
-            {'guild_id': guild_id, 'server_name': {'$exists': False}},
-            {'$set': {'server_name': 'Unknown'}}
-        )
-        print(f"  Fixed {fix_result.modified_count} sessions missing server_name field")
-    
-    # 5. Add proper player names to sessions that only have EOSIDs
-    print("\n5. Player Name Enhancement:")
-    sessions_without_names = await db.player_sessions.count_documents({
-        'guild_id': guild_id,
-        'player_name': {'$exists': False}
-    })
-    
-    if sessions_without_names > 0:
-        print(f"  Found {sessions_without_names} sessions without player names")
-        
-        # Update sessions to have player names based on player_id
-        async for session in db.player_sessions.find({
-            'guild_id': guild_id,
-            'player_name': {'$exists': False}
-        }):
-            player_id = session.get('player_id', '')
-            if player_id:
-                # Generate a readable name from EOSID
-                player_name = f"Player{player_id[:8].upper()}"
-                await db.player_sessions.update_one(
-                    {'_id': session['_id']},
-                    {'$set': {'player_name': player_name}}
-                )
-        print(f"  Added player names to sessions")
-    
-    # 6. Ensure proper indexing for performance
-    print("\n6. Database Index Optimization:")
-    
-    try:
-        # Create compound index for efficient queries
-        await db.player_sessions.create_index([
-            ("guild_id", 1),
-            ("state", 1),
-            ("server_name", 1)
-        ], background=True)
-        print(f"  Created compound index for player sessions")
-        
-        await db.player_sessions.create_index([
-            ("guild_id", 1),
-            ("player_id", 1)
-        ], unique=True, background=True)
-        print(f"  Created unique index for player identification")
-        
-    except Exception as e:
-        print(f"  Index creation note: {e}")
-    
-    # 7. Final verification
-    print("\n7. Final State Verification:")
-    final_total = await db.player_sessions.count_documents({'guild_id': guild_id})
-    final_online = await db.player_sessions.count_documents({'guild_id': guild_id, 'state': 'online'})
-    print(f"  Final total sessions: {final_total}")
-    print(f"  Final online sessions: {final_online}")
-    
-    # Show sample sessions for verification
-    print("\nSample sessions:")
-    async for session in db.player_sessions.find({'guild_id': guild_id}).limit(3):
-        player_name = session.get('player_name', 'Unknown')
-        state = session.get('state', 'unknown')
-        server = session.get('server_name', 'Unknown')
-        last_updated = session.get('last_updated', 'Unknown')
-        print(f"  {player_name} - {state} on {server} (updated: {last_updated})")
-    
-    client.close()
-    
-    print("\n=== FIX SUMMARY ===")
-    print("Database persistence functionality verified")
-    print("Structural integrity issues resolved")
-    print("Performance indexes optimized")
-    print("Player state tracking enhanced")
-    print("\nThe /online command should now work correctly once players connect")
-
-if __name__ == "__main__":
-    asyncio.run(fix_player_state_accuracy())
\ No newline at end of file
@@ -545,6 +545,25 @@ class EmeraldKillfeedBot(commands.Bot):
             await self.db_manager.initialize_database()
             logger.info("Database architecture initialized (PHASE 1)")
             
+            # Shared parser state cache on the bot's client, warmed in one query
+            from bot.utils.shared_parser_state import initialize_shared_state_manager
+            state_manager = initialize_shared_state_manager(self.db_manager)
+            await state_manager.load_all_states()
+            
+            # In-memory leaderboards, answered without database reads once seeded
+            from bot.utils.leaderboard_topk import get_leaderboard_topk
+            await get_leaderboard_topk().seed_all(self.db_manager)
+            
+            # Premium checks are answered from memory after this one query
+            from bot.utils.premium_entitlements import get_premium_entitlements
+            await get_premium_entitlements().load_all(self.db_manager)
+            
+            # Channel routing tables are invalidated by the bot's own writes; the change stream
+            # also catches edits made outside it (replica set deployments only)
+            if os.getenv('CHANNEL_ROUTES_WATCH', 'false').lower() == 'true':
+                from bot.utils.channel_router import get_channel_routes
+                self.channel_routes_watcher = asyncio.create_task(get_channel_routes().watch(self.db_manager))
+            
             # Initialize parser instances for scheduling
             await self.setup_parsers()
             
@@ -723,6 +742,24 @@ class EmeraldKillfeedBot(commands.Bot):
                 except Exception as e:
                     logger.error(f"Failed to schedule unified log parser: {e}")
 
+            # Schedule incremental data retention
+            if hasattr(self, 'db_manager') and self.db_manager:
+                try:
+                    from bot.utils.retention_manager import get_retention_manager
+                    retention_manager = get_retention_manager(self.db_manager)
+                    self.scheduler.add_job(
+                        retention_manager.run,
+                        'interval',
+                        hours=1,
+                        id='data_retention',
+                        max_instances=1,
+                        coalesce=True,
+                        replace_existing=True
+                    )
+                    logger.info("🗄️ Data retention scheduled (hourly)")
+                except Exception as e:
+                    logger.error(f"Failed to schedule data retention: {e}")
+
             # STEP 7: Final status
             if self.user:
                 logger.info("✅ Bot logged in as %s (ID: %s)", self.user.name, self.user.id)
@@ -788,6 +825,8 @@ class EmeraldKillfeedBot(commands.Bot):
             
             result = await self.db_manager.db.server_premium_status.delete_many({"guild_id": guild_id})
             logger.info("Cleaned premium servers: %d documents", result.deleted_count)
+            from bot.utils.premium_entitlements import get_premium_entitlements
+            get_premium_entitlements().invalidate(guild_id)
             
             # Remove user data (stats, economy, linking)
             result = await self.db_manager.db.user_stats.delete_many({"guild_id": guild_id})
@@ -944,6 +983,24 @@ class EmeraldKillfeedBot(commands.Bot):
             self.scheduler.shutdown()
             logger.info("Scheduler stopped")
 
+        if getattr(self, 'channel_routes_watcher', None):
+            self.channel_routes_watcher.cancel()
+
+        # Persist any parser states not yet flushed by a tick
+        from bot.utils.shared_parser_state import get_shared_state_manager
+        state_manager = get_shared_state_manager()
+        if state_manager:
+            await state_manager.flush_states()
+
+        # Persist presence changes not yet checkpointed by a parser run
+        if self.db_manager:
+            from bot.utils.presence_tracker import get_presence_tracker
+            await get_presence_tracker().checkpoint(self.db_manager)
+
+        # Offsets and presence for a warm start on the next boot
+        if self.db_manager and self.unified_log_parser and hasattr(self.unified_log_parser, 'save_warm_snapshot'):
+            await self.unified_log_parser.save_warm_snapshot()
+
         # Proper MongoDB cleanup
         if hasattr(self, 'mongo_client') and self.mongo_client:
             try: